@@ -0,0 +1,295 @@
+"""Incrementally maintained churn features.
+
+Sales transactions are folded into a writable SQLite file next to the customer
+database (churn_features.db):
+
+- customer_txn_daily: per customer and day, the sales amount total and count, the
+  return total and the latest transaction time;
+- customer_documents / customer_products: the last day each customer bought on a
+  sales document / an item, so distinct counts over any window ending today are a
+  range count on last_day.
+
+Refreshes only read transactions appended since the last refresh (by rowid) and
+add them to the stored rows. From these tables, the customer and loyalty tables
+of the (attached, read-only) customer database, one feature row per customer is
+materialized into churn_features, keyed by lookback window, as-of date and
+customer, and extracting features is a single indexed read of one snapshot.
+Building a snapshot drops the older snapshots of its lookback window, so past
+snapshots do not accumulate.
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+import pandas as pd
+
+# Customer directory, for the shared store helpers
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from database.incremental_store import IncrementalStore
+
+logger = logging.getLogger(__name__)
+
+# customer_id columns have no declared type so they keep the type of the source keys
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS customer_txn_daily (
+        customer_id NOT NULL,
+        day TEXT NOT NULL,
+        sales_amount REAL NOT NULL,
+        sales_count INTEGER NOT NULL,
+        return_amount REAL NOT NULL,
+        last_transaction TEXT,
+        PRIMARY KEY (customer_id, day)
+    );
+    CREATE INDEX IF NOT EXISTS idx_customer_txn_daily_day ON customer_txn_daily (day, customer_id);
+    CREATE TABLE IF NOT EXISTS customer_documents (
+        customer_id NOT NULL,
+        document NOT NULL,
+        last_day TEXT NOT NULL,
+        PRIMARY KEY (customer_id, document)
+    );
+    CREATE INDEX IF NOT EXISTS idx_customer_documents_day ON customer_documents (last_day, customer_id);
+    CREATE TABLE IF NOT EXISTS customer_products (
+        customer_id NOT NULL,
+        item NOT NULL,
+        last_day TEXT NOT NULL,
+        PRIMARY KEY (customer_id, item)
+    );
+    CREATE INDEX IF NOT EXISTS idx_customer_products_day ON customer_products (last_day, customer_id);
+    CREATE TABLE IF NOT EXISTS churn_features (
+        lookback_days INTEGER NOT NULL,
+        as_of_date TEXT NOT NULL,
+        customer_id,
+        status,
+        credit_status,
+        credit_limit,
+        acquisition_year,
+        recency_band,
+        frequency_band,
+        monetary_band,
+        loyalty_status,
+        rfm_score,
+        days_since_last_activity,
+        transaction_count,
+        avg_transaction_value,
+        lifetime_sales,
+        at_risk_count,
+        lost_count,
+        unique_transactions,
+        avg_sale_amount,
+        total_returns,
+        unique_products,
+        last_transaction_date
+    );
+    CREATE INDEX IF NOT EXISTS idx_churn_features ON churn_features (lookback_days, as_of_date);
+    CREATE TABLE IF NOT EXISTS feature_snapshots (
+        lookback_days INTEGER NOT NULL,
+        as_of_date TEXT NOT NULL,
+        source_version TEXT,
+        PRIMARY KEY (lookback_days, as_of_date)
+    );
+    CREATE TABLE IF NOT EXISTS feature_state (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+"""
+
+# Transactions appended since the last refresh, added onto the stored rows
+INGEST_QUERIES = (
+    """
+    INSERT INTO customer_txn_daily
+    SELECT
+        "Customer Key",
+        date("Txn Date"),
+        TOTAL("Sales Amount"),
+        COUNT("Sales Amount"),
+        TOTAL("Return Amount"),
+        MAX("Txn Date")
+    FROM source.dbo_F_Sales_Transaction
+    WHERE rowid > ? AND "Txn Date" IS NOT NULL
+    GROUP BY 1, 2
+    ON CONFLICT (customer_id, day) DO UPDATE SET
+        sales_amount = sales_amount + excluded.sales_amount,
+        sales_count = sales_count + excluded.sales_count,
+        return_amount = return_amount + excluded.return_amount,
+        last_transaction = MAX(last_transaction, excluded.last_transaction)
+    """,
+    """
+    INSERT INTO customer_documents
+    SELECT "Customer Key", "Sales Txn Document", MAX(date("Txn Date"))
+    FROM source.dbo_F_Sales_Transaction
+    WHERE rowid > ? AND "Txn Date" IS NOT NULL AND "Sales Txn Document" IS NOT NULL
+    GROUP BY 1, 2
+    ON CONFLICT (customer_id, document) DO UPDATE SET last_day = MAX(last_day, excluded.last_day)
+    """,
+    """
+    INSERT INTO customer_products
+    SELECT "Customer Key", "Item Number", MAX(date("Txn Date"))
+    FROM source.dbo_F_Sales_Transaction
+    WHERE rowid > ? AND "Txn Date" IS NOT NULL AND "Item Number" IS NOT NULL
+    GROUP BY 1, 2
+    ON CONFLICT (customer_id, item) DO UPDATE SET last_day = MAX(last_day, excluded.last_day)
+    """
+)
+
+# Every window predicate compares an indexed day column with a constant
+SNAPSHOT_QUERY = """
+    INSERT INTO churn_features
+    WITH sales AS (
+        SELECT
+            customer_id,
+            SUM(sales_amount) / SUM(sales_count) as avg_sale_amount,
+            SUM(return_amount) as total_returns,
+            MAX(last_transaction) as last_transaction_date
+        FROM customer_txn_daily
+        WHERE day >= ?
+        GROUP BY customer_id
+    ),
+    documents AS (
+        SELECT customer_id, COUNT(*) as unique_transactions
+        FROM customer_documents
+        WHERE last_day >= ?
+        GROUP BY customer_id
+    ),
+    products AS (
+        SELECT customer_id, COUNT(*) as unique_products
+        FROM customer_products
+        WHERE last_day >= ?
+        GROUP BY customer_id
+    )
+    SELECT
+        ?, ?,
+        c."Customer Key",
+        c."Customer Status",
+        c."Credit Status",
+        c."Credit Limit Amount",
+        c."Year Acquired",
+        c."Recency Band",
+        c."Frequency Band",
+        c."Monetary Band",
+        cl."Loyalty Status",
+        cl."RFM Score",
+        cl."Days Since Last Activity",
+        cl."Number Sales Txns",
+        cl."Avg Sales Amount",
+        cl."LTD Sales Amount",
+        cl."At Risk Customer Count",
+        cl."Lost Customer Count",
+        documents.unique_transactions,
+        sales.avg_sale_amount,
+        sales.total_returns,
+        products.unique_products,
+        sales.last_transaction_date
+    FROM source.dbo_D_Customer c
+    LEFT JOIN source.dbo_F_Customer_Loyalty cl ON cl."Customer Number" = c."Customer Key"
+    LEFT JOIN sales ON sales.customer_id = c."Customer Key"
+    LEFT JOIN documents ON documents.customer_id = c."Customer Key"
+    LEFT JOIN products ON products.customer_id = c."Customer Key"
+"""
+
+class ChurnFeatureStore(IncrementalStore):
+    """Builds, refreshes and reads the per-customer churn feature snapshots."""
+    
+    SCHEMA = SCHEMA
+    STATE_TABLE = "feature_state"
+    
+    def __init__(self, source_path: str, store_path: Optional[str] = None):
+        """Initialize the store.
+        
+        Args:
+            source_path: Path to the customer database
+            store_path: Optional path to the store file. Defaults to churn_features.db
+                next to the customer database.
+        """
+        super().__init__(source_path,
+                         store_path or os.path.join(os.path.dirname(source_path), 'churn_features.db'))
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = super()._connect()
+        conn.execute("ATTACH DATABASE ? AS source", (f"file:{self.source_path}?mode=ro",))
+        return conn
+    
+    def refresh(self, full: bool = False) -> Dict[str, object]:
+        """Fold transactions appended since the last refresh into the transaction tables.
+        
+        Args:
+            full: Whether to rebuild from every transaction (needed after in-place
+                corrections or deletions of older transactions)
+        
+        Returns:
+            Dictionary with the refresh mode and the rowid range read
+        """
+        return super().refresh(full)
+    
+    def _refresh(self, conn: sqlite3.Connection, full: bool) -> Dict[str, object]:
+        state = self._get_state(conn)
+        source_version = self.source_version()
+        since_rowid = None if full else state.get('max_rowid')
+        max_rowid = self.max_rowid(conn, 'source.dbo_F_Sales_Transaction')
+        
+        with conn:
+            if since_rowid is None:
+                for table in ('customer_txn_daily', 'customer_documents', 'customer_products'):
+                    conn.execute(f"DELETE FROM {table}")
+            for query in INGEST_QUERIES:
+                conn.execute(query, (int(since_rowid or 0),))
+            self._set_state(conn, source_version, state.get('max_rowid') if max_rowid is None else max_rowid)
+            # Today's snapshots built from older data are rebuilt on their next read
+            conn.execute("DELETE FROM feature_snapshots WHERE as_of_date >= ? AND source_version IS NOT ?",
+                         (date.today().isoformat(), source_version))
+        
+        mode = 'incremental' if since_rowid is not None else 'full'
+        logger.info(f"Refreshed churn transaction features ({mode}) up to rowid {max_rowid}")
+        return {'mode': mode, 'from_rowid': int(since_rowid or 0), 'to_rowid': max_rowid}
+    
+    def load(self, lookback_days: int, as_of_date: Optional[date] = None, refresh: bool = True) -> pd.DataFrame:
+        """Churn features of every customer for a lookback window ending at the as-of date.
+        
+        Args:
+            lookback_days: Number of days of transactions the transaction features cover
+            as_of_date: Optional last day of the window (defaults to today); windows
+                reach up to the latest transaction, so past as-of dates are only
+                exact for snapshots built on that day. Building a snapshot drops
+                the older snapshots of the same lookback window.
+            refresh: Whether to refresh the store first if the customer database changed
+        
+        Returns:
+            DataFrame with one row per customer, as extracted by ChurnRiskPredictor
+            before missing values are filled
+        """
+        as_of = (as_of_date or date.today()).isoformat()
+        cutoff = ((as_of_date or date.today()) - timedelta(days=lookback_days)).isoformat()
+        
+        with self._refresh_lock:
+            conn = self._connect()
+            try:
+                # Take the store's write lock before reading the state, as refresh() does
+                conn.execute("BEGIN IMMEDIATE")
+                if refresh and not self._is_current(self._get_state(conn)):
+                    self._refresh(conn, full=False)
+                
+                snapshot_version = conn.execute(
+                    "SELECT source_version FROM feature_snapshots WHERE lookback_days = ? AND as_of_date = ?",
+                    (lookback_days, as_of)
+                ).fetchone()
+                if snapshot_version is None:
+                    with conn:
+                        for table in ('churn_features', 'feature_snapshots'):
+                            conn.execute(f"DELETE FROM {table} WHERE lookback_days = ? AND as_of_date <= ?",
+                                         (lookback_days, as_of))
+                        conn.execute(SNAPSHOT_QUERY, (cutoff, cutoff, cutoff, lookback_days, as_of))
+                        conn.execute("INSERT OR REPLACE INTO feature_snapshots VALUES (?, ?, ?)",
+                                     (lookback_days, as_of, self._get_state(conn).get('source_version')))
+                    logger.info(f"Built churn feature snapshot for {lookback_days} days as of {as_of}")
+                
+                features = pd.read_sql(
+                    "SELECT * FROM churn_features WHERE lookback_days = ? AND as_of_date = ?",
+                    conn, params=(lookback_days, as_of)
+                )
+            finally:
+                conn.close()
+        
+        return features.drop(columns=['lookback_days', 'as_of_date'])
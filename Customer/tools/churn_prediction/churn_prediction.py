@@ -14,12 +14,76 @@ import base64
 from typing import Dict, List, Optional, Union, Any
 import os
 
+from churn_features import ChurnFeatureStore
+from churn_registry import ChurnModelRegistry
+
+# Model inputs, in the order the scaler and model are fitted on, and their fill values
+FEATURE_COLUMNS = [
+    'rfm_score',
+    'days_since_last_activity',
+    'transaction_count',
+    'avg_transaction_value',
+    'lifetime_sales',
+    'at_risk_count',
+    'lost_count',
+    'unique_transactions',
+    'avg_sale_amount',
+    'total_returns',
+    'unique_products',
+    'days_since_last_transaction',
+    'credit_limit'
+]
+FEATURE_DEFAULTS = {column: 0 for column in FEATURE_COLUMNS}
+FEATURE_DEFAULTS.update({'days_since_last_activity': 90, 'days_since_last_transaction': 90})
+
+# Number of contributing factors reported per customer
+TOP_FACTORS = 3
+FACTOR_COLUMNS = [f'factor_{n}' for n in range(1, TOP_FACTORS + 1)]
+
+def top_factor_indices(contributions: np.ndarray, k: int = TOP_FACTORS) -> np.ndarray:
+    """Column indices of the k largest contributions in each row, largest first.
+    
+    Args:
+        contributions: (customers x features) contribution matrix
+        k: Number of factors per customer
+    
+    Returns:
+        Integer array of shape (customers, k)
+    """
+    k = min(k, contributions.shape[1])
+    dtype = np.int8 if contributions.shape[1] <= np.iinfo(np.int8).max else np.int32
+    if len(contributions) == 0:
+        return np.empty((0, k), dtype=dtype)
+    
+    # Partition once instead of sorting every row, then order only the k winners
+    top = np.argpartition(-contributions, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(contributions, top, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(top, order, axis=1).astype(dtype)
+
+def factors_to_json(factor_indices: np.ndarray, feature_cols: List[str]) -> np.ndarray:
+    """JSON lists of factor names, encoded once per distinct factor combination.
+    
+    Args:
+        factor_indices: Integer array of shape (customers, k) from top_factor_indices
+        feature_cols: Feature names by index
+    
+    Returns:
+        Object array with one JSON string per customer
+    """
+    if len(factor_indices) == 0:
+        return np.empty(0, dtype=object)
+    combinations, inverse = np.unique(factor_indices, axis=0, return_inverse=True)
+    encoded = np.array([json.dumps([feature_cols[j] for j in combination]) for combination in combinations],
+                       dtype=object)
+    return encoded[inverse.ravel()]
+
 def predict_churn_risk(
     time_period: str = "last_90_days",
     segment_id: Optional[str] = None,
     include_visualization: bool = True,
     training_epochs: int = 100,
-    batch_size: int = 32
+    batch_size: int = 32,
+    retrain: bool = False
 ) -> str:
     """
     Predict customer churn risk using machine learning.
@@ -30,6 +94,7 @@ def predict_churn_risk(
         include_visualization: Whether to include visualizations
         training_epochs: Number of training epochs for the ML model
         batch_size: Batch size for model training
+        retrain: Whether to train a new model even if the registered one is still valid
         
     Returns:
         String containing the analysis results and visualizations
@@ -37,8 +102,9 @@ def predict_churn_risk(
     # Connect to the database
     db_path = "/Users/rahilharihar/Projects/multiagent-googleADK/Project/Customer/database/customers.db"
     
-    # Initialize the predictor
+    # Initialize the predictor and the registry of trained models
     predictor = ChurnRiskPredictor(db_path)
+    registry = ChurnModelRegistry(db_path)
     
     # Determine lookback days based on time period
     if time_period == "last_30_days":
@@ -56,6 +122,29 @@ def predict_churn_risk(
     # Extract customer data
     customer_data = predictor.extract_customer_data(lookback_days)
     
+    # Score with the registered model unless it is missing, due or has drifted
+    entry = registry.load_latest(lookback_days)
+    retrain_reason = 'requested' if retrain else registry.retrain_reason(
+        entry, FEATURE_COLUMNS, predictor.feature_frame(customer_data).to_numpy()
+    )
+    if retrain_reason:
+        # Train on all customers; segments only narrow down who is scored
+        feature_cols, features = predictor.prepare_features(customer_data)
+        
+        # Generate synthetic labels for demonstration (in a real system, you'd have actual churn data)
+        # This is just for demonstration purposes
+        np.random.seed(42)
+        labels = np.random.binomial(1, 0.2, size=len(customer_data))
+        
+        metrics = predictor.train_model(features, labels, feature_cols)
+        model_version = registry.save(predictor.scaler, predictor.model, feature_cols,
+                                      lookback_days, metrics, len(customer_data))
+        model_note = f"Model version {model_version} trained now ({retrain_reason})"
+    else:
+        predictor.load_model(entry)
+        metrics = entry['metrics']
+        model_note = f"Model version {entry['version']} trained {entry['trained_at']:%Y-%m-%d %H:%M}"
+    
     # Filter by segment if specified
     if segment_id:
         # This would need to be adapted to your actual segment filtering logic
@@ -67,17 +156,6 @@ def predict_churn_risk(
             segment_customers = pd.read_sql(segment_query, conn)
             customer_data = customer_data[customer_data['customer_id'].isin(segment_customers['customer_id'])]
     
-    # Prepare features
-    feature_cols, features = predictor.prepare_features(customer_data)
-    
-    # Generate synthetic labels for demonstration (in a real system, you'd have actual churn data)
-    # This is just for demonstration purposes
-    np.random.seed(42)
-    labels = np.random.binomial(1, 0.2, size=len(customer_data))
-    
-    # Train the model
-    metrics = predictor.train_model(features, labels, feature_cols)
-    
     # Predict churn risk
     predictions = predictor.predict_churn_risk(customer_data)
     
@@ -97,10 +175,11 @@ def predict_churn_risk(
     }).round(3)
     
     # Format contributing factors
-    factor_counts = pd.Series([
-        factor for factors in predictions['contributing_factors'].apply(json.loads)
-        for factor in factors
-    ]).value_counts()
+    factor_counts = pd.Series(
+        np.bincount(predictions[FACTOR_COLUMNS].to_numpy().ravel(), minlength=len(predictor.feature_cols)),
+        index=predictor.feature_cols
+    ).sort_values(ascending=False, kind='stable')
+    factor_counts = factor_counts[factor_counts > 0]
     
     # Create the result string
     result = f"""# Churn Risk Analysis Report
@@ -120,6 +199,7 @@ Most common factors leading to high churn risk:
 ## Model Performance
 
 ROC AUC Score: {metrics['roc_auc']:.3f}
+{model_note}
 
 ## Recommendations
 
@@ -165,117 +245,14 @@ class ChurnRiskPredictor:
         Returns:
             DataFrame with customer features
         """
-        cutoff_date = datetime.now() - timedelta(days=lookback_days)
-        
-        with sqlite3.connect(self.db_path) as conn:
-            # Get customer loyalty metrics
-            loyalty_query = """
-            SELECT 
-                cl."Customer Number" as customer_id,
-                cl."Loyalty Status" as loyalty_status,
-                cl."RFM Score" as rfm_score,
-                cl."Days Since Last Activity" as days_since_last_activity,
-                cl."Number Sales Txns" as transaction_count,
-                cl."Avg Sales Amount" as avg_transaction_value,
-                cl."LTD Sales Amount" as lifetime_sales,
-                cl."At Risk Customer Count" as at_risk_count,
-                cl."Lost Customer Count" as lost_count
-            FROM dbo_F_Customer_Loyalty cl
-            """
-            
-            # Get transaction metrics
-            transaction_query = """
-            SELECT 
-                st."Customer Key" as customer_id,
-                COUNT(DISTINCT st."Sales Txn Document") as unique_transactions,
-                AVG(st."Sales Amount") as avg_sale_amount,
-                SUM(st."Return Amount") as total_returns,
-                COUNT(DISTINCT st."Item Number") as unique_products,
-                MAX(st."Txn Date") as last_transaction_date
-            FROM dbo_F_Sales_Transaction st
-            WHERE date(st."Txn Date") >= date('now', ?)
-            GROUP BY st."Customer Key"
-            """
-            
-            # Get customer details
-            customer_query = """
-            SELECT 
-                c."Customer Key" as customer_id,
-                c."Customer Status" as status,
-                c."Credit Status" as credit_status,
-                c."Credit Limit Amount" as credit_limit,
-                c."Year Acquired" as acquisition_year,
-                c."Recency Band" as recency_band,
-                c."Frequency Band" as frequency_band,
-                c."Monetary Band" as monetary_band
-            FROM dbo_D_Customer c
-            """
-            
-            # Execute queries
-            loyalty_df = pd.read_sql(loyalty_query, conn)
-            transaction_df = pd.read_sql(transaction_query, conn, params=[f'-{lookback_days} days'])
-            customer_df = pd.read_sql(customer_query, conn)
-            
-            # Merge all metrics
-            customer_data = customer_df.merge(
-                loyalty_df, on='customer_id', how='left'
-            ).merge(
-                transaction_df, on='customer_id', how='left'
-            )
-            
-            # Fill missing values
-            customer_data = customer_data.fillna({
-                'loyalty_status': 'Unknown',
-                'rfm_score': 0,
-                'days_since_last_activity': lookback_days,
-                'transaction_count': 0,
-                'avg_transaction_value': 0,
-                'lifetime_sales': 0,
-                'at_risk_count': 0,
-                'lost_count': 0,
-                'unique_transactions': 0,
-                'avg_sale_amount': 0,
-                'total_returns': 0,
-                'unique_products': 0,
-                'credit_limit': 0,
-                'acquisition_year': datetime.now().year
-            })
-            
-            # Calculate days since last transaction if available
-            customer_data['days_since_last_transaction'] = pd.to_datetime('now') - pd.to_datetime(customer_data['last_transaction_date'])
-            customer_data['days_since_last_transaction'] = customer_data['days_since_last_transaction'].dt.days.fillna(lookback_days)
-            
-            return customer_data
-            
-    def prepare_features(self, customer_data: pd.DataFrame) -> tuple:
-        """Prepare features for churn prediction.
+        # One indexed read of today's feature snapshot, refreshed from new transactions
+        customer_data = ChurnFeatureStore(self.db_path).load(lookback_days)
         
-        Args:
-            customer_data: DataFrame with customer metrics
-            
-        Returns:
-            Tuple of (feature_names, scaled_features)
-        """
-        feature_cols = [
-            'rfm_score',
-            'days_since_last_activity',
-            'transaction_count',
-            'avg_transaction_value',
-            'lifetime_sales',
-            'at_risk_count',
-            'lost_count',
-            'unique_transactions',
-            'avg_sale_amount',
-            'total_returns',
-            'unique_products',
-            'days_since_last_transaction',
-            'credit_limit'
-        ]
-        
-        # Fill NaN values with appropriate defaults
+        # Fill missing values
         customer_data = customer_data.fillna({
+            'loyalty_status': 'Unknown',
             'rfm_score': 0,
-            'days_since_last_activity': 90,
+            'days_since_last_activity': lookback_days,
             'transaction_count': 0,
             'avg_transaction_value': 0,
             'lifetime_sales': 0,
@@ -285,14 +262,60 @@ class ChurnRiskPredictor:
             'avg_sale_amount': 0,
             'total_returns': 0,
             'unique_products': 0,
-            'days_since_last_transaction': 90,
-            'credit_limit': 0
+            'credit_limit': 0,
+            'acquisition_year': datetime.now().year
         })
         
-        # Scale features
-        features = self.scaler.fit_transform(customer_data[feature_cols])
+        # Calculate days since last transaction if available
+        customer_data['days_since_last_transaction'] = pd.to_datetime('now') - pd.to_datetime(customer_data['last_transaction_date'])
+        customer_data['days_since_last_transaction'] = customer_data['days_since_last_transaction'].dt.days.fillna(lookback_days)
         
-        return feature_cols, features
+        return customer_data
+    
+    def feature_frame(self, customer_data: pd.DataFrame) -> pd.DataFrame:
+        """Model input columns with missing values filled.
+        
+        Args:
+            customer_data: DataFrame with customer metrics
+        
+        Returns:
+            DataFrame with FEATURE_COLUMNS
+        """
+        return customer_data[FEATURE_COLUMNS].fillna(FEATURE_DEFAULTS)
+    
+    def prepare_features(self, customer_data: pd.DataFrame) -> tuple:
+        """Fit the scaler on customer data and prepare training features.
+        
+        Args:
+            customer_data: DataFrame with customer metrics
+            
+        Returns:
+            Tuple of (feature_names, scaled_features)
+        """
+        features = self.scaler.fit_transform(self.feature_frame(customer_data))
+        
+        return list(FEATURE_COLUMNS), features
+        
+    def transform_features(self, customer_data: pd.DataFrame) -> np.ndarray:
+        """Scale customer data with the already fitted scaler.
+        
+        Args:
+            customer_data: DataFrame with customer metrics
+        
+        Returns:
+            Scaled feature matrix in the order of self.feature_cols
+        """
+        return self.scaler.transform(customer_data[self.feature_cols].fillna(FEATURE_DEFAULTS))
+    
+    def load_model(self, entry: dict):
+        """Use a registered scaler and model instead of training.
+        
+        Args:
+            entry: Model from ChurnModelRegistry.load_latest
+        """
+        self.scaler = entry['scaler']
+        self.model = entry['model']
+        self.feature_cols = entry['feature_cols']
         
     def train_model(self, features: np.ndarray, labels: np.ndarray, feature_cols: list) -> dict:
         """Train the churn prediction model.
@@ -339,17 +362,19 @@ class ChurnRiskPredictor:
             customer_data: DataFrame with customer metrics
             
         Returns:
-            DataFrame with customer IDs and churn probabilities
+            DataFrame with customer IDs, churn probabilities, risk levels, the indices
+            of the top contributing features (FACTOR_COLUMNS, into self.feature_cols)
+            and their names as JSON (contributing_factors)
         """
-        # Prepare features
-        self.feature_cols, features = self.prepare_features(customer_data)
+        # Scale with the fitted scaler; scoring never refits it
+        features = self.transform_features(customer_data)
         
         # Get predictions
         churn_prob = self.model.predict_proba(features)[:, 1]
         
         # Create results DataFrame
         results = pd.DataFrame({
-            'customer_id': customer_data['customer_id'],
+            'customer_id': customer_data['customer_id'].to_numpy(),
             'churn_probability': churn_prob,
             'risk_level': pd.cut(
                 churn_prob,
@@ -358,14 +383,12 @@ class ChurnRiskPredictor:
             )
         })
         
-        # Add top contributing factors
+        # Add top contributing factors for all customers at once
         feature_importance = np.abs(self.model.coef_[0])
-        for i, row in enumerate(features):
-            # Get indices of top 3 contributing features
-            top_features = np.argsort(row * feature_importance)[-3:]
-            results.loc[i, 'contributing_factors'] = json.dumps([
-                self.feature_cols[j] for j in top_features
-            ])
+        factor_indices = top_factor_indices(features * feature_importance)
+        for n, column in enumerate(FACTOR_COLUMNS[:factor_indices.shape[1]]):
+            results[column] = factor_indices[:, n]
+        results['contributing_factors'] = factors_to_json(factor_indices, self.feature_cols)
             
         return results
         
@@ -0,0 +1,209 @@
+"""Registry of fitted churn models.
+
+Each trained model is stored as one row of a writable SQLite file next to the
+customer database (churn_models.db): the fitted StandardScaler and logistic
+regression parameters as JSON arrays, the feature schema they were fitted on, the
+version of the customer database they were trained from and their evaluation
+metrics. Scoring restores the latest model of a lookback window and only calls
+transform and predict_proba; a new model is trained when none exists, when the
+feature schema changed, when the latest one is older than the retraining interval
+or when the scored customers have drifted away from the training distribution.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+# Customer directory, for the shared store helpers
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from database.incremental_store import get_data_version
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS churn_models (
+        version INTEGER PRIMARY KEY AUTOINCREMENT,
+        lookback_days INTEGER NOT NULL,
+        trained_at TEXT NOT NULL,
+        data_version TEXT,
+        training_rows INTEGER NOT NULL,
+        feature_schema TEXT NOT NULL,
+        scaler TEXT NOT NULL,
+        model TEXT NOT NULL,
+        metrics TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_churn_models_lookback ON churn_models (lookback_days, version);
+"""
+
+# Age after which a scheduled retraining is due
+RETRAIN_INTERVAL = timedelta(days=7)
+# Largest shift of a feature mean, in training standard deviations, before retraining
+DRIFT_THRESHOLD = 0.25
+
+def _dump_scaler(scaler: StandardScaler) -> str:
+    return json.dumps({
+        'mean': scaler.mean_.tolist(),
+        'var': scaler.var_.tolist(),
+        'scale': scaler.scale_.tolist(),
+        'n_samples_seen': int(np.max(scaler.n_samples_seen_))
+    })
+
+def _load_scaler(payload: str, feature_cols: List[str]) -> StandardScaler:
+    params = json.loads(payload)
+    scaler = StandardScaler()
+    scaler.mean_ = np.asarray(params['mean'], dtype=float)
+    scaler.var_ = np.asarray(params['var'], dtype=float)
+    scaler.scale_ = np.asarray(params['scale'], dtype=float)
+    scaler.n_samples_seen_ = params['n_samples_seen']
+    scaler.n_features_in_ = len(feature_cols)
+    scaler.feature_names_in_ = np.asarray(feature_cols, dtype=object)
+    return scaler
+
+def _dump_model(model: LogisticRegression) -> str:
+    return json.dumps({
+        'params': model.get_params(),
+        'coef': model.coef_.tolist(),
+        'intercept': model.intercept_.tolist(),
+        'classes': model.classes_.tolist()
+    })
+
+def _load_model(payload: str) -> LogisticRegression:
+    params = json.loads(payload)
+    model = LogisticRegression(**params['params'])
+    model.coef_ = np.asarray(params['coef'], dtype=float)
+    model.intercept_ = np.asarray(params['intercept'], dtype=float)
+    model.classes_ = np.asarray(params['classes'])
+    model.n_features_in_ = model.coef_.shape[1]
+    return model
+
+class ChurnModelRegistry:
+    """Stores, restores and schedules retraining of churn models per lookback window."""
+    
+    _write_lock = threading.Lock()
+    
+    def __init__(self, source_path: str, registry_path: Optional[str] = None):
+        """Initialize the registry.
+        
+        Args:
+            source_path: Path to the customer database the models are trained from
+            registry_path: Optional path to the registry file. Defaults to
+                churn_models.db next to the customer database.
+        """
+        self.source_path = source_path
+        self.registry_path = registry_path or os.path.join(os.path.dirname(source_path), 'churn_models.db')
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.registry_path)
+        conn.executescript(SCHEMA)
+        return conn
+    
+    def save(self, scaler: StandardScaler, model: LogisticRegression, feature_cols: List[str],
+             lookback_days: int, metrics: Dict[str, Any], training_rows: int) -> int:
+        """Store a fitted scaler and model as the latest model of a lookback window.
+        
+        Args:
+            scaler: StandardScaler fitted on the training features
+            model: Fitted LogisticRegression
+            feature_cols: Feature columns, in the order the scaler and model were fitted on
+            lookback_days: Lookback window of the transaction features
+            metrics: Evaluation metrics from ChurnRiskPredictor.train_model
+            training_rows: Number of customers trained on
+        
+        Returns:
+            Version number of the stored model
+        """
+        stored_metrics = {
+            'roc_auc': float(metrics['roc_auc']),
+            'classification_report': metrics['classification_report'],
+            'feature_importance': {name: float(value) for name, value in metrics['feature_importance'].items()}
+        }
+        with self._write_lock:
+            conn = self._connect()
+            try:
+                cursor = conn.execute(
+                    "INSERT INTO churn_models (lookback_days, trained_at, data_version, training_rows, "
+                    "feature_schema, scaler, model, metrics) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (lookback_days, datetime.now().isoformat(timespec='seconds'),
+                     get_data_version(self.source_path), int(training_rows), json.dumps(list(feature_cols)),
+                     _dump_scaler(scaler), _dump_model(model), json.dumps(stored_metrics))
+                )
+                conn.commit()
+                version = cursor.lastrowid
+            finally:
+                conn.close()
+        logger.info(f"Registered churn model version {version} ({lookback_days}-day lookback, {training_rows} customers)")
+        return version
+    
+    def load_latest(self, lookback_days: int) -> Optional[Dict[str, Any]]:
+        """Latest model of a lookback window.
+        
+        Args:
+            lookback_days: Lookback window of the transaction features
+        
+        Returns:
+            Dictionary with version, trained_at, data_version, training_rows,
+            feature_cols, scaler, model and metrics, or None if no model was trained
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT version, trained_at, data_version, training_rows, feature_schema, scaler, model, metrics "
+                "FROM churn_models WHERE lookback_days = ? ORDER BY version DESC LIMIT 1",
+                (lookback_days,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        
+        version, trained_at, data_version, training_rows, schema, scaler, model, metrics = row
+        feature_cols = json.loads(schema)
+        return {
+            'version': version,
+            'trained_at': datetime.fromisoformat(trained_at),
+            'data_version': data_version,
+            'training_rows': training_rows,
+            'feature_cols': feature_cols,
+            'scaler': _load_scaler(scaler, feature_cols),
+            'model': _load_model(model),
+            'metrics': json.loads(metrics)
+        }
+    
+    @staticmethod
+    def retrain_reason(entry: Optional[Dict[str, Any]], feature_cols: List[str],
+                       features: Optional[np.ndarray] = None,
+                       now: Optional[datetime] = None) -> Optional[str]:
+        """Why a registered model should be replaced, or None if it can keep scoring.
+        
+        Args:
+            entry: Model from load_latest (None if there is none)
+            feature_cols: Feature columns the caller scores with
+            features: Optional unscaled feature matrix of the customers about to be
+                scored, checked for drift against the training distribution
+            now: Optional current time (defaults to datetime.now())
+        
+        Returns:
+            'missing', 'schema', 'scheduled' or 'drift', or None
+        """
+        if entry is None:
+            return 'missing'
+        if entry['feature_cols'] != list(feature_cols):
+            return 'schema'
+        if (now or datetime.now()) - entry['trained_at'] >= RETRAIN_INTERVAL:
+            return 'scheduled'
+        if features is not None and len(features):
+            # Scaled training features have zero mean, so the scaled mean is the shift in standard deviations
+            scaler = entry['scaler']
+            shift = np.abs((np.asarray(features, dtype=float).mean(axis=0) - scaler.mean_) / scaler.scale_)
+            if np.nanmax(shift) > DRIFT_THRESHOLD:
+                return 'drift'
+        return None
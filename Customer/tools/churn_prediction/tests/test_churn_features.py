@@ -0,0 +1,141 @@
+import unittest
+import os
+import sys
+import sqlite3
+import tempfile
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import the module to test
+from churn_features import ChurnFeatureStore
+
+class TestChurnFeatureStore(unittest.TestCase):
+    """Test cases for the incremental churn feature store."""
+    
+    def setUp(self):
+        """Create a small customer database."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'customers.db')
+        self.rng = np.random.default_rng(5)
+        # 400 transactions of the last 200 days, some of customers missing from the dimension
+        txn_dates = (pd.Timestamp(date.today())
+                     - pd.to_timedelta(self.rng.integers(0, 200, 400), 'D')
+                     + pd.to_timedelta(self.rng.integers(0, 20, 400), 'h'))
+        transactions = pd.DataFrame({
+            'Customer Key': self.rng.integers(1, 36, 400),
+            'Sales Txn Document': self.rng.integers(1, 150, 400),
+            'Txn Date': txn_dates.strftime('%Y-%m-%d %H:%M:%S'),
+            'Item Number': self.rng.integers(1, 25, 400),
+            'Sales Amount': np.where(self.rng.random(400) < 0.1, np.nan, self.rng.gamma(2, 40, 400).round(2)),
+            'Return Amount': np.where(self.rng.random(400) < 0.5, np.nan, self.rng.gamma(1, 5, 400).round(2))
+        })
+        customers = pd.DataFrame({
+            'Customer Key': np.arange(1, 31),
+            'Customer Status': 'Active',
+            'Credit Status': 'OK',
+            'Credit Limit Amount': self.rng.integers(0, 5000, 30),
+            'Year Acquired': 2015,
+            'Recency Band': 'R1',
+            'Frequency Band': 'F1',
+            'Monetary Band': 'M1'
+        })
+        loyalty = pd.DataFrame({
+            'Customer Number': np.arange(1, 21),
+            'Loyalty Status': 'Gold',
+            'RFM Score': self.rng.integers(1, 6, 20),
+            'Days Since Last Activity': self.rng.integers(0, 200, 20),
+            'Number Sales Txns': self.rng.integers(1, 50, 20),
+            'Avg Sales Amount': self.rng.gamma(2, 30, 20),
+            'LTD Sales Amount': self.rng.gamma(2, 900, 20),
+            'At Risk Customer Count': 0,
+            'Lost Customer Count': 0
+        })
+        with sqlite3.connect(self.db_path) as conn:
+            customers.to_sql('dbo_D_Customer', conn, index=False)
+            loyalty.to_sql('dbo_F_Customer_Loyalty', conn, index=False)
+            transactions.to_sql('dbo_F_Sales_Transaction', conn, index=False)
+        self.store = ChurnFeatureStore(self.db_path)
+    
+    def tearDown(self):
+        self.tmpdir.cleanup()
+    
+    def _expected(self, lookback_days):
+        """Features from the customer database the way they were queried before the store."""
+        with sqlite3.connect(self.db_path) as conn:
+            return pd.read_sql("""
+                SELECT
+                    c."Customer Key" as customer_id,
+                    cl."RFM Score" as rfm_score,
+                    t.unique_transactions, t.avg_sale_amount, t.total_returns, t.unique_products, t.last_transaction_date
+                FROM dbo_D_Customer c
+                LEFT JOIN dbo_F_Customer_Loyalty cl ON cl."Customer Number" = c."Customer Key"
+                LEFT JOIN (
+                    SELECT
+                        st."Customer Key" as customer_id,
+                        COUNT(DISTINCT st."Sales Txn Document") as unique_transactions,
+                        AVG(st."Sales Amount") as avg_sale_amount,
+                        SUM(st."Return Amount") as total_returns,
+                        COUNT(DISTINCT st."Item Number") as unique_products,
+                        MAX(st."Txn Date") as last_transaction_date
+                    FROM dbo_F_Sales_Transaction st
+                    WHERE date(st."Txn Date") >= date(?)
+                    GROUP BY st."Customer Key"
+                ) t ON t.customer_id = c."Customer Key"
+                ORDER BY 1
+            """, conn, params=[(date.today() - timedelta(days=lookback_days)).isoformat()])
+    
+    def _assert_matches(self, lookback_days):
+        expected = self._expected(lookback_days).fillna({'total_returns': 0})
+        actual = self.store.load(lookback_days).sort_values('customer_id').reset_index(drop=True)
+        actual = actual[expected.columns].fillna({'total_returns': 0})
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+    
+    def test_snapshot_matches_transaction_queries(self):
+        """Test that snapshots equal the per-call queries they replace."""
+        for lookback_days in (30, 90):
+            self._assert_matches(lookback_days)
+        self.assertEqual(self.store.refresh()['mode'], 'incremental')
+    
+    def test_incremental_refresh(self):
+        """Test that appended transactions update today's snapshot."""
+        self._assert_matches(90)
+        today = date.today().isoformat()
+        # A new document of a known customer, and a return and a first purchase today
+        new_transactions = pd.DataFrame({
+            'Customer Key': [3, 3, 7, 40],
+            'Sales Txn Document': [500, 500, 501, 502],
+            'Txn Date': [f"{today} 09:00:00", f"{today} 09:00:00", f"{today} 11:30:00", f"{today} 15:00:00"],
+            'Item Number': [4, 30, 4, 12],
+            'Sales Amount': [120.0, 15.5, np.nan, 42.0],
+            'Return Amount': [np.nan, np.nan, 20.0, np.nan]
+        })
+        with sqlite3.connect(self.db_path) as conn:
+            new_transactions.to_sql('dbo_F_Sales_Transaction', conn, index=False, if_exists='append')
+        self.assertFalse(self.store.is_current())
+        self._assert_matches(90)
+        self.assertTrue(self.store.is_current())
+    
+    def test_older_snapshots_are_dropped(self):
+        """Test that building a snapshot drops the older snapshots of its lookback window."""
+        yesterday = date.today() - timedelta(days=1)
+        self.store.load(30, as_of_date=yesterday)
+        self.store.load(90, as_of_date=yesterday)
+        self._assert_matches(30)
+        
+        with sqlite3.connect(self.store.store_path) as conn:
+            snapshots = conn.execute(
+                "SELECT lookback_days, as_of_date FROM feature_snapshots ORDER BY 1"
+            ).fetchall()
+            feature_rows = conn.execute(
+                "SELECT DISTINCT lookback_days, as_of_date FROM churn_features ORDER BY 1"
+            ).fetchall()
+        expected = [(30, date.today().isoformat()), (90, yesterday.isoformat())]
+        self.assertEqual(snapshots, expected)
+        self.assertEqual(feature_rows, expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@ import unittest
 import os
 import sys
 import sqlite3
+import json
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -10,7 +11,7 @@ from datetime import datetime, timedelta
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import the module to test
-from churn_prediction import predict_churn_risk, ChurnRiskPredictor
+from churn_prediction import predict_churn_risk, ChurnRiskPredictor, top_factor_indices, FACTOR_COLUMNS
 
 class TestChurnPrediction(unittest.TestCase):
     """Test cases for the churn prediction tool."""
@@ -140,6 +141,31 @@ class TestChurnPrediction(unittest.TestCase):
         self.assertIn('risk_level', predictions.columns)
         self.assertIn('contributing_factors', predictions.columns)
     
+    def test_contributing_factors_match_sorted_contributions(self):
+        """Test that the vectorized attribution picks the same top factors as a per-row sort."""
+        rng = np.random.default_rng(7)
+        contributions = rng.normal(size=(500, 9))
+        
+        top = top_factor_indices(contributions)
+        expected = np.argsort(contributions, axis=1)[:, ::-1][:, :3]
+        np.testing.assert_array_equal(top, expected)
+        
+        columns = ['rfm_score', 'days_since_last_activity', 'transaction_count', 'avg_transaction_value',
+                   'lifetime_sales', 'at_risk_count', 'lost_count', 'unique_transactions', 'avg_sale_amount',
+                   'total_returns', 'unique_products', 'days_since_last_transaction', 'credit_limit']
+        # Non-consecutive index, as left behind by segment filtering
+        customer_data = pd.DataFrame(rng.gamma(2, 20, (200, len(columns))), columns=columns, index=np.arange(200) * 3)
+        customer_data.insert(0, 'customer_id', np.arange(200))
+        feature_cols, features = self.predictor.prepare_features(customer_data)
+        self.predictor.train_model(features, np.tile([0, 1], 100), feature_cols)
+        
+        predictions = self.predictor.predict_churn_risk(customer_data)
+        factors = predictions['contributing_factors'].apply(json.loads)
+        self.assertEqual(len(predictions), len(customer_data))
+        self.assertTrue(factors.notna().all())
+        for row, names in zip(predictions[FACTOR_COLUMNS].to_numpy(), factors):
+            self.assertEqual(names, [feature_cols[j] for j in row])
+    
     def test_end_to_end_prediction(self):
         """Test the end-to-end churn prediction process."""
         # Run the prediction with a short time period and no visualization
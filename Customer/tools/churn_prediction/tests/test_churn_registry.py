@@ -0,0 +1,74 @@
+import unittest
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import the module to test
+from churn_prediction import ChurnRiskPredictor, FEATURE_COLUMNS
+from churn_registry import ChurnModelRegistry, RETRAIN_INTERVAL
+
+class TestChurnModelRegistry(unittest.TestCase):
+    """Test cases for the churn model registry."""
+    
+    def setUp(self):
+        """Set up a temporary registry and synthetic customers."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.registry = ChurnModelRegistry(os.path.join(self.tmpdir.name, 'customers.db'))
+        rng = np.random.default_rng(11)
+        self.customer_data = pd.DataFrame(rng.gamma(2, 20, (300, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS)
+        self.customer_data.insert(0, 'customer_id', np.arange(300))
+        self.labels = np.tile([0, 0, 1], 100)
+    
+    def tearDown(self):
+        self.tmpdir.cleanup()
+    
+    def _train(self):
+        predictor = ChurnRiskPredictor(self.registry.source_path)
+        feature_cols, features = predictor.prepare_features(self.customer_data)
+        metrics = predictor.train_model(features, self.labels, feature_cols)
+        version = self.registry.save(predictor.scaler, predictor.model, feature_cols, 90, metrics, len(features))
+        return predictor, version
+    
+    def test_restored_model_scores_like_trained_model(self):
+        """Test that a registered model predicts the same as the model that was trained."""
+        trained, version = self._train()
+        entry = self.registry.load_latest(90)
+        self.assertEqual(entry['version'], version)
+        self.assertEqual(entry['feature_cols'], FEATURE_COLUMNS)
+        self.assertIsNone(self.registry.load_latest(30))
+        
+        restored = ChurnRiskPredictor(self.registry.source_path)
+        restored.load_model(entry)
+        # Scoring a subset must not refit the scaler on it
+        subset = self.customer_data.iloc[::7]
+        expected = trained.predict_churn_risk(subset)
+        actual = restored.predict_churn_risk(subset)
+        np.testing.assert_allclose(actual['churn_probability'], expected['churn_probability'])
+        np.testing.assert_allclose(restored.scaler.mean_, trained.scaler.mean_)
+        self.assertEqual(list(actual['contributing_factors']), list(expected['contributing_factors']))
+    
+    def test_retrain_reasons(self):
+        """Test when a registered model is replaced."""
+        self.assertEqual(ChurnModelRegistry.retrain_reason(None, FEATURE_COLUMNS), 'missing')
+        
+        self._train()
+        entry = self.registry.load_latest(90)
+        features = self.customer_data[FEATURE_COLUMNS].to_numpy()
+        self.assertIsNone(ChurnModelRegistry.retrain_reason(entry, FEATURE_COLUMNS, features))
+        self.assertEqual(ChurnModelRegistry.retrain_reason(entry, FEATURE_COLUMNS[:-1], features), 'schema')
+        self.assertEqual(ChurnModelRegistry.retrain_reason(
+            entry, FEATURE_COLUMNS, features, now=entry['trained_at'] + RETRAIN_INTERVAL
+        ), 'scheduled')
+        
+        drifted = features.copy()
+        drifted[:, 0] *= 2
+        self.assertEqual(ChurnModelRegistry.retrain_reason(entry, FEATURE_COLUMNS, drifted), 'drift')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,10 @@
 const sqlite3 = require('sqlite3').verbose();
 const { open } = require('sqlite');
 const path = require('path');
+const fs = require('fs');
+
+// Interval coefficient of variation below which a customer counts as a regular buyer
+const REGULAR_CV_THRESHOLD = 0.5;
 
 /**
  * API endpoint to fetch purchase frequency data from the SQLite database
@@ -19,50 +23,33 @@ export default async function handler(req, res) {
       driver: sqlite3.Database
     });
     
-    // Build the base query
-    let query = `
-      SELECT 
-        s."Customer Key" as customer_id,
-        s."Txn Date" as transaction_date,
-        CAST(s."Net Sales Amount" as FLOAT) as transaction_amount
-      FROM "dbo_F_Sales_Transaction" s
-      WHERE 1=1
-    `;
-    
-    const params = [];
-    
-    // Add date filters if provided
-    if (startDate) {
-      query += ` AND s."Txn Date" >= ?`;
-      params.push(startDate);
-    }
-    
-    if (endDate) {
-      query += ` AND s."Txn Date" <= ?`;
-      params.push(endDate);
+    // Per-customer purchase state (one row per customer), maintained by purchase_state.py
+    let customerStates = await loadPurchaseState(dbPath, startDate, endDate);
+    if (customerStates) {
+      console.log(`DEBUG: Served ${customerStates.length} customers from purchase state`);
+    } else {
+      const transactions = await fetchTransactions(db, startDate, endDate);
+      console.log(`DEBUG: Retrieved ${transactions.length} transactions from database`);
+      customerStates = summarizeTransactions(transactions);
     }
     
-    // Execute the query
-    const transactions = await db.all(query, params);
-    console.log(`DEBUG: Retrieved ${transactions.length} transactions from database`);
-    
     // Process data for different visualizations
-    const frequencyHistogramData = processFrequencyDistributionData(transactions);
+    const frequencyHistogramData = processFrequencyDistributionData(customerStates);
     console.log('DEBUG: Frequency histogram data:', JSON.stringify(frequencyHistogramData, null, 2));
     
-    const valueSegmentData = processValueSegmentData(transactions);
+    const valueSegmentData = processValueSegmentData(customerStates);
     console.log('DEBUG: Value segment data:', JSON.stringify(valueSegmentData, null, 2));
     
-    const regularityData = processRegularityData(transactions);
+    const regularityData = processRegularityData(customerStates);
     console.log('DEBUG: Regularity data:', JSON.stringify(regularityData, null, 2));
     
-    const intervalHeatmapData = processIntervalData(transactions);
+    const intervalHeatmapData = await processIntervalData(db, startDate, endDate);
     console.log('DEBUG: Interval heatmap data:', JSON.stringify({
       dataPoints: intervalHeatmapData.data.length,
       dateRange: intervalHeatmapData.dateRange
     }, null, 2));
     
-    const segmentQuadrantData = processSegmentQuadrantData(transactions);
+    const segmentQuadrantData = processSegmentQuadrantData(customerStates);
     console.log('DEBUG: Segment quadrant data:', JSON.stringify(segmentQuadrantData, null, 2));
     
     // Close the database connection
@@ -89,20 +76,131 @@ export default async function handler(req, res) {
 }
 
 /**
- * Process transaction data to generate frequency distribution histogram data
+ * Build the transaction date filter shared by the transaction queries
  */
-function processFrequencyDistributionData(transactions) {
-  // Group transactions by customer
-  const customerTransactions = {};
+function buildDateFilter(startDate, endDate) {
+  let where = ' WHERE 1=1';
+  const params = [];
+  
+  if (startDate) {
+    where += ` AND s."Txn Date" >= ?`;
+    params.push(startDate);
+  }
+  
+  if (endDate) {
+    where += ` AND s."Txn Date" <= ?`;
+    params.push(endDate);
+  }
+  
+  return { where, params };
+}
+
+/**
+ * Fetch the transaction rows of the date range
+ */
+async function fetchTransactions(db, startDate, endDate) {
+  const { where, params } = buildDateFilter(startDate, endDate);
+  const query = `
+    SELECT 
+      s."Customer Key" as customer_id,
+      s."Txn Date" as transaction_date,
+      CAST(s."Net Sales Amount" as FLOAT) as transaction_amount
+    FROM "dbo_F_Sales_Transaction" s
+    ${where}
+  `;
+  return db.all(query, params);
+}
+
+/**
+ * Load the per-customer purchase state maintained by purchase_state.py
+ * 
+ * Returns null (so the caller falls back to the transactions) if the state file is
+ * missing, older than the customer database, or the date range does not cover
+ * every purchase in it.
+ */
+async function loadPurchaseState(dbPath, startDate, endDate) {
+  const statePath = path.join(path.dirname(dbPath), 'purchase_state.db');
+  if (!fs.existsSync(statePath)) {
+    return null;
+  }
+  
+  const stateDb = await open({
+    filename: statePath,
+    driver: sqlite3.Database,
+    mode: sqlite3.OPEN_READONLY
+  });
+  
+  try {
+    // Same version token as get_data_version in Customer/database/incremental_store.py
+    // (st_mtime_ns-st_size)
+    const stat = fs.statSync(dbPath, { bigint: true });
+    const sourceVersion = `${stat.mtimeNs}-${stat.size}`;
+    const meta = await stateDb.get(`SELECT value FROM state_meta WHERE key = 'source_version'`);
+    if (!meta || meta.value !== sourceVersion) {
+      return null;
+    }
+    
+    const bounds = await stateDb.get(`
+      SELECT MIN(first_purchase) as first, MAX(last_purchase) as last FROM customer_purchase_state
+    `);
+    if (!bounds.first || (startDate && startDate > bounds.first) || (endDate && endDate < bounds.last)) {
+      return null;
+    }
+    
+    return await stateDb.all(`SELECT * FROM customer_purchase_state`);
+  } finally {
+    await stateDb.close();
+  }
+}
+
+/**
+ * Summarize transactions into per-customer purchase state rows
+ * (same fields as the customer_purchase_state table)
+ */
+function summarizeTransactions(transactions) {
+  const customerDates = {};
+  const states = {};
+  
   transactions.forEach(txn => {
-    if (!customerTransactions[txn.customer_id]) {
-      customerTransactions[txn.customer_id] = [];
+    if (!states[txn.customer_id]) {
+      states[txn.customer_id] = {
+        customer_id: txn.customer_id,
+        purchase_count: 0,
+        total_spent: 0
+      };
+      customerDates[txn.customer_id] = [];
     }
-    customerTransactions[txn.customer_id].push(txn);
+    states[txn.customer_id].purchase_count += 1;
+    states[txn.customer_id].total_spent += txn.transaction_amount || 0;
+    customerDates[txn.customer_id].push(txn.transaction_date);
   });
   
+  return Object.values(states).map(state => {
+    const dates = customerDates[state.customer_id].sort();
+    let intervalSum = 0;
+    let intervalSumSquares = 0;
+    for (let i = 1; i < dates.length; i++) {
+      const interval = (new Date(dates[i]) - new Date(dates[i - 1])) / (1000 * 60 * 60 * 24);
+      intervalSum += interval;
+      intervalSumSquares += interval * interval;
+    }
+    return {
+      ...state,
+      first_purchase: dates[0],
+      last_purchase: dates[dates.length - 1],
+      interval_count: dates.length - 1,
+      interval_sum: intervalSum,
+      interval_sum_squares: intervalSumSquares
+    };
+  });
+}
+
+/**
+ * Process customer states to generate frequency distribution histogram data
+ */
+function processFrequencyDistributionData(customerStates) {
   // Calculate purchase frequencies
-  const frequencies = Object.values(customerTransactions).map(txns => txns.length);
+  const frequencies = customerStates.map(customer => customer.purchase_count);
   
   // Count occurrences of each frequency
   const frequencyCounts = {};
@@ -131,23 +229,11 @@ function processFrequencyDistributionData(transactions) {
 }
 
 /**
- * Process transaction data to generate value segment treemap data
+ * Process customer states to generate value segment treemap data
  */
-function processValueSegmentData(transactions) {
-  // Group transactions by customer
-  const customerTransactions = {};
-  transactions.forEach(txn => {
-    if (!customerTransactions[txn.customer_id]) {
-      customerTransactions[txn.customer_id] = [];
-    }
-    customerTransactions[txn.customer_id].push(txn);
-  });
-  
+function processValueSegmentData(customerStates) {
   // Calculate average transaction value for each customer
-  const customerValues = Object.entries(customerTransactions).map(([customerId, txns]) => {
-    const totalSpent = txns.reduce((sum, txn) => sum + txn.transaction_amount, 0);
-    return totalSpent / txns.length;
-  });
+  const customerValues = customerStates.map(customer => customer.total_spent / customer.purchase_count);
   
   // Define segment thresholds
   const avgValue = customerValues.reduce((sum, val) => sum + val, 0) / customerValues.length;
@@ -197,100 +283,93 @@ function processValueSegmentData(transactions) {
 }
 
 /**
- * Process transaction data to generate regularity chart data
+ * Process customer states to generate regularity chart data
+ * 
+ * Customers are grouped by their mean purchase interval; a timeframe's score is the
+ * share of its customers whose interval coefficient of variation is below
+ * REGULAR_CV_THRESHOLD.
  */
-function processRegularityData(transactions) {
-  // Process to find regularity patterns
-  // This is a simplified version - in a real implementation, this would 
-  // analyze actual regularity across different timeframes
-  
-  return [
-    { timeframe: 'Daily', regularity_score: Math.floor(Math.random() * 30) + 40, description: 'Daily shopping pattern' },
-    { timeframe: 'Weekly', regularity_score: Math.floor(Math.random() * 20) + 70, description: 'Weekly shopping pattern' },
-    { timeframe: 'Monthly', regularity_score: Math.floor(Math.random() * 25) + 60, description: 'Monthly purchase pattern' },
-    { timeframe: 'Quarterly', regularity_score: Math.floor(Math.random() * 30) + 40, description: 'Quarterly buying pattern' },
-    { timeframe: 'Annual', regularity_score: Math.floor(Math.random() * 20) + 25, description: 'Annual shopping pattern' }
+function processRegularityData(customerStates) {
+  const timeframes = [
+    { timeframe: 'Daily', maxDays: 2, description: 'Daily shopping pattern' },
+    { timeframe: 'Weekly', maxDays: 10, description: 'Weekly shopping pattern' },
+    { timeframe: 'Monthly', maxDays: 45, description: 'Monthly purchase pattern' },
+    { timeframe: 'Quarterly', maxDays: 120, description: 'Quarterly buying pattern' },
+    { timeframe: 'Annual', maxDays: Infinity, description: 'Annual shopping pattern' }
   ];
+  const totals = timeframes.map(() => ({ customers: 0, regular: 0 }));
+  
+  customerStates.forEach(customer => {
+    // The standard deviation needs at least two intervals
+    if (customer.interval_count < 2) {
+      return;
+    }
+    const mean = customer.interval_sum / customer.interval_count;
+    const variance = (customer.interval_sum_squares - customer.interval_count * mean * mean) / (customer.interval_count - 1);
+    const bucket = timeframes.findIndex(frame => mean <= frame.maxDays);
+    totals[bucket].customers += 1;
+    if (mean > 0 && Math.sqrt(Math.max(0, variance)) / mean < REGULAR_CV_THRESHOLD) {
+      totals[bucket].regular += 1;
+    }
+  });
+  
+  return timeframes.map((frame, i) => ({
+    timeframe: frame.timeframe,
+    regularity_score: totals[i].customers ? Math.round((totals[i].regular / totals[i].customers) * 100) : 0,
+    description: frame.description
+  }));
 }
 
 /**
- * Process transaction data to generate interval heatmap data
+ * Aggregate transaction volume and value by day of week and hour in the database
  */
-function processIntervalData(transactions) {
-  // Convert transaction_date strings to Date objects
-  const txnsWithDate = transactions.map(txn => ({
-    ...txn,
-    date: new Date(txn.transaction_date)
-  }));
-  
-  // Group by day of week and hour
+async function processIntervalData(db, startDate, endDate) {
   const dayMapping = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday'];
-  const heatmapData = [];
-  
-  // Create a map to aggregate data
-  const aggregateData = {};
-  
-  txnsWithDate.forEach(txn => {
-    const day = dayMapping[txn.date.getDay()];
-    const hour = txn.date.getHours();
-    const key = `${day}-${hour}`;
-    
-    if (!aggregateData[key]) {
-      aggregateData[key] = { volume: 0, total_value: 0 };
-    }
-    
-    aggregateData[key].volume += 1;
-    aggregateData[key].total_value += txn.transaction_amount;
-  });
+  const { where, params } = buildDateFilter(startDate, endDate);
+  const rows = await db.all(`
+    SELECT 
+      CAST(strftime('%w', s."Txn Date") AS INTEGER) as weekday,
+      CAST(strftime('%H', s."Txn Date") AS INTEGER) as hour,
+      COUNT(*) as volume,
+      SUM(CAST(s."Net Sales Amount" as FLOAT)) as total_value,
+      MIN(s."Txn Date") as first_date,
+      MAX(s."Txn Date") as last_date
+    FROM "dbo_F_Sales_Transaction" s
+    ${where}
+    GROUP BY weekday, hour
+  `, params);
   
-  // Convert to array format
-  Object.entries(aggregateData).forEach(([key, data]) => {
-    const [day, hour] = key.split('-');
-    heatmapData.push({
-      day,
-      hour: parseInt(hour),
-      volume: data.volume,
-      avg_value: Math.round(data.total_value / data.volume)
-    });
-  });
+  const heatmapData = rows.map(row => ({
+    day: dayMapping[row.weekday],
+    hour: row.hour,
+    volume: row.volume,
+    avg_value: Math.round(row.total_value / row.volume)
+  }));
   
   // Add start and end dates
-  const dates = txnsWithDate.map(txn => txn.date);
-  const startDate = new Date(Math.min(...dates));
-  const endDate = new Date(Math.max(...dates));
+  const firstDates = rows.map(row => row.first_date).sort();
+  const lastDates = rows.map(row => row.last_date).sort();
   
   return {
     data: heatmapData,
     dateRange: {
-      start: startDate.toISOString().split('T')[0],
-      end: endDate.toISOString().split('T')[0]
+      start: firstDates.length ? String(firstDates[0]).slice(0, 10) : null,
+      end: lastDates.length ? String(lastDates[lastDates.length - 1]).slice(0, 10) : null
     }
   };
 }
 
 /**
- * Process transaction data to generate segment quadrant data
+ * Process customer states to generate segment quadrant data
  */
-function processSegmentQuadrantData(transactions) {
-  // Group transactions by customer
-  const customerTransactions = {};
-  transactions.forEach(txn => {
-    if (!customerTransactions[txn.customer_id]) {
-      customerTransactions[txn.customer_id] = [];
-    }
-    customerTransactions[txn.customer_id].push({
-      ...txn,
-      date: new Date(txn.transaction_date)
-    });
-  });
-  
+function processSegmentQuadrantData(customerStates) {
   // Calculate metrics for each customer
-  const customerMetrics = Object.entries(customerTransactions).map(([customerId, txns]) => {
+  const customerMetrics = customerStates.map(customer => {
     // Calculate frequency (number of purchases)
-    const frequency = txns.length;
+    const frequency = customer.purchase_count;
     
     // Calculate recency (days since last purchase)
-    const lastPurchaseDate = new Date(Math.max(...txns.map(t => t.date)));
+    const lastPurchaseDate = new Date(customer.last_purchase);
     const today = new Date();
     const recencyDays = Math.floor((today - lastPurchaseDate) / (1000 * 60 * 60 * 24));
 
@@ -307,10 +386,10 @@ function processSegmentQuadrantData(transactions) {
     }
     
     // Calculate monetary value
-    const monetary = txns.reduce((sum, t) => sum + t.transaction_amount, 0) / frequency;
+    const monetary = customer.total_spent / frequency;
     
     return {
-      id: customerId,
+      id: String(customer.customer_id),
       frequency,
       recency,
       monetary
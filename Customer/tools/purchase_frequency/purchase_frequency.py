@@ -8,14 +8,141 @@ import logging
 import os
 from typing import Dict, Any, Optional, List
 
+from purchase_state import PurchaseStateStore
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+INTERVAL_ENGINES = ('pandas', 'sql', 'state')
+# Interval coefficient of variation below which a customer counts as a regular buyer
+REGULAR_CV_THRESHOLD = 0.5
+
+def _date_filter(start_date: Optional[str], end_date: Optional[str]):
+    """WHERE clause and parameters for the transaction date range."""
+    clauses, params = [], []
+    if start_date:
+        clauses.append('s."Txn Date" >= ?')
+        params.append(start_date)
+    if end_date:
+        clauses.append('s."Txn Date" <= ?')
+        params.append(end_date)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+def _finish_metrics(metrics: pd.DataFrame) -> pd.DataFrame:
+    """Derive the regularity columns shared by both engines."""
+    metrics['avg_interval_days'] = metrics['avg_interval_days'].fillna(0)
+    metrics['regularity_cv'] = metrics['interval_std_days'] / metrics['avg_interval_days'].replace(0, np.nan)
+    return metrics
+
+def compute_customer_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    """Per-customer purchase statistics from transaction rows.
+    
+    Rows are sorted once by customer and date; intervals are the date differences
+    between consecutive rows of the same customer, and every statistic is a single
+    grouped aggregation, so the cost is one sort plus linear passes.
+    
+    Args:
+        df (pd.DataFrame): customer_id, transaction_date (datetime) and transaction_amount columns
+    
+    Returns:
+        DataFrame indexed by customer_id with total_purchases, avg_interval_days,
+        median_interval_days, interval_std_days, regularity_cv, first_purchase,
+        last_purchase, total_spent and avg_transaction
+    """
+    # Sort integer customer codes and raw timestamps rather than the columns themselves
+    codes, customers = pd.factorize(df['customer_id'], sort=True)
+    dates = df['transaction_date'].to_numpy()
+    order = np.lexsort((dates, codes))
+    codes = codes[order]
+    df = pd.DataFrame({
+        'customer': codes,
+        'transaction_date': dates[order],
+        'transaction_amount': df['transaction_amount'].to_numpy()[order]
+    })
+    intervals = df['transaction_date'].diff().dt.total_seconds().to_numpy() / (24 * 3600)
+    # The first row of each customer has no previous purchase
+    intervals[np.r_[True, codes[1:] != codes[:-1]]] = np.nan
+    
+    metrics = df.assign(interval_days=intervals).groupby('customer', sort=False).agg(
+        total_purchases=('transaction_date', 'size'),
+        avg_interval_days=('interval_days', 'mean'),
+        median_interval_days=('interval_days', 'median'),
+        interval_std_days=('interval_days', 'std'),
+        first_purchase=('transaction_date', 'min'),
+        last_purchase=('transaction_date', 'max'),
+        total_spent=('transaction_amount', 'sum'),
+        avg_transaction=('transaction_amount', 'mean')
+    )
+    metrics.index = customers[metrics.index].rename('customer_id')
+    return _finish_metrics(metrics)
+
+def fetch_customer_metrics_sql(conn: sqlite3.Connection, start_date: Optional[str] = None,
+                               end_date: Optional[str] = None) -> pd.DataFrame:
+    """Per-customer purchase statistics computed in SQLite with window functions.
+    
+    Intervals come from LAG over each customer's transactions and the median from
+    ROW_NUMBER over the sorted intervals, so only one row per customer is returned.
+    
+    Args:
+        conn (sqlite3.Connection): Connection to the customer database
+        start_date (Optional[str]): Start date for analysis (YYYY-MM-DD)
+        end_date (Optional[str]): End date for analysis (YYYY-MM-DD)
+    
+    Returns:
+        DataFrame with the same columns as compute_customer_metrics
+    """
+    where, params = _date_filter(start_date, end_date)
+    query = f"""
+    WITH ordered AS (
+        SELECT 
+            s."Customer Key" as customer_id,
+            s."Txn Date" as transaction_date,
+            CAST(s."Net Sales Amount" as FLOAT) as transaction_amount,
+            julianday(s."Txn Date") - julianday(LAG(s."Txn Date") OVER (
+                PARTITION BY s."Customer Key" ORDER BY s."Txn Date"
+            )) as interval_days
+        FROM "dbo_F_Sales_Transaction" s
+        {where}
+    ),
+    ranked AS (
+        SELECT 
+            *,
+            ROW_NUMBER() OVER (PARTITION BY customer_id ORDER BY interval_days) - 1 as interval_rank,
+            COUNT(interval_days) OVER (PARTITION BY customer_id) as interval_count
+        FROM ordered
+    )
+    SELECT 
+        customer_id,
+        COUNT(*) as total_purchases,
+        AVG(interval_days) as avg_interval_days,
+        AVG(CASE WHEN interval_rank IN ((interval_count + 1) / 2, (interval_count + 2) / 2)
+            THEN interval_days END) as median_interval_days,
+        SUM(interval_days * interval_days) as interval_sum_squares,
+        MAX(interval_count) as interval_count,
+        MIN(transaction_date) as first_purchase,
+        MAX(transaction_date) as last_purchase,
+        SUM(transaction_amount) as total_spent,
+        AVG(transaction_amount) as avg_transaction
+    FROM ranked
+    GROUP BY customer_id
+    """
+    metrics = pd.read_sql(query, conn, params=params).set_index('customer_id')
+    
+    # Sample standard deviation from the sums (SQLite may lack SQRT)
+    n = metrics.pop('interval_count')
+    sum_squares = metrics.pop('interval_sum_squares')
+    variance = (sum_squares - n * metrics['avg_interval_days'] ** 2) / (n - 1).where(n > 1)
+    metrics['interval_std_days'] = np.sqrt(variance.clip(lower=0))
+    for column in ('first_purchase', 'last_purchase'):
+        metrics[column] = pd.to_datetime(metrics[column], format='ISO8601')
+    return _finish_metrics(metrics)
+
 def analyze_purchase_frequency(
     start_date: Optional[str] = None, 
     end_date: Optional[str] = None, 
-    customer_segments: Optional[List[str]] = None
+    customer_segments: Optional[List[str]] = None,
+    interval_engine: str = 'pandas'
 ) -> Dict[str, Any]:
     """Analyze customer purchase frequencies and patterns.
     
@@ -23,59 +150,54 @@ def analyze_purchase_frequency(
         start_date (Optional[str]): Start date for analysis (YYYY-MM-DD)
         end_date (Optional[str]): End date for analysis (YYYY-MM-DD)
         customer_segments (Optional[List[str]]): List of customer segments to analyze
+        interval_engine (str): 'pandas' to compute per-customer statistics from the
+            transaction rows, 'sql' to compute them in SQLite window functions, or
+            'state' to read them from the incrementally maintained purchase state
+            (used when the window covers all purchases, otherwise 'sql' is used)
         
     Returns:
         Dict containing text-based analysis of purchase frequency patterns
     """
     try:
+        if interval_engine not in INTERVAL_ENGINES:
+            raise ValueError(f"Invalid interval_engine: {interval_engine}. Must be one of {list(INTERVAL_ENGINES)}")
+        
         # Connect to database
         db_path = "/Users/rahilharihar/Projects/multiagent-googleADK/Project/Customer/database/customers.db"
-        conn = sqlite3.connect(db_path)
         
-        # Build the query
-        query = """
-        SELECT 
-            s."Customer Key" as customer_id,
-            s."Txn Date" as transaction_date,
-            CAST(s."Net Sales Amount" as FLOAT) as transaction_amount
-        FROM "dbo_F_Sales_Transaction" s
-        WHERE 1=1
-        """
+        if interval_engine == 'state':
+            store = PurchaseStateStore(db_path)
+            if not store.is_current():
+                store.refresh()
+            if not store.covers(start_date, end_date):
+                logger.info("Date window does not cover the purchase state, computing intervals in SQL")
+                interval_engine = 'sql'
         
-        if start_date:
-            query += f" AND s.\"Txn Date\" >= '{start_date}'"
-        if end_date:
-            query += f" AND s.\"Txn Date\" <= '{end_date}'"
-            
-        # Execute query and load into DataFrame
-        df = pd.read_sql(query, conn)
-        conn.close()
+        conn = sqlite3.connect(db_path)
         
-        # Convert transaction_date to datetime
-        df['transaction_date'] = pd.to_datetime(df['transaction_date'])
+        try:
+            if interval_engine == 'state':
+                metrics_df = store.load(refresh=False)
+            elif interval_engine == 'sql':
+                metrics_df = fetch_customer_metrics_sql(conn, start_date, end_date)
+            else:
+                where, params = _date_filter(start_date, end_date)
+                query = f"""
+                SELECT 
+                    s."Customer Key" as customer_id,
+                    s."Txn Date" as transaction_date,
+                    CAST(s."Net Sales Amount" as FLOAT) as transaction_amount
+                FROM "dbo_F_Sales_Transaction" s
+                {where}
+                """
+                df = pd.read_sql(query, conn, params=params)
+                df['transaction_date'] = pd.to_datetime(df['transaction_date'], format='ISO8601')
+                metrics_df = compute_customer_metrics(df)
+        finally:
+            conn.close()
         
-        # Calculate key metrics
-        customer_metrics = {}
         insights = []
         
-        for customer_id, group in df.groupby('customer_id'):
-            dates = group['transaction_date'].sort_values()
-            intervals = dates.diff().dropna()
-            
-            metrics = {
-                'total_purchases': len(dates),
-                'avg_interval_days': intervals.dt.total_seconds().mean() / (24 * 3600) if len(intervals) > 0 else 0,
-                'first_purchase': dates.min(),
-                'last_purchase': dates.max(),
-                'total_spent': group['transaction_amount'].sum(),
-                'avg_transaction': group['transaction_amount'].mean()
-            }
-            
-            customer_metrics[customer_id] = metrics
-        
-        # Convert to DataFrame for analysis
-        metrics_df = pd.DataFrame(customer_metrics).T
-        
         # Generate insights
         total_customers = len(metrics_df)
         if total_customers == 0:
@@ -91,6 +213,8 @@ def analyze_purchase_frequency(
         insights.append(f"Total Customers Analyzed: {total_customers}")
         insights.append(f"Average Purchases per Customer: {avg_purchase_frequency:.2f}")
         insights.append(f"Average Days Between Purchases: {avg_interval:.1f}")
+        if metrics_df['median_interval_days'].notna().any():
+            insights.append(f"Median Days Between Purchases: {metrics_df['median_interval_days'].median():.1f}")
         
         # Frequency segments
         high_frequency = metrics_df[metrics_df['total_purchases'] > avg_purchase_frequency * 1.5]
@@ -100,6 +224,9 @@ def analyze_purchase_frequency(
         insights.append(f"- High Frequency Customers (>{avg_purchase_frequency * 1.5:.1f} purchases): {len(high_frequency)} ({len(high_frequency)/total_customers*100:.1f}%)")
         insights.append(f"- Low Frequency Customers (<{avg_purchase_frequency * 0.5:.1f} purchases): {len(low_frequency)} ({len(low_frequency)/total_customers*100:.1f}%)")
         
+        regular = metrics_df[metrics_df['regularity_cv'] < REGULAR_CV_THRESHOLD]
+        insights.append(f"- Regular Buyers (interval CV < {REGULAR_CV_THRESHOLD}): {len(regular)} ({len(regular)/total_customers*100:.1f}%)")
+        
         # Recent purchase patterns
         recent_cutoff = pd.Timestamp.now() - pd.Timedelta(days=90)
         recent_customers = metrics_df[metrics_df['last_purchase'] >= recent_cutoff]
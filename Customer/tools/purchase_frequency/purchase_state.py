@@ -0,0 +1,281 @@
+"""Incrementally maintained per-customer purchase state.
+
+One row per customer with first/last purchase, purchase count, the running sum and
+sum of squares of the days between consecutive purchases, and total spend, kept in
+a writable SQLite file next to the customer database (purchase_state.db). Mean,
+standard deviation and coefficient of variation of the purchase interval follow
+from the sums, so frequency, recency, value and regularity views read one row per
+customer instead of every transaction.
+
+Refreshes only read transactions appended since the last refresh (by rowid). New
+purchases after a customer's last purchase extend the running sums with the gap
+to the previous last purchase; customers with back-dated purchases are recomputed
+from their full history.
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Customer directory, for the shared store helpers
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from database.incremental_store import IncrementalStore
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS customer_purchase_state (
+        customer_id TEXT PRIMARY KEY,
+        first_purchase TEXT,
+        last_purchase TEXT,
+        purchase_count INTEGER NOT NULL,
+        interval_count INTEGER NOT NULL,
+        interval_sum REAL NOT NULL,
+        interval_sum_squares REAL NOT NULL,
+        total_spent REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS state_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+"""
+
+STATE_COLUMNS = ['customer_id', 'first_purchase', 'last_purchase', 'purchase_count', 'interval_count',
+                 'interval_sum', 'interval_sum_squares', 'total_spent']
+# Customers per query when recomputing back-dated histories
+RECOMPUTE_BATCH_SIZE = 500
+
+def summarize_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """Purchase state of each customer from transaction rows.
+    
+    Args:
+        df (pd.DataFrame): customer_id, transaction_date (ISO text) and transaction_amount columns
+    
+    Returns:
+        DataFrame with STATE_COLUMNS, one row per customer
+    """
+    if df.empty:
+        return pd.DataFrame(columns=STATE_COLUMNS)
+    
+    codes, customers = pd.factorize(df['customer_id'].astype(str), sort=True)
+    dates = pd.to_datetime(df['transaction_date'], format='ISO8601').to_numpy()
+    order = np.lexsort((dates, codes))
+    codes, dates = codes[order], dates[order]
+    intervals = np.diff(dates).astype('timedelta64[us]').astype(float) / (24 * 3600 * 1e6)
+    same_customer = codes[1:] == codes[:-1]
+    
+    interval_codes = codes[1:][same_customer]
+    intervals = intervals[same_customer]
+    n_customers = len(customers)
+    # Rows are sorted, so each customer's first and last rows bound its purchases
+    starts = np.r_[0, np.flatnonzero(~same_customer) + 1]
+    ends = np.r_[starts[1:], len(codes)] - 1
+    text_dates = df['transaction_date'].to_numpy()[order]
+    
+    return pd.DataFrame({
+        'customer_id': customers,
+        'first_purchase': text_dates[starts],
+        'last_purchase': text_dates[ends],
+        'purchase_count': np.bincount(codes, minlength=n_customers),
+        'interval_count': np.bincount(interval_codes, minlength=n_customers),
+        'interval_sum': np.bincount(interval_codes, weights=intervals, minlength=n_customers),
+        'interval_sum_squares': np.bincount(interval_codes, weights=intervals ** 2, minlength=n_customers),
+        'total_spent': np.bincount(codes, weights=df['transaction_amount'].fillna(0).to_numpy()[order],
+                                   minlength=n_customers)
+    })
+
+def merge_states(current: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """Extend current customer states with the state of later purchases.
+    
+    Every new purchase must be no earlier than the customer's current last purchase;
+    the gap between the two becomes one more interval.
+    
+    Args:
+        current (pd.DataFrame): Stored states (STATE_COLUMNS) of customers with new purchases
+        new (pd.DataFrame): States of the new purchases only
+    
+    Returns:
+        Merged states for every customer in new
+    """
+    merged = new.merge(current, on='customer_id', how='left', suffixes=('', '_old'))
+    existing = merged['purchase_count_old'].notna()
+    gap = ((pd.to_datetime(merged['first_purchase'], format='ISO8601')
+            - pd.to_datetime(merged['last_purchase_old'], format='ISO8601')).dt.total_seconds()
+           / (24 * 3600)).where(existing, 0.0)
+    
+    merged['first_purchase'] = merged['first_purchase_old'].where(existing, merged['first_purchase'])
+    for column in ('purchase_count', 'interval_count', 'interval_sum', 'interval_sum_squares', 'total_spent'):
+        merged[column] = merged[column] + merged[f'{column}_old'].fillna(0)
+    merged['interval_count'] += existing.astype(int)
+    merged['interval_sum'] += gap
+    merged['interval_sum_squares'] += gap ** 2
+    for column in ('purchase_count', 'interval_count'):
+        merged[column] = merged[column].astype(int)
+    return merged[STATE_COLUMNS]
+
+def state_metrics(state: pd.DataFrame) -> pd.DataFrame:
+    """Interval statistics derived from customer states.
+    
+    Returns:
+        DataFrame indexed by customer_id with the columns of
+        purchase_frequency.compute_customer_metrics (median_interval_days is NaN,
+        as a median cannot be kept as a running sum)
+    """
+    n = state['interval_count']
+    mean = (state['interval_sum'] / n.where(n > 0)).fillna(0)
+    variance = (state['interval_sum_squares'] - n * mean ** 2) / (n - 1).where(n > 1)
+    std = np.sqrt(variance.clip(lower=0))
+    metrics = pd.DataFrame({
+        'total_purchases': state['purchase_count'].astype(int),
+        'avg_interval_days': mean,
+        'median_interval_days': np.nan,
+        'interval_std_days': std,
+        'regularity_cv': std / mean.replace(0, np.nan),
+        'first_purchase': pd.to_datetime(state['first_purchase'], format='ISO8601'),
+        'last_purchase': pd.to_datetime(state['last_purchase'], format='ISO8601'),
+        'total_spent': state['total_spent'],
+        'avg_transaction': state['total_spent'] / state['purchase_count']
+    })
+    metrics.index = pd.Index(state['customer_id'], name='customer_id')
+    return metrics
+
+class PurchaseStateStore(IncrementalStore):
+    """Builds, refreshes and queries the per-customer purchase state."""
+    
+    SCHEMA = SCHEMA
+    STATE_TABLE = "state_meta"
+    
+    def __init__(self, source_path: str, state_path: Optional[str] = None):
+        """Initialize the store.
+        
+        Args:
+            source_path (str): Path to the customer database
+            state_path (Optional[str]): Path to the state file. Defaults to purchase_state.db
+                next to the customer database.
+        """
+        super().__init__(source_path,
+                         state_path or os.path.join(os.path.dirname(source_path), 'purchase_state.db'))
+        self.state_path = self.store_path
+    
+    def _read_transactions(self, source_conn, where: str = "", params: tuple = ()) -> pd.DataFrame:
+        return pd.read_sql(f"""
+            SELECT
+                s."Customer Key" as customer_id,
+                s."Txn Date" as transaction_date,
+                CAST(s."Net Sales Amount" as FLOAT) as transaction_amount
+            FROM "dbo_F_Sales_Transaction" s
+            {where}
+        """, source_conn, params=params)
+    
+    def _read_states(self, conn, customer_ids: List[str]) -> pd.DataFrame:
+        frames = [pd.DataFrame(columns=STATE_COLUMNS)]
+        for start in range(0, len(customer_ids), RECOMPUTE_BATCH_SIZE):
+            batch = customer_ids[start:start + RECOMPUTE_BATCH_SIZE]
+            frames.append(pd.read_sql(
+                f"SELECT * FROM customer_purchase_state WHERE customer_id IN ({','.join('?' for _ in batch)})",
+                conn, params=batch
+            ))
+        return pd.concat(frames, ignore_index=True)
+    
+    def refresh(self, full: bool = False) -> Dict[str, object]:
+        """Bring the state up to date with the customer database.
+        
+        Args:
+            full (bool): Whether to rebuild every customer (needed after in-place corrections)
+        
+        Returns:
+            Dict with the refresh mode and the number of new transactions and updated customers
+        """
+        return super().refresh(full)
+    
+    def _refresh(self, conn: sqlite3.Connection, full: bool) -> Dict[str, object]:
+        source_conn = self._connect_source()
+        try:
+            source_version = self.source_version()
+            max_rowid = self.max_rowid(source_conn)
+            last_rowid = None if full else self._get_state(conn).get('max_rowid')
+            
+            if last_rowid is None:
+                new_rows = self._read_transactions(source_conn)
+                states = summarize_transactions(new_rows)
+                conn.execute("DELETE FROM customer_purchase_state")
+            else:
+                new_rows = self._read_transactions(source_conn, "WHERE s.rowid > ?", (int(last_rowid),))
+                states = self._merge_new_rows(conn, source_conn, new_rows)
+            
+            conn.executemany(
+                f"INSERT OR REPLACE INTO customer_purchase_state VALUES ({','.join('?' for _ in STATE_COLUMNS)})",
+                states[STATE_COLUMNS].itertuples(index=False, name=None)
+            )
+            self._set_state(conn, source_version, max_rowid)
+            conn.commit()
+            
+            mode = "full" if last_rowid is None else "incremental"
+            logger.info(f"Refreshed purchase state ({mode}) from {len(new_rows)} transactions, "
+                        f"{len(states)} customers updated")
+            return {"mode": mode, "transactions": len(new_rows), "customers": len(states)}
+        finally:
+            source_conn.close()
+    
+    def _merge_new_rows(self, conn, source_conn, new_rows: pd.DataFrame) -> pd.DataFrame:
+        """Updated states of the customers with new transactions."""
+        new = summarize_transactions(new_rows)
+        if new.empty:
+            return new
+        
+        current = self._read_states(conn, new['customer_id'].tolist())
+        check = new.merge(current[['customer_id', 'last_purchase']], on='customer_id', how='left',
+                          suffixes=('', '_old'))
+        backdated = (pd.to_datetime(check['first_purchase'], format='ISO8601')
+                     < pd.to_datetime(check['last_purchase_old'], format='ISO8601')).to_numpy()
+        
+        merged = merge_states(current, new[~backdated])
+        if not backdated.any():
+            return merged
+        
+        # Back-dated purchases change intervals inside the history: recompute those customers
+        customer_ids = new.loc[backdated, 'customer_id'].tolist()
+        histories = []
+        for start in range(0, len(customer_ids), RECOMPUTE_BATCH_SIZE):
+            batch = customer_ids[start:start + RECOMPUTE_BATCH_SIZE]
+            histories.append(self._read_transactions(
+                source_conn, f'WHERE CAST(s."Customer Key" AS TEXT) IN ({",".join("?" for _ in batch)})', tuple(batch)
+            ))
+        return pd.concat([merged, summarize_transactions(pd.concat(histories, ignore_index=True))],
+                         ignore_index=True)
+    
+    def covers(self, start_date: Optional[str], end_date: Optional[str]) -> bool:
+        """Whether a date window includes every purchase in the state, so the state answers it exactly."""
+        conn = self._connect()
+        try:
+            first, last = conn.execute(
+                "SELECT MIN(first_purchase), MAX(last_purchase) FROM customer_purchase_state"
+            ).fetchone()
+        finally:
+            conn.close()
+        if first is None:
+            return False
+        return (not start_date or start_date <= first) and (not end_date or end_date >= last)
+    
+    def load(self, refresh: bool = True) -> pd.DataFrame:
+        """Customer metrics derived from the state.
+        
+        Args:
+            refresh (bool): Whether to refresh first if the customer database changed
+        
+        Returns:
+            state_metrics() of every customer
+        """
+        if refresh and not self.is_current():
+            self.refresh()
+        conn = self._connect()
+        try:
+            state = pd.read_sql("SELECT * FROM customer_purchase_state", conn)
+        finally:
+            conn.close()
+        return state_metrics(state)
@@ -1,6 +1,8 @@
 import unittest
 import os
 import sys
+import sqlite3
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock
@@ -9,7 +11,7 @@ from unittest.mock import patch, MagicMock
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import the module to test
-from purchase_frequency import analyze_purchase_frequency
+from purchase_frequency import analyze_purchase_frequency, compute_customer_metrics, fetch_customer_metrics_sql
 
 class TestPurchaseFrequency(unittest.TestCase):
     """Test cases for the purchase frequency analysis tool."""
@@ -99,6 +101,40 @@ class TestPurchaseFrequency(unittest.TestCase):
         self.assertEqual(result['status'], 'error')
         self.assertIn('Failed to analyze purchase frequency', result['report'])
         self.assertIn('Test database error', result['report'])
-
+    
+    def test_interval_engines_agree(self):
+        """Test that the vectorized and SQL interval engines match a per-customer calculation."""
+        rng = np.random.default_rng(3)
+        n = 400
+        transactions = pd.DataFrame({
+            'Customer Key': rng.integers(1, 40, n),
+            'Txn Date': (pd.Timestamp('2019-01-01') + pd.to_timedelta(rng.integers(0, 365 * 24, n), 'h')).strftime('%Y-%m-%d %H:%M:%S'),
+            'Net Sales Amount': rng.gamma(2, 40, n).round(2)
+        })
+        conn = sqlite3.connect(':memory:')
+        transactions.to_sql('dbo_F_Sales_Transaction', conn, index=False)
+        
+        df = pd.DataFrame({
+            'customer_id': transactions['Customer Key'],
+            'transaction_date': pd.to_datetime(transactions['Txn Date']),
+            'transaction_amount': transactions['Net Sales Amount']
+        })
+        vectorized = compute_customer_metrics(df)
+        in_sql = fetch_customer_metrics_sql(conn).reindex(vectorized.index)
+        conn.close()
+        
+        for customer_id, group in df.groupby('customer_id'):
+            intervals = group['transaction_date'].sort_values().diff().dropna().dt.total_seconds() / (24 * 3600)
+            for metrics in (vectorized, in_sql):
+                row = metrics.loc[customer_id]
+                self.assertEqual(row['total_purchases'], len(group))
+                self.assertAlmostEqual(row['avg_interval_days'], intervals.mean() if len(intervals) else 0, places=4)
+                if len(intervals):
+                    self.assertAlmostEqual(row['median_interval_days'], intervals.median(), places=4)
+                if len(intervals) > 1:
+                    self.assertAlmostEqual(row['interval_std_days'], intervals.std(), places=4)
+                self.assertEqual(row['last_purchase'], group['transaction_date'].max())
+                self.assertAlmostEqual(row['total_spent'], group['transaction_amount'].sum(), places=6)
+        
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
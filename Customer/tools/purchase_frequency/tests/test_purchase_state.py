@@ -0,0 +1,85 @@
+import unittest
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import the module to test
+from purchase_frequency import compute_customer_metrics
+from purchase_state import PurchaseStateStore
+
+class TestPurchaseState(unittest.TestCase):
+    """Test cases for the incrementally maintained purchase state."""
+    
+    def setUp(self):
+        """Create a customer database with 500 random transactions of 29 customers in 2019."""
+        rng = np.random.default_rng(1)
+        dates = pd.Timestamp('2019-01-01') + pd.to_timedelta(rng.integers(0, 200 * 24, 500), 'h')
+        self.transactions = pd.DataFrame({
+            'Customer Key': rng.integers(1, 30, 500),
+            'Txn Date': dates.strftime('%Y-%m-%d %H:%M:%S'),
+            'Net Sales Amount': rng.gamma(2, 40, 500).round(2)
+        })
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.db_path = os.path.join(self.tmpdir, 'customers.db')
+        conn = sqlite3.connect(self.db_path)
+        self.transactions.to_sql('dbo_F_Sales_Transaction', conn, index=False)
+        conn.close()
+        self.store = PurchaseStateStore(self.db_path)
+    
+    def assert_matches_transactions(self):
+        """Check the state against metrics computed from every transaction."""
+        expected = compute_customer_metrics(pd.DataFrame({
+            'customer_id': self.transactions['Customer Key'].astype(str),
+            'transaction_date': pd.to_datetime(self.transactions['Txn Date']),
+            'transaction_amount': self.transactions['Net Sales Amount']
+        }))
+        state = self.store.load().reindex(expected.index)
+        for column in ('total_purchases', 'first_purchase', 'last_purchase'):
+            self.assertTrue((state[column] == expected[column]).all(), column)
+        for column in ('avg_interval_days', 'interval_std_days', 'total_spent'):
+            np.testing.assert_allclose(state[column], expected[column], rtol=1e-9, atol=1e-9)
+    
+    def test_full_refresh(self):
+        """Test that a full refresh matches the vectorized per-customer metrics."""
+        self.assertEqual(self.store.refresh()['mode'], 'full')
+        self.assert_matches_transactions()
+        self.assertTrue(self.store.covers(None, None))
+        self.assertTrue(self.store.covers('2019-01-01', '2019-12-31'))
+        self.assertFalse(self.store.covers('2019-03-01', None))
+    
+    def test_incremental_refresh(self):
+        """Test that later and back-dated transactions update the state incrementally."""
+        self.store.refresh()
+        
+        # Later purchases of known and new customers, then back-dated ones
+        later = pd.DataFrame({
+            'Customer Key': [1, 2, 1, 40],
+            'Txn Date': ['2019-08-01 09:00:00', '2019-08-03 12:30:00', '2019-08-20 17:45:00', '2019-08-21 10:00:00'],
+            'Net Sales Amount': [120.0, 35.5, 80.25, 60.0]
+        })
+        backdated = pd.DataFrame({
+            'Customer Key': [3, 4, 41],
+            'Txn Date': ['2018-12-30 08:00:00', '2019-02-05 14:00:00', '2019-02-06 11:15:00'],
+            'Net Sales Amount': [45.0, 99.99, 15.0]
+        })
+        for new_rows in (later, backdated):
+            conn = sqlite3.connect(self.db_path)
+            new_rows.to_sql('dbo_F_Sales_Transaction', conn, index=False, if_exists='append')
+            conn.close()
+            self.transactions = pd.concat([self.transactions, new_rows], ignore_index=True)
+            self.assertFalse(self.store.is_current())
+            result = self.store.refresh()
+            self.assertEqual(result['mode'], 'incremental')
+            self.assertEqual(result['transactions'], len(new_rows))
+            self.assert_matches_transactions()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,296 @@
+"""
+Frequent itemset mining over sparse basket matrices.
+
+Itemsets are mined with FP-Growth: items below the support threshold are pruned,
+identical baskets are collapsed into weighted paths of an FP-tree, and itemsets
+are grown from conditional trees up to a maximum length.
+
+For large periods the baskets are split into partitions (such as months) and
+mined SON-style across a process pool. Any globally frequent itemset is frequent
+in at least one partition, so the union of the per-partition results is a
+complete candidate set; a second parallel pass counts every candidate exactly in
+each partition and the counts are summed.
+"""
+
+import os
+import threading
+import logging
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for partitioned mining (defaults to the CPU count)
+MINING_WORKERS = int(os.environ.get('TRANSACTION_MINING_WORKERS', '0')) or None
+# Fewer transactions than this are mined inline in a single pass
+MIN_PARALLEL_TRANSACTIONS = 50_000
+
+_mining_lock = threading.Lock()
+_mining_executor: Optional[ProcessPoolExecutor] = None
+
+Itemset = Tuple[int, ...]
+
+class BasketMatrix:
+    """
+    Sparse transaction x item incidence matrix.
+    
+    Rows are transactions (sales documents), columns are basket items at the
+    chosen granularity, stored as CSR so memory grows with the number of
+    distinct (transaction, item) lines rather than transactions x items.
+    """
+    
+    def __init__(self, matrix: sparse.csr_matrix, transactions: pd.Index, items: pd.Index):
+        self.matrix = matrix
+        self.transactions = transactions
+        self.items = items
+    
+    @classmethod
+    def from_lines(cls, transaction_ids, items) -> "BasketMatrix":
+        """
+        Build the matrix from parallel arrays of transaction ids and items (one per line).
+        
+        Repeated lines of the same item in a transaction count once.
+        """
+        rows, transactions = pd.factorize(np.asarray(transaction_ids), sort=True)
+        cols, item_index = pd.factorize(np.asarray(items), sort=True)
+        valid = (rows >= 0) & (cols >= 0)
+        matrix = sparse.csr_matrix(
+            (np.ones(int(valid.sum()), dtype=bool), (rows[valid], cols[valid])),
+            shape=(len(transactions), len(item_index))
+        )
+        # Duplicate lines were summed; keep a 0/1 incidence matrix
+        matrix.sum_duplicates()
+        matrix.data[:] = True
+        return cls(matrix, pd.Index(transactions), pd.Index(item_index))
+    
+    @property
+    def n_transactions(self) -> int:
+        return self.matrix.shape[0]
+    
+    def basket_sizes(self) -> np.ndarray:
+        """Number of distinct items in each transaction."""
+        return np.diff(self.matrix.indptr)
+    
+    def item_support(self) -> pd.Series:
+        """Share of transactions containing each item."""
+        counts = np.bincount(self.matrix.indices, minlength=len(self.items))
+        return pd.Series(counts / max(self.n_transactions, 1), index=self.items)
+    
+    def prune(self, min_support: float) -> "BasketMatrix":
+        """
+        Drop items below min_support.
+        
+        Transactions are kept (even if empty) so supports stay relative to all transactions.
+        """
+        keep = np.flatnonzero(self.item_support().to_numpy() >= min_support)
+        return BasketMatrix(self.matrix[:, keep].tocsr(), self.transactions, self.items[keep])
+    
+    def to_frame(self) -> pd.DataFrame:
+        """Sparse boolean DataFrame (transactions x items), as accepted by mlxtend."""
+        frame = pd.DataFrame.sparse.from_spmatrix(
+            self.matrix, index=self.transactions, columns=self.items.astype(str)
+        )
+        return frame.astype(pd.SparseDtype(bool, False))
+
+def min_count(min_support: float, n_transactions: int) -> int:
+    """Smallest transaction count that reaches min_support."""
+    # The tolerance keeps float noise (e.g. 0.01 * 300) from raising the threshold
+    return max(1, int(np.ceil(min_support * n_transactions - 1e-9)))
+
+class _FPNode:
+    __slots__ = ('item', 'count', 'parent', 'children')
+    
+    def __init__(self, item: Optional[int], parent: Optional["_FPNode"]):
+        self.item = item
+        self.count = 0
+        self.parent = parent
+        self.children: Dict[int, "_FPNode"] = {}
+
+def _mine_tree(baskets: List[Tuple[Sequence[int], int]], threshold: int, max_len: Optional[int],
+               suffix: Itemset, found: Dict[Itemset, int]) -> None:
+    """Build an FP-tree from weighted baskets and mine it recursively into found."""
+    counts: Dict[int, int] = defaultdict(int)
+    for basket, weight in baskets:
+        for item in basket:
+            counts[item] += weight
+    # Most frequent items first, so shared prefixes collapse near the root
+    order = sorted((item for item, count in counts.items() if count >= threshold),
+                   key=lambda item: (-counts[item], item))
+    rank = {item: position for position, item in enumerate(order)}
+    
+    root = _FPNode(None, None)
+    header: Dict[int, List[_FPNode]] = defaultdict(list)
+    for basket, weight in baskets:
+        node = root
+        for item in sorted((item for item in basket if item in rank), key=rank.__getitem__):
+            child = node.children.get(item)
+            if child is None:
+                child = node.children[item] = _FPNode(item, node)
+                header[item].append(child)
+            child.count += weight
+            node = child
+    
+    for item in reversed(order):
+        itemset = suffix + (item,)
+        found[tuple(sorted(itemset))] = counts[item]
+        if max_len is not None and len(itemset) >= max_len:
+            continue
+        
+        # Conditional pattern base: prefix paths of every node of this item
+        conditional = []
+        for node in header[item]:
+            path = []
+            parent = node.parent
+            while parent.item is not None:
+                path.append(parent.item)
+                parent = parent.parent
+            if path:
+                conditional.append((path, node.count))
+        if conditional:
+            _mine_tree(conditional, threshold, max_len, itemset, found)
+
+def fp_growth(matrix: sparse.csr_matrix, threshold: int, max_len: Optional[int] = None) -> Dict[Itemset, int]:
+    """
+    Mine frequent itemsets from a boolean transaction x item matrix.
+    
+    Args:
+        matrix: CSR matrix with one row per transaction
+        threshold: Minimum number of transactions containing an itemset
+        max_len: Optional maximum itemset length
+    
+    Returns:
+        Dictionary of sorted column-index tuple -> transaction count
+    """
+    matrix = sparse.csr_matrix(matrix)
+    # Identical baskets become one weighted path
+    baskets = Counter(
+        tuple(matrix.indices[start:end]) for start, end in zip(matrix.indptr[:-1], matrix.indptr[1:])
+    )
+    found: Dict[Itemset, int] = {}
+    _mine_tree([(basket, weight) for basket, weight in baskets.items() if basket],
+               threshold, max_len, (), found)
+    return found
+
+def count_itemsets(matrix: sparse.csr_matrix, itemsets: Sequence[Itemset]) -> np.ndarray:
+    """
+    Count the transactions containing each itemset exactly.
+    
+    Args:
+        matrix: Boolean transaction x item matrix
+        itemsets: Column-index tuples
+    
+    Returns:
+        Array with one count per itemset
+    """
+    columns = sparse.csc_matrix(matrix)
+    columns.sort_indices()
+    rows = [columns.indices[start:end] for start, end in zip(columns.indptr[:-1], columns.indptr[1:])]
+    counts = np.zeros(len(itemsets), dtype=np.int64)
+    for position, itemset in enumerate(itemsets):
+        # Intersect the rarest columns first
+        ordered = sorted(itemset, key=lambda column: rows[column].size)
+        common = rows[ordered[0]]
+        for column in ordered[1:]:
+            if common.size == 0:
+                break
+            common = np.intersect1d(common, rows[column], assume_unique=True)
+        counts[position] = common.size
+    return counts
+
+def _mine_partition(matrix: sparse.csr_matrix, min_support: float, max_len: Optional[int]) -> List[Itemset]:
+    """Locally frequent itemsets of one partition."""
+    return list(fp_growth(matrix, min_count(min_support, matrix.shape[0]), max_len))
+
+def _map_partitions(function, partitions: List[sparse.csr_matrix], *args) -> List:
+    """Apply a function to every partition in the worker pool, inline if processes are unavailable."""
+    global _mining_executor
+    for attempt in range(2):
+        try:
+            with _mining_lock:
+                if _mining_executor is None:
+                    _mining_executor = ProcessPoolExecutor(max_workers=MINING_WORKERS)
+                executor = _mining_executor
+            return list(executor.map(function, partitions, *[[arg] * len(partitions) for arg in args]))
+        except BrokenProcessPool:
+            logger.warning("Itemset mining pool broken, restarting")
+            with _mining_lock:
+                _mining_executor = None
+        except (OSError, NotImplementedError) as e:
+            logger.warning(f"Mining partitions inline: {str(e)}")
+            break
+    return [function(partition, *args) for partition in partitions]
+
+def _count_partition(matrix: sparse.csr_matrix, max_len: Optional[int], min_support: float) -> Dict[Itemset, int]:
+    """Counts of the itemsets of one partition reaching min_support within it."""
+    return fp_growth(matrix, min_count(min_support, matrix.shape[0]), max_len)
+
+def count_partition_itemsets(partitions: List[sparse.csr_matrix], max_len: Optional[int] = None,
+                             min_support: float = 0.0) -> List[Dict[Itemset, int]]:
+    """
+    Exact counts of the locally frequent itemsets of each partition (such as one day).
+    
+    Args:
+        partitions: Boolean transaction x item matrices sharing the same columns
+        max_len: Optional maximum itemset length
+        min_support: Minimum share of a partition's transactions containing an itemset
+            (0 counts every itemset occurring in the partition)
+    
+    Returns:
+        One dictionary of sorted column-index tuple -> transaction count per partition
+    """
+    if len(partitions) < 2 or sum(partition.shape[0] for partition in partitions) < MIN_PARALLEL_TRANSACTIONS:
+        return [_count_partition(partition, max_len, min_support) for partition in partitions]
+    return _map_partitions(_count_partition, partitions, max_len, min_support)
+
+def mine_frequent_itemsets(matrix: sparse.csr_matrix, items: Sequence, min_support: float,
+                           max_len: Optional[int] = None,
+                           partitions: Optional[List[np.ndarray]] = None) -> pd.DataFrame:
+    """
+    Frequent itemsets of a basket matrix, optionally mined per partition in parallel.
+    
+    Args:
+        matrix: Boolean transaction x item matrix
+        items: Item label of each column
+        min_support: Minimum share of all transactions containing an itemset
+        max_len: Optional maximum itemset length
+        partitions: Optional row-index arrays covering every transaction (such as one per month)
+            to mine separately
+    
+    Returns:
+        DataFrame with support and itemsets (frozensets of item labels) columns,
+        as used by mlxtend's association_rules
+    """
+    matrix = sparse.csr_matrix(matrix)
+    n_transactions = matrix.shape[0]
+    threshold = min_count(min_support, n_transactions)
+    
+    # Items that are globally infrequent cannot be part of any frequent itemset
+    keep = np.flatnonzero(np.bincount(matrix.indices, minlength=matrix.shape[1]) >= threshold)
+    pruned = matrix[:, keep].tocsr()
+    
+    if not partitions or len(partitions) < 2 or n_transactions < MIN_PARALLEL_TRANSACTIONS:
+        counts = fp_growth(pruned, threshold, max_len)
+        itemsets = list(counts)
+        supports = np.array([counts[itemset] for itemset in itemsets], dtype=np.int64)
+    else:
+        blocks = [pruned[rows] for rows in partitions if len(rows)]
+        candidates = set()
+        for local in _map_partitions(_mine_partition, blocks, min_support, max_len):
+            candidates.update(local)
+        itemsets = sorted(candidates, key=lambda itemset: (len(itemset), itemset))
+        supports = np.sum(_map_partitions(count_itemsets, blocks, itemsets), axis=0) if itemsets else np.array([])
+        frequent = supports >= threshold
+        itemsets = [itemset for itemset, keep_itemset in zip(itemsets, frequent) if keep_itemset]
+        supports = supports[frequent]
+    
+    labels = np.asarray(items, dtype=object)[keep]
+    return pd.DataFrame({
+        'support': np.asarray(supports, dtype=float) / max(n_transactions, 1),
+        'itemsets': [frozenset(labels[list(itemset)]) for itemset in itemsets]
+    })
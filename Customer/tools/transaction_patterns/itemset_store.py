@@ -0,0 +1,243 @@
+"""
+Persisted daily itemset counts for transaction pattern analysis.
+
+Every transaction (sales document) is assigned to its first day, and for each day
+and basket granularity the exact count of the itemsets occurring that day (up to
+a maximum length) is stored in a writable SQLite file next to the customer
+database, together with the day's transaction total. Frequent itemsets for any
+date window are then a SUM over the window's days filtered by the support
+threshold, instead of a new mining pass over the transactions.
+
+Storing every itemset that occurs is combinatorial in basket size, so a store
+may keep only the itemsets reaching a per-day support floor. This makes merged
+counts approximate, as in lossy counting: an itemset is dropped on a day only if
+it occurs fewer than ceil(floor * day transactions) times, so its merged support
+is low by less than the floor. Supports are lower bounds, and itemsets whose
+window support is below min_support + floor may be missed. With a floor of 0
+every itemset is kept and the merged supports equal a direct mine of the window.
+
+Refreshes are incremental: days from the watermark (the last day counted, which
+may have been partial) are recounted, extended back to the earliest day of any
+rows appended since the last refresh, and then to the first day of any document
+with lines in the recounted days, so no document is counted twice.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from itemset_mining import BasketMatrix, count_partition_itemsets, min_count
+
+# Customer directory, for the shared store helpers
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from database.incremental_store import IncrementalStore
+
+logger = logging.getLogger(__name__)
+
+# Documents with lines on or after a day
+DOCUMENTS_FROM = 'SELECT "Sales Txn Document" FROM dbo_F_Sales_Transaction WHERE "Txn Date" >= ?'
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS itemset_counts (
+        granularity TEXT NOT NULL,
+        day TEXT NOT NULL,
+        itemset TEXT NOT NULL,
+        length INTEGER NOT NULL,
+        count INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_itemset_counts ON itemset_counts (granularity, day);
+    CREATE TABLE IF NOT EXISTS day_totals (
+        granularity TEXT NOT NULL,
+        day TEXT NOT NULL,
+        transactions INTEGER NOT NULL,
+        PRIMARY KEY (granularity, day)
+    );
+    CREATE TABLE IF NOT EXISTS store_state (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+"""
+
+def encode_itemset(labels) -> str:
+    """Canonical text key of an itemset (sorted JSON list of item labels)."""
+    return json.dumps(sorted(str(label) for label in labels))
+
+class ItemsetStore(IncrementalStore):
+    """Builds, refreshes and queries the daily itemset counts of one basket granularity."""
+    
+    SCHEMA = SCHEMA
+    
+    def __init__(self, source_path: str, item_column: str, granularity: str,
+                 store_path: Optional[str] = None, max_len: int = 4, support_floor: float = 0.0):
+        """
+        Initialize the store.
+        
+        Args:
+            source_path: Path to the customer database
+            item_column: Quoted dbo_F_Sales_Transaction column holding the basket item
+            granularity: Name of the basket granularity (rows are kept per granularity)
+            store_path: Optional path to the store file. Defaults to itemset_counts.db
+                next to the customer database.
+            max_len: Longest itemset counted
+            support_floor: Minimum share of a day's transactions containing an itemset
+                for its count that day to be stored (0 stores every itemset)
+        """
+        # Granularities share the store file, each under its own state keys
+        super().__init__(source_path,
+                         store_path or os.path.join(os.path.dirname(source_path), 'itemset_counts.db'),
+                         state_prefix=f"{granularity}.")
+        self.item_column = item_column
+        self.granularity = granularity
+        self.max_len = max_len
+        self.support_floor = support_floor
+    
+    def settings(self) -> Dict[str, str]:
+        """Itemset length and support floor the stored counts were taken with."""
+        return {'max_len': str(self.max_len), 'support_floor': str(self.support_floor)}
+    
+    def refresh(self, full: bool = False) -> Dict[str, object]:
+        """
+        Bring the store up to date with the customer database.
+        
+        Args:
+            full: Whether to recount every day (needed after in-place corrections to older transactions)
+        
+        Returns:
+            Dictionary with the refresh mode, the first recounted day and the number of days counted
+        """
+        return super().refresh(full)
+    
+    def _refresh(self, conn: sqlite3.Connection, full: bool) -> Dict[str, object]:
+        source_conn = self._connect_source()
+        try:
+            state = self._get_state(conn)
+            source_version = self.source_version()
+            max_rowid = self.max_rowid(source_conn)
+            since = None if full else self.rebuild_from(state, source_conn)
+            if since:
+                since = self._first_document_day(source_conn, since)
+            
+            totals, counts = self._count_days(source_conn, since)
+            
+            day_filter, params = ("AND day >= ?", (self.granularity, since)) if since else ("", (self.granularity,))
+            conn.execute(f"DELETE FROM itemset_counts WHERE granularity = ? {day_filter}", params)
+            conn.execute(f"DELETE FROM day_totals WHERE granularity = ? {day_filter}", params)
+            conn.executemany("INSERT INTO day_totals VALUES (?, ?, ?)",
+                             ((self.granularity, day, int(n)) for day, n in totals.items()))
+            conn.executemany("INSERT INTO itemset_counts VALUES (?, ?, ?, ?, ?)",
+                             ((self.granularity, day, itemset, length, count)
+                              for day, itemset, length, count in counts))
+            
+            self._set_state(conn, source_version, max_rowid,
+                            watermark=max(totals.index) if len(totals) else state.get('watermark'))
+            conn.commit()
+            
+            logger.info(f"Refreshed {self.granularity} itemset counts ({'incremental' if since else 'full'}) "
+                        f"for {len(totals)} days")
+            return {
+                "mode": "incremental" if since else "full",
+                "recounted_from": since or (min(totals.index) if len(totals) else None),
+                "days": len(totals)
+            }
+        finally:
+            source_conn.close()
+    
+    @staticmethod
+    def _first_document_day(source_conn, since: str) -> str:
+        """Earliest first day of the documents with lines on or after since (at most since)."""
+        first_day = source_conn.execute(
+            'SELECT MIN(date("Txn Date")) FROM dbo_F_Sales_Transaction '
+            f'WHERE "Sales Txn Document" IN ({DOCUMENTS_FROM})', (since,)
+        ).fetchone()[0]
+        return min(since, first_day) if first_day else since
+    
+    def _count_days(self, source_conn, since: Optional[str]) -> Tuple[pd.Series, list]:
+        """Transactions per day and (day, itemset, length, count) rows for days from since."""
+        query = f"""
+            SELECT DISTINCT
+                "Sales Txn Document" as transaction_id,
+                date("Txn Date") as day,
+                {self.item_column} as item
+            FROM dbo_F_Sales_Transaction
+        """
+        params = ()
+        if since:
+            # Every line of the documents with lines in the recounted days
+            query += f' WHERE "Sales Txn Document" IN ({DOCUMENTS_FROM})'
+            params = (since,)
+        lines = pd.read_sql_query(query, source_conn, params=params)
+        
+        # A transaction belongs to its first day
+        lines['day'] = lines.groupby('transaction_id')['day'].transform('min')
+        if since:
+            lines = lines[lines['day'] >= since]
+        if lines.empty:
+            return pd.Series(dtype=int), []
+        basket = BasketMatrix.from_lines(lines['transaction_id'].to_numpy(), lines['item'].to_numpy())
+        days = lines.drop_duplicates('transaction_id').set_index('transaction_id')['day'].reindex(basket.transactions)
+        rows_by_day = pd.Series(np.arange(basket.n_transactions)).groupby(days.to_numpy()).indices
+        
+        day_names = sorted(rows_by_day)
+        day_counts = count_partition_itemsets([basket.matrix[rows_by_day[day]] for day in day_names],
+                                              self.max_len, self.support_floor)
+        labels = np.asarray(basket.items, dtype=object)
+        counts = []
+        for day, itemsets in zip(day_names, day_counts):
+            for itemset, count in itemsets.items():
+                counts.append((day, encode_itemset(labels[list(itemset)]), len(itemset), count))
+        totals = pd.Series({day: len(rows_by_day[day]) for day in day_names})
+        return totals, counts
+    
+    def frequent_itemsets(self, start_date: Optional[str], end_date: Optional[str],
+                          min_support: float, max_len: Optional[int] = None,
+                          refresh: bool = True) -> Tuple[pd.DataFrame, int]:
+        """
+        Frequent itemsets of a date window merged from the daily counts.
+        
+        With a support floor, supports are low by less than the floor (see the
+        module docstring).
+        
+        Args:
+            start_date: Optional first day (YYYY-MM-DD); defaults to the earliest day
+            end_date: Optional last day (YYYY-MM-DD); defaults to the latest day
+            min_support: Minimum share of the window's transactions containing an itemset
+            max_len: Optional maximum itemset length (at most the store's max_len)
+            refresh: Whether to refresh the store first if the customer database changed
+        
+        Returns:
+            Tuple of a DataFrame with support and itemsets (frozensets of item labels)
+            columns, and the number of transactions in the window
+        """
+        if refresh and not self.is_current():
+            self.refresh()
+        
+        window = [self.granularity, start_date or '0000-00-00', end_date or '9999-99-99']
+        conn = self._connect()
+        try:
+            n_transactions = conn.execute(
+                "SELECT COALESCE(SUM(transactions), 0) FROM day_totals WHERE granularity = ? AND day BETWEEN ? AND ?",
+                window
+            ).fetchone()[0]
+            if n_transactions == 0:
+                return pd.DataFrame(columns=['support', 'itemsets']), 0
+            
+            merged = pd.read_sql_query("""
+                SELECT itemset, SUM(count) as count
+                FROM itemset_counts
+                WHERE granularity = ? AND day BETWEEN ? AND ? AND length <= ?
+                GROUP BY itemset
+                HAVING SUM(count) >= ?
+            """, conn, params=window + [max_len or self.max_len, min_count(min_support, n_transactions)])
+        finally:
+            conn.close()
+        
+        return pd.DataFrame({
+            'support': merged['count'].to_numpy(dtype=float) / n_transactions,
+            'itemsets': [frozenset(json.loads(itemset)) for itemset in merged['itemset']]
+        }), int(n_transactions)
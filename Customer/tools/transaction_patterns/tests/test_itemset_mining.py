@@ -0,0 +1,64 @@
+import unittest
+import os
+import sys
+from itertools import combinations
+from unittest.mock import patch
+
+import numpy as np
+from scipy import sparse
+
+# Add tool directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import itemset_mining
+from itemset_mining import count_itemsets, fp_growth, min_count, mine_frequent_itemsets
+
+class TestItemsetMining(unittest.TestCase):
+    """Test cases for FP-Growth and partitioned itemset mining."""
+    
+    def setUp(self):
+        """Create random baskets with a few correlated items."""
+        rng = np.random.default_rng(7)
+        n_transactions, n_items = 2000, 12
+        dense = rng.random((n_transactions, n_items)) < np.linspace(0.4, 0.02, n_items)
+        # Item 1 mostly comes with item 0
+        dense[:, 1] |= dense[:, 0] & (rng.random(n_transactions) < 0.5)
+        self.matrix = sparse.csr_matrix(dense)
+        self.dense = dense
+        self.items = [f"item_{i}" for i in range(n_items)]
+    
+    def brute_force(self, threshold, max_len):
+        """Count every itemset up to max_len directly."""
+        found = {}
+        for length in range(1, max_len + 1):
+            for itemset in combinations(range(self.dense.shape[1]), length):
+                count = int(self.dense[:, list(itemset)].all(axis=1).sum())
+                if count >= threshold:
+                    found[itemset] = count
+        return found
+    
+    def test_fp_growth_matches_brute_force(self):
+        """Test that FP-Growth finds exactly the frequent itemsets with their counts."""
+        threshold = min_count(0.02, self.dense.shape[0])
+        self.assertEqual(fp_growth(self.matrix, threshold, max_len=3), self.brute_force(threshold, 3))
+    
+    def test_count_itemsets(self):
+        """Test exact candidate counting on the sparse columns."""
+        counts = count_itemsets(self.matrix, [(0,), (0, 1), (0, 1, 2)])
+        expected = [int(self.dense[:, list(c)].all(axis=1).sum()) for c in [(0,), (0, 1), (0, 1, 2)]]
+        self.assertEqual(counts.tolist(), expected)
+    
+    def test_partitioned_mining_matches_single_pass(self):
+        """Test that mining date partitions finds the same itemsets and supports."""
+        single = mine_frequent_itemsets(self.matrix, self.items, 0.02, max_len=3)
+        partitions = np.array_split(np.arange(self.dense.shape[0]), 5)
+        with patch.object(itemset_mining, 'MIN_PARALLEL_TRANSACTIONS', 0):
+            partitioned = mine_frequent_itemsets(self.matrix, self.items, 0.02, max_len=3,
+                                                 partitions=partitions)
+        
+        self.assertEqual(dict(zip(single['itemsets'], single['support'])),
+                         dict(zip(partitioned['itemsets'], partitioned['support'])))
+        self.assertIn(frozenset({"item_0", "item_1"}), set(partitioned['itemsets']))
+
+if __name__ == '__main__':
+    unittest.main()
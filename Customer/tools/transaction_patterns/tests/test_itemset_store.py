@@ -0,0 +1,135 @@
+import unittest
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Add tool directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from itemset_mining import BasketMatrix, mine_frequent_itemsets
+from itemset_store import ItemsetStore
+
+class TestItemsetStore(unittest.TestCase):
+    """Test cases for the daily itemset count store."""
+    
+    def setUp(self):
+        """Create a customer database with 600 random baskets over 20 days."""
+        rng = np.random.default_rng(1)
+        document = rng.integers(0, 600, 1800)
+        self.lines = pd.DataFrame({
+            'Sales Txn Document': [f"D{d}" for d in document],
+            'Txn Date': (pd.Timestamp('2019-01-01') + pd.to_timedelta(document % 20, 'D')).strftime('%Y-%m-%d 10:00:00'),
+            'Item Category Hrchy Key': rng.choice(list('ABCDEF'), 1800, p=[.3, .25, .2, .1, .1, .05])
+        })
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.db_path = os.path.join(self.tmpdir, 'customers.db')
+        conn = sqlite3.connect(self.db_path)
+        self.lines.to_sql('dbo_F_Sales_Transaction', conn, index=False)
+        conn.close()
+        self.store = ItemsetStore(self.db_path, '"Item Category Hrchy Key"', 'category', max_len=3)
+    
+    def mine_directly(self, start, end):
+        """Frequent itemsets mined from the raw lines of a window."""
+        days = self.lines['Txn Date'].str[:10]
+        window = self.lines[(days >= start) & (days <= end)]
+        basket = BasketMatrix.from_lines(window['Sales Txn Document'], window['Item Category Hrchy Key'])
+        itemsets = mine_frequent_itemsets(basket.matrix, basket.items, 0.05, max_len=3)
+        return dict(zip(itemsets['itemsets'], itemsets['support'])), basket.n_transactions
+    
+    def test_window_merge_matches_direct_mining(self):
+        """Test that merged daily counts give the same supports as mining the window."""
+        self.assertEqual(self.store.refresh()['mode'], 'full')
+        
+        for start, end in [('2019-01-01', '2019-01-20'), ('2019-01-05', '2019-01-11')]:
+            merged, n_transactions = self.store.frequent_itemsets(start, end, 0.05)
+            expected, expected_transactions = self.mine_directly(start, end)
+            self.assertEqual(n_transactions, expected_transactions)
+            self.assertEqual(set(merged['itemsets']), set(expected))
+            for itemset, support in zip(merged['itemsets'], merged['support']):
+                self.assertAlmostEqual(support, expected[itemset])
+    
+    def test_support_floor_bounds_merged_supports(self):
+        """Test that a per-day support floor stores fewer counts and undercounts by less than the floor."""
+        floor = 0.1
+        floored = ItemsetStore(self.db_path, '"Item Category Hrchy Key"', 'category',
+                               store_path=os.path.join(self.tmpdir, 'floored.db'), max_len=3, support_floor=floor)
+        self.store.refresh()
+        floored.refresh()
+        row_count = lambda store: sqlite3.connect(store.store_path).execute(
+            "SELECT COUNT(*) FROM itemset_counts").fetchone()[0]
+        self.assertLess(row_count(floored), row_count(self.store))
+        
+        merged, _ = floored.frequent_itemsets('2019-01-01', '2019-01-20', 0.05)
+        expected, _ = self.mine_directly('2019-01-01', '2019-01-20')
+        supports = dict(zip(merged['itemsets'], merged['support']))
+        for itemset, support in expected.items():
+            if support >= 0.05 + floor:
+                self.assertIn(itemset, supports)
+            if itemset in supports:
+                self.assertLessEqual(supports[itemset], support + 1e-12)
+                self.assertLess(support - supports[itemset], floor)
+        self.assertTrue(set(supports) <= set(expected))
+        
+        # Changing the floor recounts every day
+        floored.support_floor = 0.0
+        self.assertFalse(floored.is_current())
+        self.assertEqual(floored.refresh()['mode'], 'full')
+    
+    def test_incremental_refresh(self):
+        """Test that appended days are counted without recounting older days."""
+        self.store.refresh()
+        self.assertTrue(self.store.is_current())
+        
+        # 200 more baskets from the watermark day to 2019-01-24
+        rng = np.random.default_rng(2)
+        document = rng.integers(0, 200, 600)
+        new_lines = pd.DataFrame({
+            'Sales Txn Document': [f"N{d}" for d in document],
+            'Txn Date': (pd.Timestamp('2019-01-20') + pd.to_timedelta(document % 5, 'D')).strftime('%Y-%m-%d 10:00:00'),
+            'Item Category Hrchy Key': rng.choice(list('ABCDEF'), 600, p=[.3, .25, .2, .1, .1, .05])
+        })
+        conn = sqlite3.connect(self.db_path)
+        new_lines.to_sql('dbo_F_Sales_Transaction', conn, index=False, if_exists='append')
+        conn.close()
+        self.lines = pd.concat([self.lines, new_lines], ignore_index=True)
+        self.assertFalse(self.store.is_current())
+        
+        # Querying refreshes from the watermark day on
+        merged, n_transactions = self.store.frequent_itemsets('2019-01-15', '2019-01-24', 0.05)
+        expected, expected_transactions = self.mine_directly('2019-01-15', '2019-01-24')
+        self.assertEqual(n_transactions, expected_transactions)
+        self.assertEqual(dict(zip(merged['itemsets'], merged['support'])), expected)
+        self.assertEqual(self.store.refresh()['recounted_from'], '2019-01-24')
+    
+    def test_incremental_refresh_of_a_document_spanning_days(self):
+        """Test that a document with lines before and on the watermark day is counted once, on its first day."""
+        self.store.refresh()
+        
+        # A line on the watermark day for a document of the day before
+        document = self.lines.loc[self.lines['Txn Date'].str.startswith('2019-01-19'), 'Sales Txn Document'].iloc[0]
+        new_line = pd.DataFrame({
+            'Sales Txn Document': [document],
+            'Txn Date': ['2019-01-20 10:00:00'],
+            'Item Category Hrchy Key': ['F']
+        })
+        conn = sqlite3.connect(self.db_path)
+        new_line.to_sql('dbo_F_Sales_Transaction', conn, index=False, if_exists='append')
+        conn.close()
+        self.lines = pd.concat([self.lines, new_line], ignore_index=True)
+        
+        self.assertEqual(self.store.refresh()['recounted_from'], '2019-01-19')
+        merged, n_transactions = self.store.frequent_itemsets('2019-01-01', '2019-01-20', 0.05)
+        expected, expected_transactions = self.mine_directly('2019-01-01', '2019-01-20')
+        self.assertEqual(n_transactions, expected_transactions)
+        self.assertEqual(set(merged['itemsets']), set(expected))
+        for itemset, support in zip(merged['itemsets'], merged['support']):
+            self.assertAlmostEqual(support, expected[itemset])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,7 +9,7 @@ from unittest.mock import patch, MagicMock
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 # Import the module to test
-from transaction_patterns import TransactionPatternAnalyzer, analyze_transaction_patterns
+from transaction_patterns import BasketMatrix, TransactionPatternAnalyzer, analyze_transaction_patterns
 
 class TestTransactionPatterns(unittest.TestCase):
     """Test cases for the transaction patterns analysis tool."""
@@ -54,17 +54,38 @@ class TestTransactionPatterns(unittest.TestCase):
         
     def test_basket_analysis_functionality(self):
         """Test that the basket analysis functionality works correctly."""
-        # Get some transaction data (use a specific date range with known data)
-        data = self.analyzer._fetch_transaction_data("2019-01-01", "2019-12-31")
+        # Get some basket lines (use a specific date range with known data)
+        lines = self.analyzer._fetch_basket_lines("2019-01-01", "2019-12-31")
         
         # Ensure we got data
-        self.assertFalse(data.empty, "Should be able to fetch data from the database")
+        self.assertFalse(lines.empty, "Should be able to fetch data from the database")
         
         # Now test the basket matrix creation
-        basket_matrix = self.analyzer._create_basket_matrix(data)
+        basket = self.analyzer._create_basket_matrix(lines)
         
         # Verify the basket matrix has the right structure
-        self.assertIsInstance(basket_matrix, pd.DataFrame)
+        self.assertIsInstance(basket, BasketMatrix)
+        self.assertIsInstance(basket.to_frame(), pd.DataFrame)
+        
+    def test_basket_matrix_from_lines(self):
+        """Test the sparse basket matrix built from transaction lines."""
+        basket = BasketMatrix.from_lines(
+            ["D1", "D1", "D1", "D2", "D3", "D3"],
+            ["milk", "bread", "milk", "milk", "bread", "eggs"]
+        )
+        
+        # Repeated lines count once per transaction
+        self.assertEqual(basket.matrix.shape, (3, 3))
+        self.assertEqual(basket.basket_sizes().tolist(), [2, 1, 2])
+        self.assertAlmostEqual(basket.item_support()["milk"], 2 / 3)
+        
+        # Pruning drops rare items but keeps every transaction
+        pruned = basket.prune(0.5)
+        self.assertEqual(list(pruned.items), ["bread", "milk"])
+        self.assertEqual(pruned.n_transactions, 3)
+        
+        frame = pruned.to_frame()
+        self.assertEqual(frame.loc["D2"].tolist(), [False, True])
         
     def test_anomaly_detection(self):
         """Test that the anomaly detection functionality works correctly."""
@@ -4,61 +4,96 @@ from datetime import datetime, timedelta
 import sqlite3
 import logging
 import os
-from typing import Dict, List, Optional
-from mlxtend.frequent_patterns import apriori, association_rules
+from typing import Dict, List, Optional, Tuple
+from mlxtend.frequent_patterns import association_rules
 from sklearn.ensemble import IsolationForest
 
+from itemset_mining import BasketMatrix, mine_frequent_itemsets
+from itemset_store import ItemsetStore
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Basket granularity -> dbo_F_Sales_Transaction column holding the basket item
+BASKET_GRANULARITIES = {
+    'item': '"Item Number"',
+    'category': '"Item Category Hrchy Key"',
+    'subcategory': '"Item Subcategory"'
+}
+# Minimum share of transactions containing an itemset
+MIN_SUPPORT = 0.01
+# Longest itemset mined for association rules
+MAX_ITEMSET_LEN = 4
+# Per-day support below which the itemset store drops an itemset's daily count.
+# Categories are few enough to count exactly; item and subcategory baskets are not.
+STORE_SUPPORT_FLOORS = {
+    'item': MIN_SUPPORT / 4,
+    'category': 0.0,
+    'subcategory': MIN_SUPPORT / 4
+}
+# Date partitions mined in parallel (pandas period frequency)
+PARTITION_FREQ = 'M'
+
 class TransactionPatternAnalyzer:
     """Analyzes transaction patterns and identifies anomalies."""
     
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, granularity: str = 'category', store_path: Optional[str] = None):
+        if granularity not in BASKET_GRANULARITIES:
+            raise ValueError(f"Invalid granularity: {granularity}. Must be one of {list(BASKET_GRANULARITIES)}")
         self.db_path = db_path
+        self.granularity = granularity
+        self.itemset_store = ItemsetStore(
+            db_path,
+            BASKET_GRANULARITIES[granularity],
+            granularity,
+            store_path=store_path,
+            max_len=MAX_ITEMSET_LEN,
+            support_floor=STORE_SUPPORT_FLOORS[granularity]
+        )
         self.anomaly_detector = IsolationForest(
             contamination=0.1,
             random_state=42
         )
+    
+    def _date_filter(self, start_date: Optional[str], end_date: Optional[str]) -> Tuple[str, list]:
+        if start_date and end_date:
+            return 'WHERE t."Txn Date" BETWEEN ? AND ?', [start_date, end_date]
+        return "", []
         
     def _fetch_transaction_data(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
+        """One row per transaction (sales document) with its value, timing and basket size."""
         try:
             conn = sqlite3.connect(self.db_path)
-            date_filter = ""
-            if start_date and end_date:
-                date_filter = f"WHERE t.\"Txn Date\" BETWEEN '{start_date}' AND '{end_date}'"
+            date_filter, params = self._date_filter(start_date, end_date)
             
             query = f"""
-            WITH TransactionDetails AS (
-                SELECT 
-                    t."Sales Txn Key" as transaction_id,
-                    t."Customer Key" as customer_id,
-                    t."Txn Date" as timestamp,
-                    t."Net Sales Amount" as total_value,
-                    t."Unit of Measure" as payment_method,
-                    GROUP_CONCAT(i."Item Category Hrchy Key", ';') as product_categories,
-                    t."Location Code" as location,
-                    t."Discount Reason" as promotion_applied
-                FROM 
-                    dbo_F_Sales_Transaction t
-                LEFT JOIN 
-                    dbo_F_Sales_Transaction i ON t."Item Category Hrchy Key" = i."Item Category Hrchy Key"
-                {date_filter}
-                GROUP BY 
-                    t."Sales Txn Key"
-            )
-            SELECT * FROM TransactionDetails
+            SELECT 
+                t."Sales Txn Document" as transaction_id,
+                MIN(t."Customer Key") as customer_id,
+                MIN(t."Txn Date") as timestamp,
+                SUM(t."Net Sales Amount") as total_value,
+                MIN(t."Unit of Measure") as payment_method,
+                COUNT(DISTINCT t.{BASKET_GRANULARITIES[self.granularity]}) as products_count,
+                MIN(t."Location Code") as location,
+                MAX(t."Discount Reason") as promotion_applied
+            FROM 
+                dbo_F_Sales_Transaction t
+            {date_filter}
+            GROUP BY 
+                t."Sales Txn Document"
             """
             
-            data = pd.read_sql_query(query, conn)
+            try:
+                data = pd.read_sql_query(query, conn, params=params)
+            finally:
+                conn.close()
             
             if data.empty:
                 logger.warning("No transaction data found")
                 return pd.DataFrame()
             
             data['timestamp'] = pd.to_datetime(data['timestamp'])
-            data['product_categories'] = data['product_categories'].fillna('').str.split(';')
             
             return data
             
@@ -66,20 +101,65 @@ class TransactionPatternAnalyzer:
             logger.error(f"Error fetching transaction data: {str(e)}")
             return pd.DataFrame()
 
-    def _create_basket_matrix(self, transactions: pd.DataFrame) -> pd.DataFrame:
-        basket_data = transactions.explode('product_categories')
-        basket_matrix = pd.crosstab(
-            basket_data['transaction_id'],
-            basket_data['product_categories']
-        ).astype(bool)
-        return basket_matrix
+    def _fetch_basket_lines(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
+        """Distinct (transaction, item) lines at the analyzer's granularity."""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            date_filter, params = self._date_filter(start_date, end_date)
+            item_column = BASKET_GRANULARITIES[self.granularity]
+            
+            query = f"""
+            SELECT DISTINCT
+                t."Sales Txn Document" as transaction_id,
+                t.{item_column} as item
+            FROM 
+                dbo_F_Sales_Transaction t
+            {date_filter}
+            """
+            
+            try:
+                return pd.read_sql_query(query, conn, params=params)
+            finally:
+                conn.close()
+                
+        except Exception as e:
+            logger.error(f"Error fetching basket lines: {str(e)}")
+            return pd.DataFrame(columns=['transaction_id', 'item'])
+    
+    def _create_basket_matrix(self, lines: pd.DataFrame) -> BasketMatrix:
+        """Sparse transaction x item matrix from basket lines."""
+        return BasketMatrix.from_lines(lines['transaction_id'].to_numpy(), lines['item'].to_numpy())
 
+    def _date_partitions(self, basket: BasketMatrix, transactions: pd.DataFrame) -> List[np.ndarray]:
+        """Basket row positions grouped by the PARTITION_FREQ period of each transaction."""
+        timestamps = transactions.set_index('transaction_id')['timestamp'].reindex(basket.transactions)
+        periods = pd.Series(timestamps.dt.to_period(PARTITION_FREQ).to_numpy())
+        return list(pd.Series(np.arange(basket.n_transactions)).groupby(periods, dropna=False).indices.values())
+    
+    def _frequent_itemsets(self, start_date: Optional[str], end_date: Optional[str],
+                           transactions: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+        """Frequent itemsets of the window from the daily count store, mined directly if it is unavailable."""
+        try:
+            return self.itemset_store.frequent_itemsets(start_date, end_date, MIN_SUPPORT, MAX_ITEMSET_LEN)
+        except sqlite3.Error as e:
+            logger.warning(f"Itemset store unavailable, mining the window directly: {str(e)}")
+        
+        basket = self._create_basket_matrix(self._fetch_basket_lines(start_date, end_date))
+        frequent_itemsets = mine_frequent_itemsets(
+            basket.matrix,
+            basket.items.astype(str),
+            min_support=MIN_SUPPORT,
+            max_len=MAX_ITEMSET_LEN,
+            partitions=self._date_partitions(basket, transactions)
+        )
+        return frequent_itemsets, basket.n_transactions
+    
     def _detect_anomalies(self, transactions: pd.DataFrame) -> np.ndarray:
         features = pd.DataFrame({
             'total_value': transactions['total_value'],
             'hour': transactions['timestamp'].dt.hour,
             'day_of_week': transactions['timestamp'].dt.dayofweek,
-            'products_count': transactions['product_categories'].str.len()
+            'products_count': transactions['products_count']
         })
         
         self.anomaly_detector.fit(features)
@@ -91,18 +171,13 @@ class TransactionPatternAnalyzer:
         if data.empty:
             return "No transaction data available for analysis."
         
-        basket_matrix = self._create_basket_matrix(data)
-        
         try:
-            frequent_itemsets = apriori(
-                basket_matrix,
-                min_support=0.01,
-                use_colnames=True
-            )
+            frequent_itemsets, n_transactions = self._frequent_itemsets(start_date, end_date, data)
             
             if len(frequent_itemsets) > 0:
                 rules = association_rules(
                     frequent_itemsets,
+                    num_itemsets=n_transactions,
                     metric="lift",
                     min_threshold=1.0
                 )
@@ -163,13 +238,15 @@ class TransactionPatternAnalyzer:
         
         return "\n".join(insights)
 
-def analyze_transaction_patterns(start_date: Optional[str] = None, end_date: Optional[str] = None) -> str:
+def analyze_transaction_patterns(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                                 granularity: str = 'category') -> str:
     """
     Analyze transaction patterns and return insights in markdown format.
     
     Args:
         start_date (str, optional): Start date for analysis (YYYY-MM-DD). Defaults to 30 days ago.
         end_date (str, optional): End date for analysis (YYYY-MM-DD). Defaults to today.
+        granularity (str, optional): Basket item level: 'item', 'category' or 'subcategory'.
     
     Returns:
         str: Markdown formatted analysis results
@@ -181,5 +258,5 @@ def analyze_transaction_patterns(start_date: Optional[str] = None, end_date: Opt
         start_date = "2019-01-01"
     
     db_path = "/Users/rahilharihar/Projects/multiagent-googleADK/Project/Customer/database/customers.db"
-    analyzer = TransactionPatternAnalyzer(db_path)
+    analyzer = TransactionPatternAnalyzer(db_path, granularity)
     return analyzer.analyze_patterns(start_date, end_date) 
\ No newline at end of file
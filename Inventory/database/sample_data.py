@@ -0,0 +1,79 @@
+"""
+Sample inventory and sales data for the Inventory tools.
+
+The analyzers fall back to this data when the inventory database cannot be
+read, so their demonstrations and tests run without it. Generation is
+vectorized: one inventory row per product and warehouse, and one candidate
+sale per product, warehouse and day, kept with a per-item chance of sale.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+SAMPLE_PRODUCTS = [
+    {"Item Key": 1, "Item Number": "P1001", "Item Name": "Premium Widget", "Item Category": "Widgets", "Unit Cost": 45.00},
+    {"Item Key": 2, "Item Number": "P1002", "Item Name": "Standard Widget", "Item Category": "Widgets", "Unit Cost": 25.00},
+    {"Item Key": 3, "Item Number": "P2001", "Item Name": "Deluxe Gadget", "Item Category": "Gadgets", "Unit Cost": 65.00},
+    {"Item Key": 4, "Item Number": "P2002", "Item Name": "Basic Gadget", "Item Category": "Gadgets", "Unit Cost": 35.00},
+    {"Item Key": 5, "Item Number": "P3001", "Item Name": "Professional Tool", "Item Category": "Tools", "Unit Cost": 85.00}
+]
+
+SAMPLE_WAREHOUSES = [
+    {"Warehouse Key": 1, "Warehouse ID": "WH001", "Warehouse Name": "Main Distribution Center"},
+    {"Warehouse Key": 2, "Warehouse ID": "WH002", "Warehouse Name": "East Coast Facility"},
+    {"Warehouse Key": 3, "Warehouse ID": "WH003", "Warehouse Name": "West Coast Facility"}
+]
+
+# Items that sell more often and in larger quantities
+POPULAR_ITEM_KEYS = [1, 3]
+
+def generate_sample_data(days: Optional[int] = None,
+                         products: Optional[List[Dict]] = None,
+                         warehouses: Optional[List[Dict]] = None) -> Tuple[pd.DataFrame, Optional[pd.DataFrame]]:
+    """
+    Generate sample inventory and daily sales data.
+    
+    Seeds NumPy's global random generator with 42, so the data is reproducible.
+    
+    Args:
+        days: Number of days of sales up to today, or None for inventory only
+        products: Product rows. Defaults to SAMPLE_PRODUCTS.
+        warehouses: Warehouse rows. Defaults to SAMPLE_WAREHOUSES.
+    
+    Returns:
+        Tuple of (inventory with product and warehouse columns, Current Stock and
+        Snapshot Date; sales with product and warehouse columns, Transaction_Date
+        and Quantity, or None without days)
+    """
+    products = products or SAMPLE_PRODUCTS
+    warehouses = warehouses or SAMPLE_WAREHOUSES
+    np.random.seed(42)  # For reproducibility
+    today = datetime.now().date()
+    
+    # One row per product and warehouse
+    inventory_df = pd.DataFrame(products).merge(pd.DataFrame(warehouses), how="cross")
+    inventory_df["Current Stock"] = np.random.randint(50, 500, len(inventory_df))
+    inventory_df["Snapshot Date"] = today.strftime("%Y-%m-%d")
+    if days is None:
+        return inventory_df, None
+    
+    date_range = pd.date_range(start=today - timedelta(days=days), end=today, freq='D')
+    
+    # One candidate sale per product, warehouse and day
+    pair_columns = list(products[0]) + list(warehouses[0])
+    sales_df = inventory_df.loc[np.repeat(inventory_df.index.values, len(date_range)), pair_columns]
+    sales_df = sales_df.reset_index(drop=True)
+    sales_df["Transaction_Date"] = np.tile(date_range.strftime("%Y-%m-%d"), len(inventory_df))
+    
+    # More frequent and larger sales for popular items
+    popular = sales_df["Item Key"].isin(POPULAR_ITEM_KEYS).values
+    sold = np.random.random(len(sales_df)) < np.where(popular, 0.7, 0.3)  # 70% / 30% chance of sale
+    sales_df["Quantity"] = np.where(popular,
+                                    np.random.randint(1, 10, len(sales_df)),
+                                    np.random.randint(1, 5, len(sales_df)))
+    sales_df = sales_df[sold].reset_index(drop=True)
+    
+    return inventory_df, sales_df
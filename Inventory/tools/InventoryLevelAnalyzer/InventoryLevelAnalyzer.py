@@ -13,6 +13,7 @@ import sys
 # Use the proper import path for the centralized database connector
 try:
     from ...database.connector import DatabaseConnector
+    from ...database import sample_data
 except (ImportError, ValueError):
     # When running as script or in test from local directory
     # Add the project root to path
@@ -20,6 +21,7 @@ except (ImportError, ValueError):
     if project_root not in sys.path:
         sys.path.insert(0, project_root)
     from Inventory.database.connector import DatabaseConnector
+    from Inventory.database import sample_data
 
 # Setup logger
 logger = logging.getLogger(__name__)
@@ -229,73 +231,7 @@ def parse_time_period(time_period: str) -> tuple:
 
 def generate_sample_data() -> tuple:
     """Generate sample inventory and sales data for demonstration"""
-    # Create a list of sample products
-    products = [
-        {"Item Key": 1, "Item Number": "P1001", "Item Name": "Premium Widget", "Item Category": "Widgets", "Unit Cost": 45.00},
-        {"Item Key": 2, "Item Number": "P1002", "Item Name": "Standard Widget", "Item Category": "Widgets", "Unit Cost": 25.00},
-        {"Item Key": 3, "Item Number": "P2001", "Item Name": "Deluxe Gadget", "Item Category": "Gadgets", "Unit Cost": 65.00},
-        {"Item Key": 4, "Item Number": "P2002", "Item Name": "Basic Gadget", "Item Category": "Gadgets", "Unit Cost": 35.00},
-        {"Item Key": 5, "Item Number": "P3001", "Item Name": "Professional Tool", "Item Category": "Tools", "Unit Cost": 85.00}
-    ]
-    
-    # Create a list of sample warehouses
-    warehouses = [
-        {"Warehouse Key": 1, "Warehouse ID": "WH001", "Warehouse Name": "Main Distribution Center"},
-        {"Warehouse Key": 2, "Warehouse ID": "WH002", "Warehouse Name": "East Coast Facility"},
-        {"Warehouse Key": 3, "Warehouse ID": "WH003", "Warehouse Name": "West Coast Facility"}
-    ]
-    
-    # Generate sample inventory data
-    np.random.seed(42)  # For reproducibility
-    
-    inventory_data = []
-    today = datetime.now().date()
-    
-    for product in products:
-        for warehouse in warehouses:
-            # Generate random inventory data
-            current_stock = np.random.randint(50, 500)
-            
-            inventory_data.append({
-                **product,
-                **warehouse,
-                "Current Stock": current_stock,
-                "Snapshot Date": today.strftime("%Y-%m-%d")
-            })
-    
-    # Generate sample sales data for the analyzed period
-    sales_data = []
-    end_date = datetime.now().date()
-    start_date = end_date - timedelta(days=90)  # Last quarter
-    
-    date_range = pd.date_range(start=start_date, end=end_date, freq='D')
-    
-    for product in products:
-        for warehouse in warehouses:
-            # Generate random sales data for each day
-            for date in date_range:
-                # More frequent sales for some products
-                if product["Item Key"] in [1, 3]:  # Popular items
-                    if np.random.random() < 0.7:  # 70% chance of sale
-                        quantity = np.random.randint(1, 10)
-                else:  # Less popular items
-                    if np.random.random() < 0.3:  # 30% chance of sale
-                        quantity = np.random.randint(1, 5)
-                    else:
-                        continue
-                
-                sales_data.append({
-                    **product,
-                    **warehouse,
-                    "Transaction_Date": date.strftime("%Y-%m-%d"),
-                    "Quantity": quantity
-                })
-    
-    # Convert to DataFrames
-    inventory_df = pd.DataFrame(inventory_data)
-    sales_df = pd.DataFrame(sales_data)
-    
-    return inventory_df, sales_df
+    return sample_data.generate_sample_data(days=90)  # Last quarter
 
 def calculate_inventory_levels(data: pd.DataFrame, sales_data: pd.DataFrame, min_stock_threshold: float) -> pd.DataFrame:
     """Calculate inventory levels and identify potential risks"""
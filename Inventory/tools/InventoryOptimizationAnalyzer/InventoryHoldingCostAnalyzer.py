@@ -10,6 +10,7 @@ import sys
 # Add the project root to the path so we can import our modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
 from orchestration_agent.database.connector import DatabaseConnector
+from Inventory.database import sample_data
 
 # Setup logger
 logger = logging.getLogger(__name__)
@@ -168,48 +169,29 @@ def parse_time_period(time_period: str) -> tuple:
     
     return start_date, today
 
+# Sample products and warehouses with the attributes holding costs depend on
+HOLDING_COST_PRODUCTS = [
+    {"Item Key": 1, "Item Number": "P1001", "Item Name": "Premium Widget", "Item Category": "Widgets", "Unit Cost": 45.00, "Lead Time Days": 7, "Obsolescence Risk": 0.1, "Storage Requirements": "Standard"},
+    {"Item Key": 2, "Item Number": "P1002", "Item Name": "Standard Widget", "Item Category": "Widgets", "Unit Cost": 25.00, "Lead Time Days": 5, "Obsolescence Risk": 0.05, "Storage Requirements": "Standard"},
+    {"Item Key": 3, "Item Number": "P2001", "Item Name": "Deluxe Gadget", "Item Category": "Gadgets", "Unit Cost": 65.00, "Lead Time Days": 10, "Obsolescence Risk": 0.15, "Storage Requirements": "Special"},
+    {"Item Key": 4, "Item Number": "P2002", "Item Name": "Basic Gadget", "Item Category": "Gadgets", "Unit Cost": 35.00, "Lead Time Days": 7, "Obsolescence Risk": 0.08, "Storage Requirements": "Standard"},
+    {"Item Key": 5, "Item Number": "P3001", "Item Name": "Professional Tool", "Item Category": "Tools", "Unit Cost": 85.00, "Lead Time Days": 14, "Obsolescence Risk": 0.2, "Storage Requirements": "Special"}
+]
+
+HOLDING_COST_WAREHOUSES = [
+    {"Warehouse Key": 1, "Warehouse ID": "WH001", "Warehouse Name": "Main Distribution Center", "Storage Cost Per Unit": 0.5, "Warehouse Type": "Standard"},
+    {"Warehouse Key": 2, "Warehouse ID": "WH002", "Warehouse Name": "East Coast Facility", "Storage Cost Per Unit": 0.6, "Warehouse Type": "Standard"},
+    {"Warehouse Key": 3, "Warehouse ID": "WH003", "Warehouse Name": "West Coast Facility", "Storage Cost Per Unit": 0.7, "Warehouse Type": "Special"}
+]
+
 def generate_sample_data() -> pd.DataFrame:
     """Generate sample inventory data for demonstration"""
-    # Create a list of sample products
-    products = [
-        {"Item Key": 1, "Item Number": "P1001", "Item Name": "Premium Widget", "Item Category": "Widgets", "Unit Cost": 45.00, "Lead Time Days": 7, "Obsolescence Risk": 0.1, "Storage Requirements": "Standard"},
-        {"Item Key": 2, "Item Number": "P1002", "Item Name": "Standard Widget", "Item Category": "Widgets", "Unit Cost": 25.00, "Lead Time Days": 5, "Obsolescence Risk": 0.05, "Storage Requirements": "Standard"},
-        {"Item Key": 3, "Item Number": "P2001", "Item Name": "Deluxe Gadget", "Item Category": "Gadgets", "Unit Cost": 65.00, "Lead Time Days": 10, "Obsolescence Risk": 0.15, "Storage Requirements": "Special"},
-        {"Item Key": 4, "Item Number": "P2002", "Item Name": "Basic Gadget", "Item Category": "Gadgets", "Unit Cost": 35.00, "Lead Time Days": 7, "Obsolescence Risk": 0.08, "Storage Requirements": "Standard"},
-        {"Item Key": 5, "Item Number": "P3001", "Item Name": "Professional Tool", "Item Category": "Tools", "Unit Cost": 85.00, "Lead Time Days": 14, "Obsolescence Risk": 0.2, "Storage Requirements": "Special"}
-    ]
-    
-    # Create a list of sample warehouses
-    warehouses = [
-        {"Warehouse Key": 1, "Warehouse ID": "WH001", "Warehouse Name": "Main Distribution Center", "Storage Cost Per Unit": 0.5, "Warehouse Type": "Standard"},
-        {"Warehouse Key": 2, "Warehouse ID": "WH002", "Warehouse Name": "East Coast Facility", "Storage Cost Per Unit": 0.6, "Warehouse Type": "Standard"},
-        {"Warehouse Key": 3, "Warehouse ID": "WH003", "Warehouse Name": "West Coast Facility", "Storage Cost Per Unit": 0.7, "Warehouse Type": "Special"}
-    ]
-    
-    # Generate sample inventory data
-    np.random.seed(42)  # For reproducibility
-    
-    inventory_data = []
-    today = datetime.now().date()
+    inventory_df, _ = sample_data.generate_sample_data(products=HOLDING_COST_PRODUCTS,
+                                                       warehouses=HOLDING_COST_WAREHOUSES)
+    # Random variation around current stock
+    inventory_df["Average Stock Level"] = inventory_df["Current Stock"] * np.random.uniform(0.8, 1.2, len(inventory_df))
     
-    for product in products:
-        for warehouse in warehouses:
-            # Generate random inventory data
-            current_stock = np.random.randint(50, 500)
-            average_stock = current_stock * np.random.uniform(0.8, 1.2)  # Random variation around current stock
-            
-            inventory_data.append({
-                **product,
-                **warehouse,
-                "Current Stock": current_stock,
-                "Average Stock Level": average_stock,
-                "Snapshot Date": today.strftime("%Y-%m-%d")
-            })
-    
-    # Convert to DataFrame
-    df = pd.DataFrame(inventory_data)
-    
-    return df
+    return inventory_df
 
 def calculate_holding_costs(data: pd.DataFrame, annual_holding_cost_percentage: float, opportunity_cost_rate: float) -> pd.DataFrame:
     """Calculate holding costs and related metrics"""
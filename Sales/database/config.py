@@ -14,6 +14,24 @@ DATABASE = {
     ))
 }
 
+# Pre-aggregated trend cube (writable, derived from the sales database)
+TREND_CUBE = {
+    'path': os.path.abspath(os.path.join(
+        os.path.dirname(os.path.dirname(__file__)),
+        'database',
+        'trend_cube.db'
+    ))
+}
+
+# Regional aggregate by day and geography (writable, derived from the sales database)
+REGIONAL_AGGREGATE = {
+    'path': os.path.abspath(os.path.join(
+        os.path.dirname(os.path.dirname(__file__)),
+        'database',
+        'regional_aggregate.db'
+    ))
+}
+
 # Logging configuration
 LOGGING = {
     'level': 'INFO',
@@ -3,10 +3,14 @@ Database connection utilities for the Sales Analytics Multi-Agent System.
 Enforces read-only mode for all database operations.
 """
 
+import os
 import sqlite3
 import logging
+import threading
 from pathlib import Path
+from typing import Dict, List, Optional
 from . import config
+from . import incremental_store
 
 # Configure logging
 logging.basicConfig(
@@ -16,16 +20,117 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class PooledConnection(sqlite3.Connection):
+    """A read-only SQLite connection that returns itself to its pool on close()."""
+    
+    pool = None
+    pool_key = None
+    released = False
+    
+    def close(self):
+        """Hand the connection back to its pool, or really close it if the pool is full."""
+        if self.released:
+            # Already back in the pool: a second close() must not hand it out twice
+            return
+        if self.pool is not None and self.pool.release(self):
+            return
+        super().close()
+
+class ConnectionPool:
+    """
+    Per-process pool of read-only SQLite connections.
+    
+    Long-lived processes (such as the analytics service workers) enable the pool
+    so that every analyzer call reuses already-open connections instead of
+    reopening the database file twice per request.
+    """
+    
+    def __init__(self, max_idle: int = 8):
+        self.max_idle = max_idle
+        self._idle: Dict[str, List[PooledConnection]] = {}
+        self._lock = threading.Lock()
+    
+    def acquire(self, db_path: str, row_factory=None) -> PooledConnection:
+        """Get an idle connection for db_path, opening a new one if none is available."""
+        db_path = str(db_path)
+        with self._lock:
+            idle = self._idle.get(db_path)
+            conn = idle.pop() if idle else None
+        if conn is None:
+            conn = sqlite3.connect(
+                f'file:{db_path}?mode=ro',
+                uri=True,
+                factory=PooledConnection,
+                check_same_thread=False
+            )
+            conn.pool = self
+            conn.pool_key = db_path
+        conn.released = False
+        conn.row_factory = row_factory
+        return conn
+    
+    def release(self, conn: PooledConnection) -> bool:
+        """Return a connection to the pool. Returns False if the pool is full."""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            idle = self._idle.setdefault(conn.pool_key, [])
+            if len(idle) >= self.max_idle:
+                return False
+            idle.append(conn)
+            conn.released = True
+            return True
+    
+    def close_all(self):
+        """Close every idle connection held by the pool."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn in connections:
+                conn.pool = None
+                conn.released = False
+                conn.close()
+
+_pool: Optional[ConnectionPool] = None
+
+def enable_connection_pool(max_idle: int = 8) -> ConnectionPool:
+    """Make get_connection() hand out pooled connections for the rest of this process."""
+    global _pool
+    if _pool is None:
+        _pool = ConnectionPool(max_idle=max_idle)
+    return _pool
+
+def disable_connection_pool():
+    """Stop pooling and close any idle pooled connections."""
+    global _pool
+    if _pool is not None:
+        _pool.close_all()
+        _pool = None
+
+def get_data_version(db_path: Optional[str] = None) -> Optional[str]:
+    """
+    Get a token that changes whenever the database file is modified.
+    
+    Used as part of cache keys so cached results are dropped after a data load.
+    
+    Args:
+        db_path: Optional path to the database file. Defaults to config.DATABASE['path'].
+        
+    Returns:
+        Version token string, or None if the database file does not exist
+    """
+    return incremental_store.get_data_version(db_path or config.DATABASE['path'])
+
 class ReadOnlyConnection:
     """A wrapper for SQLite connection that enforces read-only operations."""
     
-    def __init__(self, db_path):
+    def __init__(self, db_path, conn=None):
         self.db_path = Path(db_path)
         if not self.db_path.exists():
             raise FileNotFoundError(f"Database file not found: {db_path}")
         
-        # Open connection in read-only mode
-        self.conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+        # Open connection in read-only mode, unless an (already read-only) pooled one is given
+        self.conn = conn or sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
         self.conn.row_factory = sqlite3.Row  # Enable dictionary-like access to rows
         
     def execute(self, query, params=None):
@@ -61,6 +166,12 @@ def get_connection():
     """Get a read-only database connection."""
     try:
         db_path = config.DATABASE['path']
+        if _pool is not None:
+            if not Path(db_path).exists():
+                raise FileNotFoundError(f"Database file not found: {db_path}")
+            conn = _pool.acquire(db_path)
+            wrapper = ReadOnlyConnection(db_path, conn=_pool.acquire(db_path, row_factory=sqlite3.Row))
+            return conn, wrapper
         # Create a regular connection for pandas
         conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
         # Create the wrapper for our custom operations
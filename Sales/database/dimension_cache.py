@@ -0,0 +1,180 @@
+"""
+In-memory dimension dictionaries for the Sales Analytics Multi-Agent System.
+
+Fact-table queries can aggregate on integer keys only and attach names and
+categories to the (much smaller) aggregated result afterwards, instead of joining
+wide dimension strings onto every fact row. Each dimension table is loaded once
+per database version into a key index plus compact categorical attribute arrays.
+Only the item dimension is cached: the SalesPerformanceAnalyzer groupings already
+aggregate in SQL on the customer and organization names themselves.
+"""
+
+import logging
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import config, connection
+
+logger = logging.getLogger(__name__)
+
+# Dimension name -> (table, key column, {output column: source column})
+DIMENSIONS = {
+    'item': ('dbo_D_Item', 'Item Key', {
+        'product_name': 'Item Desc',
+        'category': 'Item Category Desc',
+        'subcategory': 'Item Subcategory Desc'
+    })
+}
+
+class DimensionTable:
+    """Key -> attribute lookup for one dimension table."""
+    
+    def __init__(self, name: str, data: pd.DataFrame, key_column: str):
+        """
+        Build the lookup from a dimension DataFrame.
+        
+        Args:
+            name: Dimension name
+            data: DataFrame with the key column and one column per attribute
+            key_column: Name of the key column in data
+        """
+        self.name = name
+        data = data.drop_duplicates(subset=[key_column])
+        self.index = pd.Index(data[key_column].to_numpy())
+        # Repeated strings (categories, regions) are stored once, rows keep integer codes
+        self.attributes: Dict[str, pd.Categorical] = {
+            column: pd.Categorical(data[column].to_numpy(dtype=object))
+            for column in data.columns if column != key_column
+        }
+    
+    def __len__(self) -> int:
+        return len(self.index)
+    
+    def lookup(self, keys, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Look up attributes for an array of keys.
+        
+        Args:
+            keys: Array-like of dimension keys
+            columns: Attribute columns to return. Defaults to all attributes.
+        
+        Returns:
+            DataFrame aligned with keys; unknown keys get None (like a LEFT JOIN)
+        """
+        positions = self.index.get_indexer(np.asarray(keys))
+        missing = positions < 0
+        result = {}
+        for column in columns or list(self.attributes):
+            attribute = self.attributes[column]
+            # Code -1 (unknown key or NULL attribute) picks the trailing None
+            categories = np.append(np.asarray(attribute.categories, dtype=object), None)
+            codes = np.where(missing, -1, attribute.codes[positions])
+            result[column] = categories[codes]
+        return pd.DataFrame(result)
+    
+    def attach(self, data: pd.DataFrame, key_column: str,
+               columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Add attribute columns to a DataFrame that holds dimension keys.
+        
+        Args:
+            data: DataFrame with a key column (typically an aggregated result)
+            key_column: Name of the column holding the keys
+            columns: Attribute columns to add. Defaults to all attributes.
+        
+        Returns:
+            New DataFrame with the attribute columns added
+        """
+        attributes = self.lookup(data[key_column].to_numpy(), columns)
+        attributes.index = data.index
+        return pd.concat([data, attributes], axis=1)
+
+class DimensionCache:
+    """Loads each dimension table once per database version."""
+    
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Initialize the cache.
+        
+        Args:
+            db_path: Optional path to the database file. Defaults to config.DATABASE['path'].
+        """
+        self.db_path = db_path
+        self._tables: Dict[str, DimensionTable] = {}
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+    
+    def get(self, name: str) -> DimensionTable:
+        """
+        Get a dimension table, loading it if it is not cached for the current data version.
+        
+        Args:
+            name: Dimension name (one of DIMENSIONS)
+        
+        Returns:
+            DimensionTable for the dimension
+        """
+        if name not in DIMENSIONS:
+            raise ValueError(f"Invalid dimension. Must be one of {list(DIMENSIONS)}")
+        
+        version = connection.get_data_version(self.db_path)
+        with self._lock:
+            if version != self._version:
+                self._tables.clear()
+                self._version = version
+            if name not in self._tables:
+                self._tables[name] = self._load(name)
+            return self._tables[name]
+    
+    def attach(self, data: pd.DataFrame, name: str, key_column: str,
+               columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Add a dimension's attribute columns to a DataFrame of keys.
+        
+        Args:
+            data: DataFrame with a key column
+            name: Dimension name (one of DIMENSIONS)
+            key_column: Name of the column holding the keys
+            columns: Attribute columns to add. Defaults to all attributes.
+        
+        Returns:
+            New DataFrame with the attribute columns added
+        """
+        return self.get(name).attach(data, key_column, columns)
+    
+    def clear(self):
+        """Drop all cached dimension tables."""
+        with self._lock:
+            self._tables.clear()
+            self._version = None
+    
+    def _load(self, name: str) -> DimensionTable:
+        """Read one dimension table from the database."""
+        table, key_column, attributes = DIMENSIONS[name]
+        select = ', '.join([f'"{key_column}"'] + [f'"{source}" as {column}' for column, source in attributes.items()])
+        
+        # The database the version was taken from, not necessarily the configured one
+        db_path = self.db_path or config.DATABASE['path']
+        conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+        try:
+            data = pd.read_sql_query(f'SELECT {select} FROM "{table}"', conn)
+        finally:
+            conn.close()
+        
+        logger.info(f"Loaded {len(data)} rows of dimension {name} from {table}")
+        return DimensionTable(name, data, key_column)
+
+_cache: Optional[DimensionCache] = None
+_cache_lock = threading.Lock()
+
+def get_dimension_cache() -> DimensionCache:
+    """Get the process-wide dimension cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DimensionCache()
+        return _cache
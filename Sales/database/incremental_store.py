@@ -0,0 +1,169 @@
+"""
+Shared plumbing of the incrementally refreshed derived stores.
+
+The trend cube and the regional aggregate keep a writable SQLite file next to
+the read-only sales database. Each records in a key/value state table the
+version of the source it was refreshed from and the largest fact-table rowid it
+has read, and day-bucketed stores also a watermark (the last day they hold,
+which may have been partial).
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+# Append-only fact table every store is refreshed from
+FACT_TABLE = 'dbo_F_Sales_Transaction'
+# Seconds a store connection waits for a refresh running in another process
+BUSY_TIMEOUT = 120.0
+
+def get_data_version(db_path: str) -> Optional[str]:
+    """
+    Get a token that changes whenever a database file is modified.
+    
+    Args:
+        db_path: Path to the database file
+    
+    Returns:
+        Version token string, or None if the database file does not exist
+    """
+    try:
+        stat = os.stat(db_path)
+    except OSError:
+        return None
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+class IncrementalStore:
+    """
+    Base of a derived store refreshed incrementally from a source database.
+    
+    Subclasses set SCHEMA (which must create STATE_TABLE with key and value
+    columns) and implement _refresh(conn, full). Settings returned by settings()
+    are kept in the state, and a change of any of them makes the store stale and
+    forces a full refresh. Refreshes of one store class are serialized within a
+    process, and across processes by the store file's write lock, which a refresh
+    takes before reading the state; connections wait up to BUSY_TIMEOUT for it.
+    """
+    
+    SCHEMA = ""
+    STATE_TABLE = "store_state"
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._refresh_lock = threading.Lock()
+    
+    def __init__(self, source_path: str, store_path: str, state_prefix: str = ""):
+        """
+        Initialize the store.
+        
+        Args:
+            source_path: Path to the source database
+            store_path: Path to the store file
+            state_prefix: Optional prefix of this store's state keys, for stores
+                sharing one file and state table
+        """
+        self.source_path = source_path
+        self.store_path = store_path
+        self.state_prefix = state_prefix
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.store_path, timeout=BUSY_TIMEOUT)
+        conn.executescript(self.SCHEMA)
+        return conn
+    
+    def _connect_source(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.source_path}?mode=ro", uri=True)
+    
+    def settings(self) -> Dict[str, str]:
+        """Settings the stored rows depend on."""
+        return {}
+    
+    def source_version(self) -> Optional[str]:
+        """Version token of the source database."""
+        return get_data_version(self.source_path)
+    
+    def _get_state(self, conn: sqlite3.Connection) -> Dict[str, str]:
+        rows = conn.execute(
+            f"SELECT key, value FROM {self.STATE_TABLE} WHERE key LIKE ?", (self.state_prefix + '%',)
+        ).fetchall()
+        return {key[len(self.state_prefix):]: value for key, value in rows}
+    
+    def _set_state(self, conn: sqlite3.Connection, source_version: Optional[str],
+                   max_rowid: Optional[int], **values: Optional[str]) -> None:
+        """Record the source version and rowid a refresh read up to, the settings and any other values."""
+        values.update(self.settings())
+        values['source_version'] = source_version
+        values['max_rowid'] = None if max_rowid is None else str(max_rowid)
+        conn.executemany(f"INSERT OR REPLACE INTO {self.STATE_TABLE} VALUES (?, ?)",
+                         [(self.state_prefix + key, value) for key, value in values.items()])
+    
+    def _is_current(self, state: Dict[str, str]) -> bool:
+        return self._settings_match(state) and state.get('source_version') == self.source_version()
+    
+    def _settings_match(self, state: Dict[str, str]) -> bool:
+        return all(state.get(key) == value for key, value in self.settings().items())
+    
+    def is_current(self) -> bool:
+        """Whether the store was refreshed from the current version of the source database."""
+        conn = self._connect()
+        try:
+            return self._is_current(self._get_state(conn))
+        finally:
+            conn.close()
+    
+    def refresh(self, full: bool = False) -> Dict[str, object]:
+        """
+        Bring the store up to date with the source database.
+        
+        Args:
+            full: Whether to rebuild the whole store (needed after in-place
+                corrections or deletions of older transactions)
+        
+        Returns:
+            Dictionary describing the refresh, with at least its mode ('full' or 'incremental')
+        
+        Raises:
+            sqlite3.OperationalError: If another process held the store longer than BUSY_TIMEOUT
+        """
+        with self._refresh_lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return self._refresh(conn, full or not self._settings_match(self._get_state(conn)))
+            finally:
+                conn.close()
+    
+    def _refresh(self, conn: sqlite3.Connection, full: bool) -> Dict[str, object]:
+        raise NotImplementedError
+    
+    @staticmethod
+    def max_rowid(source_conn: sqlite3.Connection, table: str = FACT_TABLE) -> Optional[int]:
+        """Largest rowid of the fact table (None if it is empty)."""
+        return source_conn.execute(f'SELECT MAX(rowid) FROM {table}').fetchone()[0]
+    
+    @staticmethod
+    def rebuild_from(state: Dict[str, str], source_conn: sqlite3.Connection,
+                     table: str = FACT_TABLE) -> Optional[str]:
+        """
+        First day a day-bucketed store must rebuild (None for a full rebuild).
+        
+        The watermark day may have been partial, and rows appended since the last
+        refresh may be dated before it, so the earlier of the two is rebuilt from.
+        
+        Args:
+            state: Store state with the watermark and max_rowid of the last refresh
+            source_conn: Connection to the source database
+            table: Fact table the store is built from
+        
+        Returns:
+            First day (YYYY-MM-DD) to rebuild, or None if the store has no watermark
+        """
+        since = state.get('watermark')
+        if since is not None and state.get('max_rowid') is not None:
+            earliest_new = source_conn.execute(
+                f'SELECT MIN(date("Txn Date")) FROM {table} WHERE rowid > ?', (int(state['max_rowid']),)
+            ).fetchone()[0]
+            if earliest_new is not None:
+                since = min(since, earliest_new)
+        return since
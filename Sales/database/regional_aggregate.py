@@ -0,0 +1,269 @@
+"""
+Regional aggregate layer for the Sales Analytics Multi-Agent System.
+
+Sales joined to dbo_D_Customer_Geography_Hierarchy are summed once per
+(day, region code, sub-region code) into a writable SQLite file next to the sales
+database, so regional queries read a few rows per region and day instead of
+joining every transaction line to the hierarchy. Ratios such as margin_pct and
+revenue_per_unit are derived from the sums at query time.
+
+The hierarchy itself is kept in a lookup table (codes -> names) together with a
+table of country aliases, built once per refresh from the region names, codes and
+a country name mapping such as RegionalSalesAnalyzer.COUNTRY_NAME_MAPPING.
+"""
+
+import logging
+import sqlite3
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import config
+from .incremental_store import IncrementalStore
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS regional_daily (
+        day TEXT NOT NULL,
+        region_code TEXT,
+        sub_region_code TEXT,
+        revenue REAL,
+        units REAL,
+        margin REAL,
+        lines INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS idx_regional_daily ON regional_daily (day, region_code, sub_region_code);
+    CREATE TABLE IF NOT EXISTS region_hierarchy (
+        region_code TEXT,
+        region_name TEXT,
+        sub_region_code TEXT,
+        sub_region_name TEXT
+    );
+    CREATE TABLE IF NOT EXISTS region_aliases (
+        alias TEXT PRIMARY KEY,
+        region_name TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS aggregate_state (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+"""
+
+def build_region_aliases(hierarchy: pd.DataFrame,
+                         country_name_mapping: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Map upper-cased region names, region codes and country aliases to region names.
+    
+    Args:
+        hierarchy: DataFrame with region_code and region_name columns
+        country_name_mapping: Optional alias -> region name mapping (e.g. 'USA' -> 'United States')
+    
+    Returns:
+        Dictionary of upper-cased alias -> region name
+    """
+    regions = hierarchy[['region_code', 'region_name']].dropna(subset=['region_name']).drop_duplicates()
+    aliases = {}
+    for alias, name in (country_name_mapping or {}).items():
+        aliases[alias.upper()] = name
+    for code, name in regions.itertuples(index=False):
+        if code is not None:
+            aliases[str(code).upper()] = name
+    # Exact names win over codes and mapped aliases
+    for name in regions['region_name']:
+        aliases[name.upper()] = name
+    return aliases
+
+class RegionalAggregate(IncrementalStore):
+    """Builds, refreshes and queries the regional aggregate."""
+    
+    SCHEMA = SCHEMA
+    STATE_TABLE = "aggregate_state"
+    
+    def __init__(self, source_path: Optional[str] = None, aggregate_path: Optional[str] = None,
+                 country_name_mapping: Optional[Dict[str, str]] = None):
+        """
+        Initialize the aggregate.
+        
+        Args:
+            source_path: Optional path to the sales database. Defaults to config.DATABASE['path'].
+            aggregate_path: Optional path to the aggregate database file.
+                Defaults to config.REGIONAL_AGGREGATE['path'].
+            country_name_mapping: Optional alias -> region name mapping applied to country filters
+        """
+        super().__init__(source_path or config.DATABASE['path'],
+                         aggregate_path or config.REGIONAL_AGGREGATE['path'])
+        self.aggregate_path = self.store_path
+        self.country_name_mapping = country_name_mapping or {}
+    
+    def refresh(self, full: bool = False) -> Dict[str, object]:
+        """
+        Bring the aggregate up to date with the sales database.
+        
+        Days from the watermark (the last day aggregated, which may have been partial)
+        are rebuilt, extended back to the earliest day of any rows appended since the
+        last refresh. The hierarchy lookup and aliases are reloaded every time. Use
+        full=True after in-place corrections to older transactions.
+        
+        Args:
+            full: Whether to rebuild the whole aggregate
+        
+        Returns:
+            Dictionary with the refresh mode, the first rebuilt day and the number of rows written
+        """
+        return super().refresh(full)
+    
+    def _refresh(self, conn: sqlite3.Connection, full: bool) -> Dict[str, object]:
+        source_conn = self._connect_source()
+        try:
+            state = self._get_state(conn)
+            source_version = self.source_version()
+            max_rowid = self.max_rowid(source_conn)
+            since = None if full else self.rebuild_from(state, source_conn)
+            
+            hierarchy = self._load_hierarchy(source_conn)
+            conn.execute("DELETE FROM region_hierarchy")
+            conn.executemany("INSERT INTO region_hierarchy VALUES (?, ?, ?, ?)",
+                             hierarchy.itertuples(index=False, name=None))
+            conn.execute("DELETE FROM region_aliases")
+            conn.executemany("INSERT INTO region_aliases VALUES (?, ?)",
+                             build_region_aliases(hierarchy, self.country_name_mapping).items())
+            
+            if since is None:
+                conn.execute("DELETE FROM regional_daily")
+            else:
+                conn.execute("DELETE FROM regional_daily WHERE day >= ?", (since,))
+            daily = self._scan_daily(source_conn, since)
+            conn.executemany("INSERT INTO regional_daily VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             daily.itertuples(index=False, name=None))
+            
+            self._set_state(conn, source_version, max_rowid,
+                            watermark=daily['day'].max() if not daily.empty else state.get('watermark'))
+            conn.commit()
+            
+            logger.info(f"Refreshed regional aggregate ({'incremental' if since else 'full'}) "
+                        f"with {len(daily)} rows from {since or daily['day'].min()}")
+            return {
+                "mode": "incremental" if since else "full",
+                "rebuilt_from": since or (daily['day'].min() if not daily.empty else None),
+                "rows": len(daily)
+            }
+        finally:
+            source_conn.close()
+    
+    def _load_hierarchy(self, source_conn) -> pd.DataFrame:
+        """Distinct region/sub-region codes with their names."""
+        return pd.read_sql_query("""
+            SELECT
+                [Customer Geography Hrchy L1 Code] as region_code,
+                MIN([Customer Geography Hrchy L1 Name]) as region_name,
+                [Customer Geography Hrchy L2 Code] as sub_region_code,
+                MIN([Customer Geography Hrchy L2 Name]) as sub_region_name
+            FROM dbo_D_Customer_Geography_Hierarchy
+            WHERE [Deleted Flag] = 0
+            GROUP BY [Customer Geography Hrchy L1 Code], [Customer Geography Hrchy L2 Code]
+        """, source_conn)
+    
+    def _scan_daily(self, source_conn, since: Optional[str]) -> pd.DataFrame:
+        """Sum fact rows per day, region code and sub-region code."""
+        query = """
+            SELECT
+                date(s.[Txn Date]) as day,
+                g.[Customer Geography Hrchy L1 Code] as region_code,
+                g.[Customer Geography Hrchy L2 Code] as sub_region_code,
+                SUM(s.[gpb Net Sales Amount]) as revenue,
+                SUM(s.[gpb Net Sales Quantity]) as units,
+                SUM(s.[gpb Gross Profit Amount]) as margin,
+                COUNT(*) as lines
+            FROM dbo_F_Sales_Transaction s
+            JOIN dbo_D_Customer_Geography_Hierarchy g
+                ON s.[Customer Geography Hrchy Key] = g.[Customer Geography Hrchy Key]
+            WHERE g.[Deleted Flag] = 0
+                AND s.[Deleted Flag] = 0
+        """
+        params = ()
+        if since:
+            query += " AND s.[Txn Date] >= ?"
+            params = (since,)
+        query += " GROUP BY date(s.[Txn Date]), g.[Customer Geography Hrchy L1 Code], g.[Customer Geography Hrchy L2 Code]"
+        return pd.read_sql_query(query, source_conn, params=params)
+    
+    def resolve_country_names(self, country_codes: List[str]) -> List[str]:
+        """
+        Resolve country codes, aliases or names to region names.
+        
+        Args:
+            country_codes: Codes such as 'USA', 'us' or 'Canada'
+        
+        Returns:
+            Region names; values without a known alias are returned unchanged
+        """
+        conn = self._connect()
+        try:
+            aliases = dict(conn.execute("SELECT alias, region_name FROM region_aliases").fetchall())
+        finally:
+            conn.close()
+        if not aliases:
+            aliases = {alias.upper(): name for alias, name in self.country_name_mapping.items()}
+        return [aliases.get(code.upper(), code) for code in country_codes]
+    
+    def query(self, start_date: str, end_date: str,
+              region_codes: Optional[List[str]] = None,
+              country_codes: Optional[List[str]] = None,
+              sub_region_codes: Optional[List[str]] = None,
+              refresh: bool = True) -> pd.DataFrame:
+        """
+        Daily regional sales between two dates (inclusive).
+        
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            region_codes: Optional L1 codes to keep
+            country_codes: Optional countries (codes, aliases or names) to keep
+            sub_region_codes: Optional L2 codes to keep
+            refresh: Whether to refresh the aggregate first if the sales database changed
+        
+        Returns:
+            DataFrame with Txn Date, revenue, units, margin, region_name, region_code,
+            sub_region_name, sub_region_code, margin_pct and revenue_per_unit
+            (one row per day, region and sub-region)
+        """
+        if refresh and not self.is_current():
+            self.refresh()
+        
+        query = """
+            SELECT
+                d.day as [Txn Date],
+                d.revenue,
+                d.units,
+                d.margin,
+                h.region_name,
+                d.region_code,
+                h.sub_region_name,
+                d.sub_region_code
+            FROM regional_daily d
+            JOIN region_hierarchy h
+                ON h.region_code IS d.region_code AND h.sub_region_code IS d.sub_region_code
+            WHERE d.day BETWEEN ? AND ?
+        """
+        params = [start_date, end_date]
+        if country_codes:
+            country_codes = self.resolve_country_names(country_codes)
+        for column, values in [('d.region_code', region_codes), ('h.region_name', country_codes),
+                               ('d.sub_region_code', sub_region_codes)]:
+            if values:
+                query += f" AND {column} IN ({','.join('?' for _ in values)})"
+                params.extend(values)
+        query += " ORDER BY d.day, d.region_code, d.sub_region_code"
+        
+        conn = self._connect()
+        try:
+            data = pd.read_sql_query(query, conn, params=params)
+        finally:
+            conn.close()
+        
+        data['Txn Date'] = pd.to_datetime(data['Txn Date'])
+        data['margin_pct'] = data['margin'] / data['revenue'].replace(0, np.nan) * 100
+        data['revenue_per_unit'] = data['revenue'] / data['units'].replace(0, np.nan)
+        return data
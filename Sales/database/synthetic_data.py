@@ -0,0 +1,583 @@
+"""
+Synthetic star-schema datasets for benchmarks and load tests.
+
+Generates sales, inventory and finance tables with the same table and column names
+as the real databases (dbo_F_Sales_Transaction, dbo_D_Item, dbo_F_Inventory_Snapshot,
+"dbo_F_GL_Transaction", ...) using vectorized NumPy, and bulk-loads them into SQLite
+with executemany, one transaction per chunk. Fact tables are produced in
+date-ordered chunks, so row counts from 10K up to 100M+ are generated in bounded
+memory and rowids grow with the transaction date like in the real append-only
+fact tables.
+
+Usage:
+    python -m Sales.database.synthetic_data sales /tmp/sales_bench.db --rows 1000000
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Rows generated and inserted per transaction
+DEFAULT_CHUNK_SIZE = 250_000
+
+# Table -> [(column, SQLite type)], per database
+SCHEMAS: Dict[str, Dict[str, List[Tuple[str, str]]]] = {
+    'sales': {
+        'dbo_D_Item': [
+            ('Item Key', 'INTEGER'), ('Item Number', 'TEXT'), ('Item Desc', 'TEXT'),
+            ('Item Category Hrchy Key', 'INTEGER'), ('Item Category Desc', 'TEXT'),
+            ('Item Subcategory Desc', 'TEXT'), ('Unit of Measure', 'TEXT')
+        ],
+        'dbo_D_Customer': [
+            ('Customer Key', 'INTEGER'), ('Customer Number', 'TEXT'), ('Customer Name', 'TEXT'),
+            ('Customer Type Desc', 'TEXT'), ('Customer Status', 'TEXT'), ('Customer State/Prov', 'TEXT'),
+            ('Credit Limit Amount', 'REAL'), ('Credit Status', 'TEXT'), ('Industry Code', 'TEXT'),
+            ('Year Acquired', 'INTEGER'), ('Customer Category Hrchy Code', 'TEXT'),
+            ('Customer Geography Hrchy Key', 'INTEGER')
+        ],
+        'dbo_D_Sales_Organization': [
+            ('Sales Organization Key', 'INTEGER'), ('Sales Org Hrchy L1 Code', 'TEXT'),
+            ('Sales Org Hrchy L1 Name', 'TEXT')
+        ],
+        'dbo_D_Customer_Geography_Hierarchy': [
+            ('Customer Geography Hrchy Key', 'INTEGER'), ('Customer Geography Hrchy L1 Code', 'TEXT'),
+            ('Customer Geography Hrchy L1 Name', 'TEXT'), ('Customer Geography Hrchy L2 Code', 'TEXT'),
+            ('Customer Geography Hrchy L2 Name', 'TEXT'), ('Deleted Flag', 'INTEGER')
+        ],
+        'dbo_F_Sales_Transaction': [
+            ('Sales Txn Key', 'INTEGER'), ('Sales Txn Number', 'TEXT'), ('Txn Date', 'TEXT'),
+            ('Customer Key', 'INTEGER'), ('Item Key', 'INTEGER'), ('Item Category Hrchy Key', 'INTEGER'),
+            ('Sales Organization Key', 'INTEGER'), ('Customer Geography Hrchy Key', 'INTEGER'),
+            ('Location Code', 'TEXT'), ('Unit of Measure', 'TEXT'),
+            ('Net Sales Quantity', 'REAL'), ('Net Sales Amount', 'REAL'), ('Gross Profit Amount', 'REAL'),
+            ('gpb Net Sales Quantity', 'REAL'), ('gpb Net Sales Amount', 'REAL'),
+            ('gpb Gross Profit Amount', 'REAL'), ('Discount Reason', 'TEXT'),
+            ('Deleted Flag', 'INTEGER'), ('Excluded Flag', 'INTEGER')
+        ]
+    },
+    'inventory': {
+        'dbo_D_Item': [
+            ('Item_Key', 'INTEGER'), ('Item_Number', 'TEXT'), ('Item_Name', 'TEXT'),
+            ('Item_Category', 'TEXT'), ('Unit_Cost', 'REAL'), ('Lead_Time_Days', 'INTEGER'),
+            ('Obsolescence_Risk', 'REAL'), ('Storage_Requirements', 'TEXT')
+        ],
+        'dbo_D_Warehouse': [
+            ('Warehouse_Key', 'INTEGER'), ('Warehouse_ID', 'TEXT'), ('Warehouse_Name', 'TEXT'),
+            ('Storage_Cost_Per_Unit', 'REAL'), ('Warehouse_Type', 'TEXT')
+        ],
+        'dbo_F_Inventory_Snapshot': [
+            ('Item_Key', 'INTEGER'), ('Warehouse_Key', 'INTEGER'), ('Snapshot_Date', 'TEXT'),
+            ('Current_Stock', 'INTEGER'), ('Average_Stock_Level', 'REAL'),
+            ('Safety_Stock', 'REAL'), ('Reorder_Point', 'REAL')
+        ],
+        'dbo_F_Sales_Transaction': [
+            ('Item_Key', 'INTEGER'), ('Warehouse_Key', 'INTEGER'), ('Transaction_Date', 'TEXT'),
+            ('Quantity', 'INTEGER')
+        ]
+    },
+    'finance': {
+        # The finance database keeps the quotes as part of its table names
+        '"dbo_F_GL_Transaction"': [
+            ('GL Txn Key', 'INTEGER'), ('Posting Date', 'TEXT'), ('GL Account Number', 'TEXT'),
+            ('Customer Key', 'INTEGER'), ('Txn Amount', 'REAL')
+        ]
+    }
+}
+
+# Indexes created after loading (table, columns)
+INDEXES: Dict[str, List[Tuple[str, Tuple[str, ...]]]] = {
+    'sales': [
+        ('dbo_F_Sales_Transaction', ('Txn Date',)),
+        ('dbo_F_Sales_Transaction', ('Customer Key',)),
+        ('dbo_F_Sales_Transaction', ('Item Key',)),
+        ('dbo_D_Item', ('Item Key',)),
+        ('dbo_D_Customer', ('Customer Key',))
+    ],
+    'inventory': [
+        ('dbo_F_Inventory_Snapshot', ('Snapshot_Date',)),
+        ('dbo_F_Sales_Transaction', ('Transaction_Date',))
+    ],
+    'finance': [
+        ('"dbo_F_GL_Transaction"', ('Posting Date',))
+    ]
+}
+
+CATEGORIES = {
+    'Electronics': ['Phones', 'Laptops', 'Audio', 'Accessories'],
+    'Apparel': ['Shirts', 'Trousers', 'Footwear', 'Outerwear'],
+    'Home Goods': ['Furniture', 'Kitchenware', 'Bedding', 'Decor'],
+    'Food & Beverage': ['Snacks', 'Beverages', 'Prepared Meals', 'Ingredients'],
+    'Tools': ['Power Tools', 'Hand Tools', 'Hardware', 'Garden']
+}
+# Median unit price per category
+CATEGORY_PRICES = {'Electronics': 250.0, 'Apparel': 40.0, 'Home Goods': 80.0,
+                   'Food & Beverage': 8.0, 'Tools': 60.0}
+
+SALES_ORGANIZATIONS = [('NA', 'North America'), ('EU', 'Europe'), ('AP', 'Asia Pacific'),
+                       ('LA', 'Latin America')]
+# Country code -> (country name, sales organization code, share of customers)
+COUNTRIES = {
+    'US': ('United States', 'NA', 0.40), 'CA': ('Canada', 'NA', 0.08),
+    'GB': ('United Kingdom', 'EU', 0.12), 'DE': ('Germany', 'EU', 0.10),
+    'FR': ('France', 'EU', 0.08), 'JP': ('Japan', 'AP', 0.08),
+    'AU': ('Australia', 'AP', 0.06), 'BR': ('Brazil', 'LA', 0.08)
+}
+SUB_REGIONS = ['North', 'South', 'East', 'West']
+
+def _quote(name: str) -> str:
+    """Quote an SQLite identifier."""
+    return '"' + name.replace('"', '""') + '"'
+
+def _choice_labels(rng: np.random.Generator, labels: List[str], size: int,
+                   p: Optional[np.ndarray] = None) -> np.ndarray:
+    """Draw labels by index so large draws stay integer-typed."""
+    return np.asarray(labels, dtype=object)[rng.choice(len(labels), size=size, p=p)]
+
+def _zipf_weights(n: int, exponent: float, rng: np.random.Generator) -> np.ndarray:
+    """Long-tailed popularity weights in random order."""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+class SyntheticDataGenerator:
+    """Vectorized generator for synthetic sales, inventory and finance tables."""
+    
+    def __init__(self, seed: int = 42, start_date: str = '2022-01-01', days: int = 730):
+        """
+        Initialize the generator.
+        
+        Args:
+            seed: Random seed; the same seed and arguments give the same data
+            start_date: First transaction date (YYYY-MM-DD)
+            days: Number of days covered by the fact tables
+        """
+        self.rng = np.random.default_rng(seed)
+        self.dates = pd.date_range(start=start_date, periods=days, freq='D')
+    
+    def day_weights(self, growth: float = 0.15) -> np.ndarray:
+        """Relative activity per day: yearly trend, December peak and quieter weekends."""
+        t = np.arange(len(self.dates)) / 365.25
+        seasonal = 1 + 0.25 * np.cos(2 * np.pi * (self.dates.dayofyear.values - 350) / 365.25)
+        weekly = np.where(self.dates.dayofweek.values >= 5, 0.6, 1.0)
+        weights = (1 + growth) ** t * seasonal * weekly
+        return weights / weights.sum()
+    
+    def _chunked_days(self, n_rows: int, chunk_size: int) -> Iterator[Tuple[int, np.ndarray]]:
+        """Split n_rows over the days and yield (first row, day index per row) in date order."""
+        counts = self.rng.multinomial(n_rows, self.day_weights())
+        ends = np.cumsum(counts)
+        for lo in range(0, n_rows, chunk_size):
+            hi = min(lo + chunk_size, n_rows)
+            yield lo, np.searchsorted(ends, np.arange(lo, hi), side='right')
+    
+    def sales_dimensions(self, n_items: int = 500, n_customers: int = 5_000) -> Dict[str, pd.DataFrame]:
+        """
+        Generate the sales dimension tables.
+        
+        Args:
+            n_items: Number of items
+            n_customers: Number of customers
+        
+        Returns:
+            Dictionary of table name -> DataFrame
+        """
+        rng = self.rng
+        subcategories = [(category, sub) for category, subs in CATEGORIES.items() for sub in subs]
+        sub_idx = rng.integers(0, len(subcategories), n_items)
+        item_keys = np.arange(1, n_items + 1)
+        items = pd.DataFrame({
+            'Item Key': item_keys,
+            'Item Number': [f"IT{key:07d}" for key in item_keys],
+            'Item Desc': [f"{subcategories[s][1]} {key:05d}" for s, key in zip(sub_idx, item_keys)],
+            'Item Category Hrchy Key': sub_idx + 1,
+            'Item Category Desc': [subcategories[s][0] for s in sub_idx],
+            'Item Subcategory Desc': [subcategories[s][1] for s in sub_idx],
+            'Unit of Measure': _choice_labels(rng, ['EA', 'BX', 'CS'], n_items, p=[0.8, 0.15, 0.05])
+        })
+        
+        organizations = pd.DataFrame(
+            [(key, code, name) for key, (code, name) in enumerate(SALES_ORGANIZATIONS, start=1)],
+            columns=[column for column, _ in SCHEMAS['sales']['dbo_D_Sales_Organization']]
+        )
+        
+        geography_rows = []
+        for country, (name, _, _) in COUNTRIES.items():
+            for sub in SUB_REGIONS:
+                geography_rows.append((len(geography_rows) + 1, country, name, f"{country}-{sub[0]}",
+                                       f"{name} {sub}", 0))
+        geography = pd.DataFrame(
+            geography_rows,
+            columns=[column for column, _ in SCHEMAS['sales']['dbo_D_Customer_Geography_Hierarchy']]
+        )
+        
+        country_codes = list(COUNTRIES)
+        shares = np.array([COUNTRIES[code][2] for code in country_codes])
+        country_idx = rng.choice(len(country_codes), size=n_customers, p=shares / shares.sum())
+        geography_keys = country_idx * len(SUB_REGIONS) + rng.integers(0, len(SUB_REGIONS), n_customers) + 1
+        customer_keys = np.arange(1, n_customers + 1)
+        customers = pd.DataFrame({
+            'Customer Key': customer_keys,
+            'Customer Number': [f"C{key:08d}" for key in customer_keys],
+            'Customer Name': [f"Customer {key}" for key in customer_keys],
+            'Customer Type Desc': _choice_labels(rng, ['Retail', 'Wholesale', 'Distributor', 'Online'],
+                                                 n_customers, p=[0.5, 0.2, 0.1, 0.2]),
+            'Customer Status': _choice_labels(rng, ['Active', 'Inactive'], n_customers, p=[0.9, 0.1]),
+            'Customer State/Prov': np.asarray([f"{country_codes[c]}-{s}" for c, s in
+                                               zip(country_idx, rng.integers(1, 11, n_customers))]),
+            'Credit Limit Amount': (rng.lognormal(9, 1, n_customers) // 100 * 100),
+            'Credit Status': _choice_labels(rng, ['Good', 'Watch', 'Hold'], n_customers, p=[0.85, 0.1, 0.05]),
+            'Industry Code': _choice_labels(rng, ['RET', 'MFG', 'HLT', 'EDU', 'GOV'], n_customers),
+            'Year Acquired': rng.integers(self.dates[0].year - 10, self.dates[-1].year + 1, n_customers),
+            'Customer Category Hrchy Code': _choice_labels(rng, ['A', 'B', 'C'], n_customers, p=[0.1, 0.3, 0.6]),
+            'Customer Geography Hrchy Key': geography_keys
+        })
+        
+        return {
+            'dbo_D_Item': items,
+            'dbo_D_Customer': customers,
+            'dbo_D_Sales_Organization': organizations,
+            'dbo_D_Customer_Geography_Hierarchy': geography
+        }
+    
+    def iter_sales_transactions(self, n_rows: int, dimensions: Dict[str, pd.DataFrame],
+                                chunk_size: int = DEFAULT_CHUNK_SIZE,
+                                lines_per_order: float = 3.0) -> Iterator[pd.DataFrame]:
+        """
+        Generate dbo_F_Sales_Transaction rows in date-ordered chunks.
+        
+        Lines are grouped into orders (Sales Txn Number) of on average lines_per_order
+        lines for one customer and day. Item and customer popularity are long-tailed;
+        about 2% of lines are returns, 1% deleted and 1% excluded.
+        
+        Args:
+            n_rows: Total number of transaction lines
+            dimensions: Output of sales_dimensions()
+            chunk_size: Rows per yielded chunk
+            lines_per_order: Mean number of lines per order
+        
+        Yields:
+            DataFrames with the dbo_F_Sales_Transaction columns
+        """
+        rng = self.rng
+        items = dimensions['dbo_D_Item']
+        customers = dimensions['dbo_D_Customer']
+        item_weights = _zipf_weights(len(items), 1.1, rng)
+        customer_weights = rng.lognormal(0, 1.2, len(customers))
+        customer_weights /= customer_weights.sum()
+        base_prices = items['Item Category Desc'].map(CATEGORY_PRICES).to_numpy()
+        item_prices = np.round(base_prices * rng.lognormal(0, 0.5, len(items)), 2)
+        item_costs = item_prices * rng.uniform(0.45, 0.8, len(items))
+        item_category_keys = items['Item Category Hrchy Key'].to_numpy()
+        item_units = items['Unit of Measure'].to_numpy()
+        customer_geography = customers['Customer Geography Hrchy Key'].to_numpy()
+        # Customers sell through the sales organization of their country
+        geography = dimensions['dbo_D_Customer_Geography_Hierarchy']
+        org_keys = {code: key for key, (code, _) in enumerate(SALES_ORGANIZATIONS, start=1)}
+        geography_orgs = pd.Series(
+            geography['Customer Geography Hrchy L1 Code'].map(lambda code: org_keys[COUNTRIES[code][1]]).to_numpy(),
+            index=geography['Customer Geography Hrchy Key']
+        )
+        customer_orgs = geography_orgs.reindex(customer_geography).to_numpy()
+        day_labels = self.dates.strftime('%Y-%m-%d').to_numpy()
+        
+        next_order = 1
+        for first_row, day_idx in self._chunked_days(n_rows, chunk_size):
+            n = len(day_idx)
+            # A new order starts on a new day or with probability 1/lines_per_order
+            new_order = rng.random(n) < 1.0 / lines_per_order
+            new_order[0] = True
+            new_order[1:] |= day_idx[1:] != day_idx[:-1]
+            order_idx = np.cumsum(new_order) - 1
+            n_orders = int(order_idx[-1]) + 1
+            order_customers = rng.choice(len(customers), size=n_orders, p=customer_weights)
+            line_customers = order_customers[order_idx]
+            line_items = rng.choice(len(items), size=n, p=item_weights)
+            
+            quantity = rng.poisson(2.0, n) + 1.0
+            quantity[rng.random(n) < 0.02] *= -1
+            discount = np.where(rng.random(n) < 0.15, rng.choice([0.05, 0.1, 0.2], n), 0.0)
+            amount = np.round(quantity * item_prices[line_items] * (1 - discount), 2)
+            profit = np.round(amount - quantity * item_costs[line_items], 2)
+            
+            yield pd.DataFrame({
+                'Sales Txn Key': np.arange(first_row + 1, first_row + n + 1),
+                'Sales Txn Number': np.char.add('SO', (order_idx + next_order).astype(str)),
+                'Txn Date': day_labels[day_idx],
+                'Customer Key': line_customers + 1,
+                'Item Key': line_items + 1,
+                'Item Category Hrchy Key': item_category_keys[line_items],
+                'Sales Organization Key': customer_orgs[line_customers],
+                'Customer Geography Hrchy Key': customer_geography[line_customers],
+                'Location Code': _choice_labels(rng, ['WH01', 'WH02', 'WH03', 'STORE'], n),
+                'Unit of Measure': item_units[line_items],
+                'Net Sales Quantity': quantity,
+                'Net Sales Amount': amount,
+                'Gross Profit Amount': profit,
+                'gpb Net Sales Quantity': quantity,
+                'gpb Net Sales Amount': amount,
+                'gpb Gross Profit Amount': profit,
+                'Discount Reason': np.where(discount > 0, 'Promotion', None),
+                'Deleted Flag': (rng.random(n) < 0.01).astype(int),
+                'Excluded Flag': (rng.random(n) < 0.01).astype(int)
+            })
+            next_order += n_orders
+    
+    def inventory_dimensions(self, n_items: int = 200, n_warehouses: int = 5) -> Dict[str, pd.DataFrame]:
+        """
+        Generate the inventory item and warehouse tables.
+        
+        Args:
+            n_items: Number of items
+            n_warehouses: Number of warehouses
+        
+        Returns:
+            Dictionary of table name -> DataFrame
+        """
+        rng = self.rng
+        categories = list(CATEGORIES)
+        category_idx = rng.integers(0, len(categories), n_items)
+        item_keys = np.arange(1, n_items + 1)
+        base_prices = np.array([CATEGORY_PRICES[categories[c]] for c in category_idx])
+        items = pd.DataFrame({
+            'Item_Key': item_keys,
+            'Item_Number': [f"P{key:06d}" for key in item_keys],
+            'Item_Name': [f"{categories[c]} Item {key}" for c, key in zip(category_idx, item_keys)],
+            'Item_Category': np.asarray(categories, dtype=object)[category_idx],
+            'Unit_Cost': np.round(base_prices * rng.lognormal(-0.5, 0.4, n_items), 2),
+            'Lead_Time_Days': rng.integers(3, 30, n_items),
+            'Obsolescence_Risk': np.round(rng.beta(2, 12, n_items), 3),
+            'Storage_Requirements': _choice_labels(rng, ['Standard', 'Special'], n_items, p=[0.8, 0.2])
+        })
+        
+        warehouse_keys = np.arange(1, n_warehouses + 1)
+        warehouses = pd.DataFrame({
+            'Warehouse_Key': warehouse_keys,
+            'Warehouse_ID': [f"WH{key:03d}" for key in warehouse_keys],
+            'Warehouse_Name': [f"Distribution Center {key}" for key in warehouse_keys],
+            'Storage_Cost_Per_Unit': np.round(rng.uniform(0.4, 0.9, n_warehouses), 2),
+            'Warehouse_Type': _choice_labels(rng, ['Standard', 'Special'], n_warehouses, p=[0.7, 0.3])
+        })
+        return {'dbo_D_Item': items, 'dbo_D_Warehouse': warehouses}
+    
+    def inventory_snapshots(self, dimensions: Dict[str, pd.DataFrame], every_days: int = 7) -> pd.DataFrame:
+        """
+        Generate dbo_F_Inventory_Snapshot rows for every item, warehouse and snapshot date.
+        
+        Args:
+            dimensions: Output of inventory_dimensions()
+            every_days: Days between snapshots
+        
+        Returns:
+            DataFrame with the dbo_F_Inventory_Snapshot columns
+        """
+        rng = self.rng
+        item_keys = dimensions['dbo_D_Item']['Item_Key'].to_numpy()
+        warehouse_keys = dimensions['dbo_D_Warehouse']['Warehouse_Key'].to_numpy()
+        snapshot_dates = self.dates[::every_days].strftime('%Y-%m-%d').to_numpy()
+        pairs = len(item_keys) * len(warehouse_keys)
+        
+        # Each (item, warehouse) pair has its own stocking level; snapshots vary around it
+        base_stock = rng.integers(50, 500, pairs).astype(float)
+        stock = np.maximum(0, np.rint(
+            np.tile(base_stock, len(snapshot_dates)) * rng.uniform(0.3, 1.5, pairs * len(snapshot_dates))
+        )).astype(int)
+        return pd.DataFrame({
+            'Item_Key': np.tile(np.repeat(item_keys, len(warehouse_keys)), len(snapshot_dates)),
+            'Warehouse_Key': np.tile(warehouse_keys, len(item_keys) * len(snapshot_dates)),
+            'Snapshot_Date': np.repeat(snapshot_dates, pairs),
+            'Current_Stock': stock,
+            'Average_Stock_Level': np.round(np.tile(base_stock, len(snapshot_dates)) * 0.9, 2),
+            'Safety_Stock': np.round(np.tile(base_stock * 0.2, len(snapshot_dates)), 1),
+            'Reorder_Point': np.round(np.tile(base_stock * 0.3, len(snapshot_dates)), 1)
+        })
+    
+    def iter_inventory_sales(self, dimensions: Dict[str, pd.DataFrame],
+                             chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        """
+        Generate daily item/warehouse sales for the inventory database.
+        
+        Every (item, warehouse, day) cell sells with a per-item probability, so the
+        product x warehouse x day grid is drawn as one array per chunk of days.
+        
+        Args:
+            dimensions: Output of inventory_dimensions()
+            chunk_size: Approximate number of grid cells per chunk
+        
+        Yields:
+            DataFrames with the inventory dbo_F_Sales_Transaction columns
+        """
+        rng = self.rng
+        item_keys = dimensions['dbo_D_Item']['Item_Key'].to_numpy()
+        warehouse_keys = dimensions['dbo_D_Warehouse']['Warehouse_Key'].to_numpy()
+        pairs = len(item_keys) * len(warehouse_keys)
+        pair_items = np.repeat(item_keys, len(warehouse_keys))
+        pair_warehouses = np.tile(warehouse_keys, len(item_keys))
+        sale_probability = np.repeat(rng.uniform(0.1, 0.8, len(item_keys)), len(warehouse_keys))
+        mean_quantity = np.repeat(rng.uniform(1, 6, len(item_keys)), len(warehouse_keys))
+        day_factor = self.day_weights() * len(self.dates)
+        date_labels = self.dates.strftime('%Y-%m-%d').to_numpy()
+        
+        days_per_chunk = max(1, chunk_size // max(pairs, 1))
+        for first_day in range(0, len(self.dates), days_per_chunk):
+            days = np.arange(first_day, min(first_day + days_per_chunk, len(self.dates)))
+            p = np.clip(np.outer(day_factor[days], sale_probability), 0, 1)
+            day_idx, pair_idx = np.nonzero(rng.random(p.shape) < p)
+            yield pd.DataFrame({
+                'Item_Key': pair_items[pair_idx],
+                'Warehouse_Key': pair_warehouses[pair_idx],
+                'Transaction_Date': date_labels[days[day_idx]],
+                'Quantity': rng.poisson(mean_quantity[pair_idx]) + 1
+            })
+    
+    def iter_gl_transactions(self, n_rows: int, n_customers: int = 5_000,
+                             chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        """
+        Generate "dbo_F_GL_Transaction" rows in date-ordered chunks.
+        
+        About two thirds of postings are receipts (positive amounts) and the rest payments.
+        
+        Args:
+            n_rows: Total number of postings
+            n_customers: Number of customer keys to draw from
+            chunk_size: Rows per yielded chunk
+        
+        Yields:
+            DataFrames with the "dbo_F_GL_Transaction" columns
+        """
+        rng = self.rng
+        accounts = ['1100', '1200', '2100', '4000', '5000', '6100']
+        day_labels = self.dates.strftime('%Y-%m-%d').to_numpy()
+        for first_row, day_idx in self._chunked_days(n_rows, chunk_size):
+            n = len(day_idx)
+            sign = np.where(rng.random(n) < 0.65, 1.0, -1.0)
+            yield pd.DataFrame({
+                'GL Txn Key': np.arange(first_row + 1, first_row + n + 1),
+                'Posting Date': day_labels[day_idx],
+                'GL Account Number': _choice_labels(rng, accounts, n),
+                'Customer Key': rng.integers(1, n_customers + 1, n),
+                'Txn Amount': np.round(sign * rng.lognormal(6, 1.2, n), 2)
+            })
+
+def write_tables(path: str, schema: str,
+                 tables: Dict[str, Union[pd.DataFrame, Iterable[pd.DataFrame]]]) -> Dict[str, int]:
+    """
+    Create the given tables of a schema and bulk-load their rows.
+    
+    Existing tables of the same names are replaced. Rows are inserted with
+    executemany, one transaction per chunk, with journaling and syncing off
+    for the load; indexes are created afterwards.
+    
+    Args:
+        path: SQLite database file to write
+        schema: Key of SCHEMAS ('sales', 'inventory' or 'finance')
+        tables: Table name -> DataFrame or iterable of DataFrame chunks
+    
+    Returns:
+        Dictionary of table name -> rows written
+    """
+    columns = SCHEMAS[schema]
+    conn = sqlite3.connect(path)
+    written = {}
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        for table, chunks in tables.items():
+            quoted = _quote(table)
+            definition = ', '.join(f'{_quote(column)} {sql_type}' for column, sql_type in columns[table])
+            with conn:
+                conn.execute(f"DROP TABLE IF EXISTS {quoted}")
+                conn.execute(f"CREATE TABLE {quoted} ({definition})")
+            
+            insert = f"INSERT INTO {quoted} VALUES ({', '.join('?' for _ in columns[table])})"
+            names = [column for column, _ in columns[table]]
+            written[table] = 0
+            for chunk in ([chunks] if isinstance(chunks, pd.DataFrame) else chunks):
+                with conn:
+                    conn.executemany(insert, chunk[names].itertuples(index=False, name=None))
+                written[table] += len(chunk)
+            logger.info(f"Wrote {written[table]} rows to {table}")
+        
+        for number, (table, index_columns) in enumerate(INDEXES[schema]):
+            if table in written:
+                with conn:
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_synthetic_{number} ON {_quote(table)} "
+                                 f"({', '.join(_quote(column) for column in index_columns)})")
+    finally:
+        conn.close()
+    return written
+
+def build_sales_database(path: str, n_transactions: int = 10_000, n_items: int = 500,
+                         n_customers: int = 5_000, seed: int = 42, start_date: str = '2022-01-01',
+                         days: int = 730, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Write a synthetic sales star schema (as in sales_agent.db) to path.
+    
+    Returns:
+        Dictionary of table name -> rows written
+    """
+    generator = SyntheticDataGenerator(seed, start_date, days)
+    tables = generator.sales_dimensions(n_items, n_customers)
+    tables['dbo_F_Sales_Transaction'] = generator.iter_sales_transactions(n_transactions, tables, chunk_size)
+    return write_tables(path, 'sales', tables)
+
+def build_inventory_database(path: str, n_items: int = 200, n_warehouses: int = 5, seed: int = 42,
+                             start_date: str = '2022-01-01', days: int = 365, snapshot_every_days: int = 7,
+                             chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Write a synthetic inventory database (as in inventory.db) to path.
+    
+    Returns:
+        Dictionary of table name -> rows written
+    """
+    generator = SyntheticDataGenerator(seed, start_date, days)
+    tables = generator.inventory_dimensions(n_items, n_warehouses)
+    tables['dbo_F_Inventory_Snapshot'] = generator.inventory_snapshots(tables, snapshot_every_days)
+    tables['dbo_F_Sales_Transaction'] = generator.iter_inventory_sales(tables, chunk_size)
+    return write_tables(path, 'inventory', tables)
+
+def build_finance_database(path: str, n_transactions: int = 10_000, n_customers: int = 5_000,
+                           seed: int = 42, start_date: str = '2022-01-01', days: int = 730,
+                           chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Write synthetic GL transactions (as in financial_agent.db) to path.
+    
+    Returns:
+        Dictionary of table name -> rows written
+    """
+    generator = SyntheticDataGenerator(seed, start_date, days)
+    return write_tables(path, 'finance', {
+        '"dbo_F_GL_Transaction"': generator.iter_gl_transactions(n_transactions, n_customers, chunk_size)
+    })
+
+BUILDERS = {
+    'sales': build_sales_database,
+    'inventory': build_inventory_database,
+    'finance': build_finance_database
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic benchmark database")
+    parser.add_argument('schema', choices=sorted(BUILDERS))
+    parser.add_argument('path', help="SQLite file to write (tables of the schema are replaced)")
+    parser.add_argument('--rows', type=int, default=10_000, help="Fact rows (sales and finance)")
+    parser.add_argument('--items', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--days', type=int, default=None)
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    options = {'seed': args.seed}
+    if args.schema != 'inventory':
+        options['n_transactions'] = args.rows
+    if args.items is not None and args.schema != 'finance':
+        options['n_items'] = args.items
+    if args.days is not None:
+        options['days'] = args.days
+    print(BUILDERS[args.schema](os.path.abspath(args.path), **options))
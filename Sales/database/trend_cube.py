@@ -0,0 +1,337 @@
+"""
+Pre-aggregated time-bucket cube for sales trends.
+
+The cube stores revenue, units and orders at every trend grain (daily, weekly,
+monthly, quarterly, annual) for the overall total and for each supported
+dimension, so trend queries read pre-bucketed rows instead of applying strftime
+to every fact row. It lives in its own writable SQLite file next to the read-only
+sales database and is refreshed incrementally from a date watermark.
+
+Period labels match the SQL groupings used by SalesTrendAnalyzer:
+    daily      YYYY-MM-DD
+    weekly     YYYY-WW (strftime %W, weeks start on Monday)
+    monthly    YYYY-MM
+    quarterly  YYYY-Qn
+    annual     YYYY
+
+Orders are COUNT(DISTINCT "Sales Txn Number") per day, summed over days; this
+assumes a transaction number belongs to a single day.
+"""
+
+import logging
+import os
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from . import config
+from .incremental_store import IncrementalStore
+
+logger = logging.getLogger(__name__)
+
+GRAINS = ['daily', 'weekly', 'monthly', 'quarterly', 'annual']
+
+# Dimension -> (id column, name column) on dbo_F_Sales_Transaction
+DIMENSION_FIELDS = {
+    'product': ('Item Key', 'Item Number'),
+    'category': ('Item Category Hrchy Key', 'Product Posting Group'),
+    'channel': ('Sales Organization Key', 'Business Unit Key'),
+    'region': ('Customer Geography Hrchy Key', 'Customer Geography Hrchy Key'),
+    'customer': ('Customer Key', 'Customer Key')
+}
+
+# Dimension value stored for the overall (no dimension) rows
+TOTAL = ''
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS trend_cube (
+        grain TEXT NOT NULL,
+        dimension TEXT NOT NULL,
+        period TEXT NOT NULL,
+        dimension_id,
+        dimension_name,
+        revenue REAL,
+        units REAL,
+        orders INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS idx_trend_cube ON trend_cube (grain, dimension, period);
+    CREATE TABLE IF NOT EXISTS cube_calendar (
+        day TEXT PRIMARY KEY,
+        weekly TEXT NOT NULL,
+        monthly TEXT NOT NULL,
+        quarterly TEXT NOT NULL,
+        annual TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS cube_periods (
+        grain TEXT NOT NULL,
+        period TEXT NOT NULL,
+        first_day TEXT NOT NULL,
+        last_day TEXT NOT NULL,
+        PRIMARY KEY (grain, period)
+    );
+    CREATE TABLE IF NOT EXISTS cube_state (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+"""
+
+def build_calendar(days: pd.Series) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Compute period labels and calendar period bounds for a set of days.
+    
+    Args:
+        days: Series of YYYY-MM-DD strings
+    
+    Returns:
+        Tuple of (calendar with one row per day and a label column per grain,
+        periods with grain, period, first_day and last_day)
+    """
+    dates = pd.to_datetime(pd.Series(days).drop_duplicates().sort_values(), format='%Y-%m-%d')
+    year_start = dates.dt.to_period('Y').dt.start_time
+    year_end = dates.dt.to_period('Y').dt.end_time.dt.normalize()
+    monday = dates - pd.to_timedelta(dates.dt.weekday, unit='D')
+    
+    labels = {
+        'daily': dates.dt.strftime('%Y-%m-%d'),
+        'weekly': dates.dt.strftime('%Y-%W'),
+        'monthly': dates.dt.strftime('%Y-%m'),
+        'quarterly': dates.dt.strftime('%Y-Q') + dates.dt.quarter.astype(str),
+        'annual': dates.dt.strftime('%Y')
+    }
+    bounds = {
+        'daily': (dates, dates),
+        # %W weeks are cut at the year boundary
+        'weekly': (monday.where(monday >= year_start, year_start),
+                   (monday + pd.Timedelta(days=6)).where(monday + pd.Timedelta(days=6) <= year_end, year_end)),
+        'monthly': (dates.dt.to_period('M').dt.start_time, dates.dt.to_period('M').dt.end_time.dt.normalize()),
+        'quarterly': (dates.dt.to_period('Q').dt.start_time, dates.dt.to_period('Q').dt.end_time.dt.normalize()),
+        'annual': (year_start, year_end)
+    }
+    
+    calendar = pd.DataFrame({'day': labels['daily']})
+    for grain in GRAINS[1:]:
+        calendar[grain] = labels[grain]
+    
+    periods = pd.concat([
+        pd.DataFrame({
+            'grain': grain,
+            'period': labels[grain],
+            'first_day': bounds[grain][0].dt.strftime('%Y-%m-%d'),
+            'last_day': bounds[grain][1].dt.strftime('%Y-%m-%d')
+        })
+        for grain in GRAINS
+    ]).drop_duplicates(subset=['grain', 'period'])
+    
+    return calendar, periods
+
+class TrendCube(IncrementalStore):
+    """Builds, refreshes and queries the trend cube."""
+    
+    SCHEMA = SCHEMA
+    STATE_TABLE = "cube_state"
+    
+    def __init__(self, cube_path: Optional[str] = None, dimensions: Optional[List[str]] = None,
+                 source_path: Optional[str] = None):
+        """
+        Initialize the cube.
+        
+        Args:
+            cube_path: Optional path to the cube database file. Defaults to config.TREND_CUBE['path']
+                for the configured sales database and to <name>_trend_cube.db next to any other.
+            dimensions: Dimensions to materialize. Defaults to all of DIMENSION_FIELDS.
+            source_path: Optional path to the sales database. Defaults to config.DATABASE['path'].
+        """
+        source_path = os.path.abspath(source_path or config.DATABASE['path'])
+        if cube_path is None:
+            if source_path == os.path.abspath(config.DATABASE['path']):
+                cube_path = config.TREND_CUBE['path']
+            else:
+                cube_path = f"{os.path.splitext(source_path)[0]}_trend_cube.db"
+        super().__init__(source_path, cube_path)
+        self.cube_path = self.store_path
+        self.dimensions = dimensions or list(DIMENSION_FIELDS)
+        for dimension in self.dimensions:
+            if dimension not in DIMENSION_FIELDS:
+                raise ValueError(f"Invalid dimension. Must be one of {list(DIMENSION_FIELDS)}")
+    
+    def refresh(self, full: bool = False) -> Dict[str, object]:
+        """
+        Bring the cube up to date with the sales database.
+        
+        An incremental refresh rebuilds only the days from the watermark (the last
+        day seen, which may have been partial) or from the earliest day of any rows
+        appended since the last refresh, whichever is earlier, and the weekly,
+        monthly, quarterly and annual periods that contain them. Use full=True after
+        in-place corrections to older transactions.
+        
+        Args:
+            full: Whether to rebuild the whole cube
+        
+        Returns:
+            Dictionary with the refresh mode, the first rebuilt day and the number of daily rows written
+        """
+        return super().refresh(full)
+    
+    def _refresh(self, conn: sqlite3.Connection, full: bool) -> Dict[str, object]:
+        source_conn = self._connect_source()
+        try:
+            state = self._get_state(conn)
+            source_version = self.source_version()
+            max_rowid = self.max_rowid(source_conn)
+            since = None if full else self.rebuild_from(state, source_conn)
+            
+            if since is None:
+                conn.execute("DELETE FROM trend_cube")
+                conn.execute("DELETE FROM cube_calendar")
+                conn.execute("DELETE FROM cube_periods")
+            else:
+                conn.execute("DELETE FROM trend_cube WHERE grain = 'daily' AND period >= ?", (since,))
+            
+            # Daily rows for the total and every dimension
+            daily_rows = 0
+            days = set()
+            for dimension in [TOTAL] + self.dimensions:
+                daily = self._scan_daily(source_conn, dimension, since)
+                daily_rows += len(daily)
+                days.update(daily['period'])
+                conn.executemany(
+                    "INSERT INTO trend_cube VALUES ('daily', ?, ?, ?, ?, ?, ?, ?)",
+                    daily[['dimension', 'period', 'dimension_id', 'dimension_name',
+                           'revenue', 'units', 'orders']].itertuples(index=False, name=None)
+                )
+            
+            # Calendar entries for the new days
+            if days:
+                calendar, periods = build_calendar(pd.Series(sorted(days)))
+                conn.executemany("INSERT OR REPLACE INTO cube_calendar VALUES (?, ?, ?, ?, ?)",
+                                 calendar.itertuples(index=False, name=None))
+                conn.executemany("INSERT OR REPLACE INTO cube_periods VALUES (?, ?, ?, ?)",
+                                 periods.itertuples(index=False, name=None))
+            
+            # Re-aggregate the coarser periods touched by the rebuilt days
+            rebuild_from = since or min(days, default=None)
+            if rebuild_from is not None:
+                for grain in GRAINS[1:]:
+                    first_period = conn.execute(
+                        f"SELECT MIN({grain}) FROM cube_calendar WHERE day >= ?", (rebuild_from,)
+                    ).fetchone()[0]
+                    if first_period is None:
+                        continue
+                    conn.execute("DELETE FROM trend_cube WHERE grain = ? AND period >= ?", (grain, first_period))
+                    conn.execute(f"""
+                        INSERT INTO trend_cube
+                        SELECT ?, d.dimension, cal.{grain}, d.dimension_id, d.dimension_name,
+                            SUM(d.revenue), SUM(d.units), SUM(d.orders)
+                        FROM trend_cube d
+                        JOIN cube_calendar cal ON cal.day = d.period
+                        WHERE d.grain = 'daily' AND cal.{grain} >= ?
+                        GROUP BY d.dimension, cal.{grain}, d.dimension_id, d.dimension_name
+                    """, (grain, first_period))
+            
+            self._set_state(conn, source_version, max_rowid,
+                            watermark=max(days) if days else state.get('watermark'))
+            conn.commit()
+            
+            logger.info(f"Refreshed trend cube ({'incremental' if since else 'full'}) "
+                        f"with {daily_rows} daily rows from {rebuild_from}")
+            return {
+                "mode": "incremental" if since else "full",
+                "rebuilt_from": rebuild_from,
+                "daily_rows": daily_rows
+            }
+        finally:
+            source_conn.close()
+    
+    def _scan_daily(self, source_conn, dimension: str, since: Optional[str]) -> pd.DataFrame:
+        """Aggregate fact rows per day (and dimension) from the sales database."""
+        select = [
+            'date("Txn Date") as period',
+            'SUM("Net Sales Amount") as revenue',
+            'SUM("Net Sales Quantity") as units',
+            'COUNT(DISTINCT "Sales Txn Number") as orders'
+        ]
+        group_by = ['date("Txn Date")']
+        if dimension:
+            id_field, name_field = DIMENSION_FIELDS[dimension]
+            select.extend([f'"{id_field}" as dimension_id', f'"{name_field}" as dimension_name'])
+            group_by.extend([f'"{id_field}"', f'"{name_field}"'])
+        else:
+            select.extend(['NULL as dimension_id', 'NULL as dimension_name'])
+        
+        query = f"""
+            SELECT {', '.join(select)}
+            FROM "dbo_F_Sales_Transaction"
+            WHERE "Deleted Flag" = 0
+                AND "Excluded Flag" = 0
+        """
+        params = ()
+        if since:
+            query += ' AND "Txn Date" >= ?'
+            params = (since,)
+        query += f" GROUP BY {', '.join(group_by)}"
+        
+        daily = pd.read_sql_query(query, source_conn, params=params)
+        daily.insert(0, 'dimension', dimension)
+        return daily
+    
+    def query(self, time_period: str, dimension: Optional[str], start_date: str, end_date: str,
+              refresh: bool = True) -> pd.DataFrame:
+        """
+        Read trend rows for a grain, dimension and date range.
+        
+        Periods that lie entirely inside the range come straight from the cube;
+        the (at most two) periods cut by the range edges are summed from daily rows.
+        
+        Args:
+            time_period: Grain ('daily', 'weekly', 'monthly', 'quarterly', 'annual')
+            dimension: Optional dimension ('product', 'category', 'channel', 'region', 'customer')
+            start_date: Start date (YYYY-MM-DD)
+            end_date: End date (YYYY-MM-DD)
+            refresh: Whether to refresh the cube first if the sales database changed
+        
+        Returns:
+            DataFrame with period, revenue, units, orders (and dimension_id, dimension_name),
+            ordered like SalesTrendAnalyzer's query
+        """
+        if time_period not in GRAINS:
+            raise ValueError(f"Invalid time period. Must be one of {GRAINS}")
+        if dimension and dimension not in self.dimensions:
+            raise ValueError(f"Dimension {dimension} is not materialized in the cube")
+        if refresh and not self.is_current():
+            self.refresh()
+        
+        columns = ['period', 'revenue', 'units', 'orders']
+        if dimension:
+            columns.extend(['dimension_id', 'dimension_name'])
+        
+        period_column = 'd.period' if time_period == 'daily' else f'cal.{time_period}'
+        query = f"""
+            SELECT c.period, c.revenue, c.units, c.orders, c.dimension_id, c.dimension_name
+            FROM trend_cube c
+            JOIN cube_periods p ON p.grain = c.grain AND p.period = c.period
+            WHERE c.grain = ? AND c.dimension = ?
+                AND p.first_day >= ? AND p.last_day <= ?
+            UNION ALL
+            SELECT {period_column}, SUM(d.revenue), SUM(d.units), SUM(d.orders),
+                d.dimension_id, d.dimension_name
+            FROM trend_cube d
+            JOIN cube_calendar cal ON cal.day = d.period
+            JOIN cube_periods p ON p.grain = ? AND p.period = {period_column}
+            WHERE d.grain = 'daily' AND d.dimension = ?
+                AND d.period BETWEEN ? AND ?
+                AND NOT (p.first_day >= ? AND p.last_day <= ?)
+            GROUP BY {period_column}, d.dimension_id, d.dimension_name
+        """
+        dimension_value = dimension or TOTAL
+        params = (time_period, dimension_value, start_date, end_date,
+                  time_period, dimension_value, start_date, end_date, start_date, end_date)
+        
+        conn = self._connect()
+        try:
+            data = pd.read_sql_query(query, conn, params=params)
+        finally:
+            conn.close()
+        
+        sort_columns = ['period', 'dimension_id'] if dimension else ['period']
+        return data.sort_values(sort_columns, ignore_index=True, kind='stable')[columns]
@@ -0,0 +1,332 @@
+#!/usr/bin/env python
+"""
+Analytics Service
+
+Long-lived HTTP service that hosts the Sales tool entry points behind a JSON-RPC
+endpoint. Unlike api_runner.py, which is spawned once per request, the service
+keeps pandas/numpy/matplotlib and the tool modules imported in a pool of warm
+worker processes, reuses pooled read-only database connections, and caches
+results per database version.
+
+Usage:
+    python Sales/service/analytics_service.py --port 8001 --workers 4
+
+Request (POST /rpc):
+    {"jsonrpc": "2.0", "method": "product_performance", "id": 1,
+     "params": {"start_date": "2019-01-01", "end_date": "2019-03-31",
+                "metrics": ["sales", "units"], "category_level": "category"}}
+
+The product_performance params are the same as api_runner's command line arguments.
+"""
+
+import os
+import sys
+import json
+import asyncio
+import argparse
+import importlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+# Make sure our project root is in the path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.insert(0, project_root)
+
+from Sales.database import config
+from Sales.database.connection import enable_connection_pool, get_data_version
+
+logging.basicConfig(level=config.LOGGING['level'], format=config.LOGGING['format'])
+logger = logging.getLogger(__name__)
+
+TOOLS_DIR = os.path.join(project_root, 'Sales', 'tools')
+
+# JSON-RPC 2.0 error codes
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+def _import_tool(tool_dir: str, module_name: str):
+    """Import a tool module the same way its own tests do (tool directory on sys.path)."""
+    tool_path = os.path.join(TOOLS_DIR, tool_dir)
+    if tool_path not in sys.path:
+        sys.path.insert(0, tool_path)
+    return importlib.import_module(module_name)
+
+def _params_to_argv(params: Dict[str, Any]) -> List[str]:
+    """Convert RPC params into api_runner style command line arguments."""
+    argv = []
+    for key, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple)):
+            value = ','.join(str(item) for item in value)
+        argv.extend([f'--{key}', str(value)])
+    return argv
+
+def _split_dates(params: Dict[str, Any]) -> tuple:
+    """Split start_date/end_date off the params used to construct an analyzer."""
+    init_params = dict(params)
+    start_date = init_params.pop('start_date', None)
+    end_date = init_params.pop('end_date', None)
+    init_params.setdefault('include_visualization', False)
+    return init_params, start_date, end_date
+
+def run_product_performance(params: Dict[str, Any]) -> Dict[str, Any]:
+    """ProductPerformanceAnalyzer via api_runner's argument contract."""
+    from Sales.tools.ProductPerformanceAnalyzer import api_runner
+    try:
+        args = api_runner.parse_args(_params_to_argv(params))
+    except SystemExit:
+        raise ValueError("Invalid parameters for product_performance. "
+                         "Required: start_date, end_date, metrics")
+    return api_runner.run_analyzer(args)
+
+def run_sales_trend(params: Dict[str, Any]) -> Dict[str, Any]:
+    """SalesTrendAnalyzer.analyze_trends."""
+    module = _import_tool('SalesTrendAnalyzer', 'SalesTrendAnalyzer')
+    init_params, start_date, end_date = _split_dates(params)
+    return module.SalesTrendAnalyzer(**init_params).analyze_trends(start_date, end_date)
+
+def run_sales_trend_all(params: Dict[str, Any]) -> Dict[str, Any]:
+    """SalesTrendAnalyzer.analyze_all_metrics (all metrics from one cached query)."""
+    module = _import_tool('SalesTrendAnalyzer', 'SalesTrendAnalyzer')
+    init_params, start_date, end_date = _split_dates(params)
+    metrics = init_params.pop('metrics', None)
+    return module.SalesTrendAnalyzer(**init_params).analyze_all_metrics(start_date, end_date, metrics)
+
+def run_sales_performance(params: Dict[str, Any]) -> Dict[str, Any]:
+    """SalesPerformanceAnalyzer.analyze_performance."""
+    module = _import_tool('SalesPerformanceAnalyzer', 'SalesPerformanceAnalyzer')
+    init_params, start_date, end_date = _split_dates(params)
+    return module.SalesPerformanceAnalyzer(**init_params).analyze_performance(start_date, end_date)
+
+def run_regional_sales(params: Dict[str, Any]) -> Dict[str, Any]:
+    """RegionalSalesAnalyzer.analyze_regional_sales."""
+    module = _import_tool('RegionalSalesAnalyzer', 'RegionalSalesAnalyzer')
+    return module.analyze_regional_sales(**params)
+
+def run_chart_status(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Status of a chart handle returned by sales_performance (charts render in the background)."""
+    module = _import_tool('SalesPerformanceAnalyzer', 'visualization_utils')
+    if not params.get('chart_id'):
+        raise ValueError("Invalid parameters for chart_status. Required: chart_id")
+    return module.get_render_queue().status(params['chart_id'])
+
+# RPC method name -> entry point
+TOOL_METHODS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    'product_performance': run_product_performance,
+    'sales_trend': run_sales_trend,
+    'sales_trend_all': run_sales_trend_all,
+    'sales_performance': run_sales_performance,
+    'regional_sales': run_regional_sales,
+    'chart_status': run_chart_status,
+}
+
+# Methods whose results change without a data change
+UNCACHED_METHODS = {'chart_status'}
+
+def is_cacheable(method: str, result: Any) -> bool:
+    """Whether a result can be served again from the cache.
+    
+    Errors may be transient, and a result whose chart handle is still pending
+    would keep reporting 'pending' after the chart is rendered.
+    """
+    if method in UNCACHED_METHODS:
+        return False
+    if not isinstance(result, dict):
+        return True
+    if result.get("status") == "error" or "error" in result:
+        return False
+    visualizations = result.get("visualizations")
+    return not (isinstance(visualizations, dict) and visualizations.get("status") == "pending")
+
+# (tool directory, module) pairs imported when a worker starts
+WARM_IMPORTS = [
+    (None, 'Sales.tools.ProductPerformanceAnalyzer.api_runner'),
+    ('SalesTrendAnalyzer', 'SalesTrendAnalyzer'),
+    ('SalesPerformanceAnalyzer', 'SalesPerformanceAnalyzer'),
+    ('RegionalSalesAnalyzer', 'RegionalSalesAnalyzer'),
+]
+
+def warm_worker():
+    """Worker initializer: enable connection pooling and import every tool up front."""
+    enable_connection_pool()
+    for tool_dir, module_name in WARM_IMPORTS:
+        try:
+            if tool_dir:
+                _import_tool(tool_dir, module_name)
+            else:
+                importlib.import_module(module_name)
+        except Exception as e:
+            logger.warning(f"Could not preload {module_name}: {str(e)}")
+
+def dispatch(method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a tool entry point. Executed inside a worker."""
+    if method not in TOOL_METHODS:
+        raise KeyError(method)
+    return TOOL_METHODS[method](params)
+
+def _json_default(value: Any) -> Any:
+    """JSON encoder fallback for numpy/pandas values returned by the analyzers."""
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+class ResultCache:
+    """Thread-safe LRU cache of serialized results keyed by method, params and data version."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(method: str, params: Dict[str, Any]) -> str:
+        return json.dumps([method, params, get_data_version()], sort_keys=True, default=str)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class RPCRequest(BaseModel):
+    """JSON-RPC 2.0 request body."""
+    jsonrpc: str = "2.0"
+    method: str
+    params: Dict[str, Any] = {}
+    id: Optional[Union[int, str]] = None
+
+def _rpc_response(request_id, result_json: Optional[str] = None,
+                  error_code: Optional[int] = None, error_message: Optional[str] = None) -> Response:
+    """Build a JSON-RPC response. result_json is already serialized to avoid re-encoding cached results."""
+    if error_code is not None:
+        body = json.dumps({
+            "jsonrpc": "2.0",
+            "error": {"code": error_code, "message": error_message},
+            "id": request_id
+        })
+    else:
+        body = f'{{"jsonrpc": "2.0", "result": {result_json}, "id": {json.dumps(request_id)}}}'
+    return Response(content=body, media_type='application/json')
+
+def create_app(workers: int = 0, cache_size: int = 256) -> FastAPI:
+    """
+    Create the analytics service application.
+
+    Args:
+        workers: Number of worker processes. 0 runs tools on a thread pool in this
+            process (useful for tests and single-core hosts).
+        cache_size: Maximum number of cached results (0 disables caching)
+
+    Returns:
+        FastAPI application
+    """
+    cache = ResultCache(max_entries=cache_size)
+    state: Dict[str, Executor] = {}
+
+    def get_executor() -> Executor:
+        if 'executor' not in state:
+            if workers > 0:
+                state['executor'] = ProcessPoolExecutor(max_workers=workers, initializer=warm_worker)
+                # Start every worker now so the first requests don't pay for the imports
+                for future in [state['executor'].submit(os.getpid) for _ in range(workers)]:
+                    future.result()
+            else:
+                warm_worker()
+                state['executor'] = ThreadPoolExecutor(max_workers=4)
+        return state['executor']
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        get_executor()
+        logger.info(f"Analytics service ready with {workers or 'in-process'} workers")
+        yield
+        if 'executor' in state:
+            state.pop('executor').shutdown(wait=False)
+
+    app = FastAPI(title="Sales Analytics Service", lifespan=lifespan)
+
+    @app.get("/health")
+    def health() -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "methods": sorted(TOOL_METHODS),
+            "workers": workers,
+            "data_version": get_data_version()
+        }
+
+    @app.post("/rpc")
+    async def rpc(request: RPCRequest) -> Response:
+        if request.method not in TOOL_METHODS:
+            return _rpc_response(request.id, error_code=METHOD_NOT_FOUND,
+                                 error_message=f"Method not found: {request.method}")
+
+        cache_key = cache.make_key(request.method, request.params)
+        cached = None if request.method in UNCACHED_METHODS else cache.get(cache_key)
+        if cached is not None:
+            return _rpc_response(request.id, result_json=cached)
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(get_executor(), dispatch, request.method, request.params)
+        except (TypeError, ValueError) as e:
+            return _rpc_response(request.id, error_code=INVALID_PARAMS, error_message=str(e))
+        except Exception as e:
+            logger.error(f"Error running {request.method}: {str(e)}")
+            return _rpc_response(request.id, error_code=SERVER_ERROR, error_message=str(e))
+
+        result_json = json.dumps(result, default=_json_default)
+        if is_cacheable(request.method, result):
+            cache.put(cache_key, result_json)
+        return _rpc_response(request.id, result_json=result_json)
+
+    app.state.cache = cache
+    return app
+
+def main() -> None:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description='Run the Sales analytics service')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Host to bind')
+    parser.add_argument('--port', type=int, default=8001, help='Port to bind')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Number of warm worker processes (0 = run in-process)')
+    parser.add_argument('--cache_size', type=int, default=256,
+                        help='Maximum number of cached results (0 disables caching)')
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(workers=args.workers, cache_size=args.cache_size),
+                host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import unittest
+import os
+import sys
+import json
+import sqlite3
+import tempfile
+
+from fastapi.testclient import TestClient
+
+# Add parent directory to path to import analytics_service
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, parent_dir)
+# Add project root to path
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
+sys.path.insert(0, project_dir)
+
+import analytics_service
+from analytics_service import create_app, _params_to_argv, ResultCache, is_cacheable
+from Sales.database.connection import ConnectionPool
+
+class TestAnalyticsService(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Start an in-process service for all tests."""
+        cls.client_context = TestClient(create_app(workers=0))
+        cls.client = cls.client_context.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client_context.__exit__(None, None, None)
+
+    def test_health(self):
+        """Test that the service lists the hosted tool entry points."""
+        response = self.client.get("/health")
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["status"], "ok")
+        self.assertIn("product_performance", body["methods"])
+        self.assertIn("sales_trend", body["methods"])
+
+    def test_params_to_argv(self):
+        """Test that RPC params map onto api_runner's command line arguments."""
+        argv = _params_to_argv({
+            "start_date": "2019-01-01",
+            "end_date": "2019-03-31",
+            "metrics": ["sales", "units"],
+            "category_level": "category",
+            "min_sales_threshold": None
+        })
+        self.assertEqual(argv, [
+            "--start_date", "2019-01-01",
+            "--end_date", "2019-03-31",
+            "--metrics", "sales,units",
+            "--category_level", "category"
+        ])
+
+    def test_unknown_method(self):
+        """Test the JSON-RPC error for an unknown method."""
+        response = self.client.post("/rpc", json={"jsonrpc": "2.0", "method": "nope", "id": 7})
+        body = response.json()
+        self.assertEqual(body["id"], 7)
+        self.assertEqual(body["error"]["code"], analytics_service.METHOD_NOT_FOUND)
+
+    def test_invalid_params(self):
+        """Test that missing api_runner arguments are reported as invalid params."""
+        response = self.client.post("/rpc", json={
+            "jsonrpc": "2.0",
+            "method": "product_performance",
+            "params": {"start_date": "2019-01-01"},
+            "id": 1
+        })
+        body = response.json()
+        self.assertEqual(body["error"]["code"], analytics_service.INVALID_PARAMS)
+
+    def test_product_performance(self):
+        """Test running ProductPerformanceAnalyzer through the service."""
+        response = self.client.post("/rpc", json={
+            "jsonrpc": "2.0",
+            "method": "product_performance",
+            "params": {
+                "start_date": "2019-01-01",
+                "end_date": "2019-03-31",
+                "metrics": ["sales"],
+                "category_level": "category"
+            },
+            "id": "abc"
+        })
+        body = response.json()
+        self.assertEqual(body["id"], "abc")
+        # Same payload shape as api_runner's stdout
+        self.assertIn("status", body["result"])
+
+    def test_chart_status(self):
+        """Test polling a chart handle; chart status is never served from the result cache."""
+        request = {
+            "jsonrpc": "2.0",
+            "method": "chart_status",
+            "params": {"chart_id": "missing_chart"},
+            "id": 1
+        }
+        for _ in range(2):
+            body = self.client.post("/rpc", json=request).json()
+            self.assertEqual(body["result"]["status"], "not_found")
+        cache = self.client.app.state.cache
+        self.assertIsNone(cache.get(cache.make_key("chart_status", request["params"])))
+
+    def test_chart_status_across_processes(self):
+        """Test that a chart queued by one process reports its state to every other process."""
+        sys.path.insert(0, os.path.join(project_dir, "Sales", "tools", "SalesPerformanceAnalyzer"))
+        import visualization_utils
+        chart_id = "cross_process_test_chart"
+        state = visualization_utils.chart_state_paths(chart_id)
+        visualization_utils.ensure_visualization_dir()
+        try:
+            # A fresh queue stands in for a worker that did not queue the chart
+            open(state["pending"], "w").close()
+            self.assertEqual(visualization_utils.ChartRenderQueue().status(chart_id)["status"], "pending")
+            body = self.client.post("/rpc", json={
+                "jsonrpc": "2.0", "method": "chart_status", "params": {"chart_id": chart_id}, "id": 1
+            }).json()
+            self.assertEqual(body["result"]["status"], "pending")
+
+            os.remove(state["pending"])
+            with open(state["error"], "w") as f:
+                f.write("render failed")
+            handle = visualization_utils.ChartRenderQueue().status(chart_id)
+            self.assertEqual((handle["status"], handle["error"]), ("error", "render failed"))
+        finally:
+            for path in state.values():
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def test_pending_results_are_not_cached(self):
+        """Test that results with a chart still rendering are not cached."""
+        result = {"status": "success", "data": [], "visualizations": {"chart_id": "c", "status": "pending"}}
+        self.assertFalse(is_cacheable("sales_performance", result))
+        result["visualizations"]["status"] = "ready"
+        self.assertTrue(is_cacheable("sales_performance", result))
+        self.assertFalse(is_cacheable("sales_performance", {"status": "error", "message": "x"}))
+        self.assertFalse(is_cacheable("chart_status", {"status": "ready"}))
+
+    def test_result_cache(self):
+        """Test the LRU result cache."""
+        cache = ResultCache(max_entries=2)
+        cache.put("a", json.dumps(1))
+        cache.put("b", json.dumps(2))
+        cache.get("a")
+        cache.put("c", json.dumps(3))
+        self.assertEqual(cache.get("a"), "1")
+        self.assertIsNone(cache.get("b"))
+        self.assertNotEqual(
+            ResultCache.make_key("product_performance", {"metrics": ["sales"]}),
+            ResultCache.make_key("product_performance", {"metrics": ["units"]})
+        )
+
+    def test_pooled_connection_double_close(self):
+        """Test that closing a pooled connection twice returns it to the pool once."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = os.path.join(tmpdir, "pool.db")
+            sqlite3.connect(db_path).close()
+            pool = ConnectionPool()
+            conn = pool.acquire(db_path)
+            conn.close()
+            conn.close()
+            first, second = pool.acquire(db_path), pool.acquire(db_path)
+            self.assertIs(first, conn)
+            self.assertIsNot(second, conn)
+            pool.close_all()
+            first.pool = second.pool = None
+            first.close()
+            second.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,7 +5,10 @@ Product Performance Analyzer tool for analyzing product-specific metrics and per
 import pandas as pd
 import numpy as np
 import logging
-from typing import Dict, Any, Optional, List, Union
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterator, Optional, List, Union
 from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
 import io
@@ -17,14 +20,41 @@ import sys
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../..'))
 sys.path.insert(0, project_root)
 
-from Sales.database.connection import get_connection
+from Sales.database.connection import get_connection, get_data_version
 from Sales.database.query_templates import get_latest_date
+from Sales.database.dimension_cache import get_dimension_cache
 from Sales.database import config
+from Sales.tools.performance_utils.quantile_sketch import QuantileSketch
 
 # Configure logging
 logging.basicConfig(level=config.LOGGING['level'])
 logger = logging.getLogger(__name__)
 
+# Product-grain aggregates keyed by (database path, data version, start date, end date)
+_PRODUCT_AGGREGATE_CACHE: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+
+_CACHE_SIZE = 32
+# Guards the module caches; the analytics service calls analyzers from worker threads
+_CACHE_LOCK = threading.Lock()
+
+# Unit-price quantile sketches keyed by (database path, data version, start date, end date)
+_PRICE_SKETCH_CACHE: "OrderedDict[tuple, QuantileSketch]" = OrderedDict()
+
+def _cache_get(cache: OrderedDict, key: tuple) -> Any:
+    """Look up a value in one of the module caches and mark it recently used (None on a miss)."""
+    with _CACHE_LOCK:
+        if key not in cache:
+            return None
+        cache.move_to_end(key)
+        return cache[key]
+
+def _cache_put(cache: OrderedDict, key: tuple, value: Any) -> None:
+    """Store a value in one of the module caches, evicting the least recently used entries."""
+    with _CACHE_LOCK:
+        cache[key] = value
+        while len(cache) > _CACHE_SIZE:
+            cache.popitem(last=False)
+
 class ProductPerformanceAnalyzer:
     """
     Analyzes product performance metrics including sales, margins, inventory turns,
@@ -33,13 +63,21 @@ class ProductPerformanceAnalyzer:
     
     VALID_METRICS = ['sales', 'units', 'margin', 'price_bands']
     VALID_CATEGORY_LEVELS = ['product', 'category', 'subcategory']
+    RESULT_COLUMNS = ['product_id', 'product_name', 'category', 'subcategory',
+                      'sales_amount', 'quantity', 'cost']
+    VALID_SORT_FIELDS = ['sales_amount', 'quantity', 'cost', 'product_name']
+    DEFAULT_PRICE_BAND_EDGES = [0, 10, 20, 50, 100]
+    PRICE_SKETCH_CHUNK_SIZE = 100000
     
     def __init__(self, 
                  metrics: List[str] = ['sales', 'units', 'margin'],
                  category_level: str = 'product',
                  min_sales_threshold: Optional[float] = None,
                  include_visualization: bool = True,
-                 db_path: Optional[str] = None):
+                 db_path: Optional[str] = None,
+                 rollup: bool = False,
+                 price_band_edges: Optional[List[float]] = None,
+                 price_band_quantiles: Optional[int] = None):
         """
         Initialize the ProductPerformanceAnalyzer.
         
@@ -49,18 +87,30 @@ class ProductPerformanceAnalyzer:
             min_sales_threshold: Minimum sales amount to include in analysis
             include_visualization: Whether to include visualizations in results
             db_path: Optional path to the database file
+            rollup: Whether to derive category levels from a cached product-grain scan
+                instead of grouping in SQL at the requested level
+            price_band_edges: Increasing lower edges of the price bands; the last band is open-ended
+            price_band_quantiles: If set, split unit prices into this many equal-count bands,
+                with edges estimated from a streaming quantile sketch of the line items
         """
         # Validate inputs
         if not all(metric in self.VALID_METRICS for metric in metrics):
             raise ValueError(f"Invalid metrics. Must be one of {self.VALID_METRICS}")
         if category_level not in self.VALID_CATEGORY_LEVELS:
             raise ValueError(f"Invalid category level. Must be one of {self.VALID_CATEGORY_LEVELS}")
+        if price_band_edges is not None and (len(price_band_edges) == 0 or np.any(np.diff(price_band_edges) <= 0)):
+            raise ValueError("Price band edges must be a non-empty, strictly increasing list")
+        if price_band_quantiles is not None and price_band_quantiles < 1:
+            raise ValueError("Number of price band quantiles must be at least 1")
             
         self.metrics = metrics
         self.category_level = category_level
         self.min_sales_threshold = min_sales_threshold
         self.include_visualization = include_visualization
         self.db_path = db_path or config.DATABASE['path']
+        self.rollup = rollup
+        self.price_band_edges = price_band_edges or self.DEFAULT_PRICE_BAND_EDGES
+        self.price_band_quantiles = price_band_quantiles
         
         logger.info(f"Initialized ProductPerformanceAnalyzer with metrics={metrics}, category_level={category_level}")
     
@@ -87,67 +137,349 @@ class ProductPerformanceAnalyzer:
             if not start_date:
                 start_date = (datetime.strptime(end_date, "%Y-%m-%d") - timedelta(days=30)).strftime("%Y-%m-%d")
             
-            # Build query
-            query = self._build_query()
+            if self.rollup:
+                # One product-grain scan per date range serves every category level
+                product_data = self.get_product_aggregate(start_date, end_date, wrapper)
+                data = self.rollup_product_data(product_data, self.category_level)
+            else:
+                # Build query
+                query = self._build_query()
+                
+                # Execute query
+                results = wrapper.fetchall(query, (start_date, end_date))
+                
+                # Convert to DataFrame
+                data = pd.DataFrame(results, columns=self.RESULT_COLUMNS)
             
-            # Execute query
-            results = wrapper.fetchall(query, (start_date, end_date))
+            # Close connections
+            conn.close()
+            wrapper.close()
             
-            if not results:
+            if data.empty:
                 return {
                     "status": "error",
                     "message": "No data found for the specified period"
                 }
             
-            # Convert to DataFrame
-            columns = ['product_id', 'product_name', 'category', 'subcategory', 
-                      'sales_amount', 'quantity', 'cost']
-            data = pd.DataFrame(results, columns=columns)
-            
-            # Apply minimum sales threshold if specified
-            if self.min_sales_threshold:
-                data = data[data['sales_amount'] >= self.min_sales_threshold]
-            
-            # Calculate metrics
-            analysis_results = {}
-            
-            if 'sales' in self.metrics:
-                analysis_results['sales'] = self._analyze_sales(data)
-            
-            if 'units' in self.metrics:
-                analysis_results['units'] = self._analyze_units(data)
+            return self.analyze_data(data, start_date, end_date)
             
-            if 'margin' in self.metrics:
-                analysis_results['margin'] = self._analyze_margins(data)
-            
-            if 'price_bands' in self.metrics:
-                analysis_results['price_bands'] = self._analyze_price_bands(data)
+        except Exception as e:
+            logger.error(f"Error analyzing product performance: {str(e)}")
+            return {
+                "status": "error",
+                "message": str(e)
+            }
+    
+    def analyze_data(self, data: pd.DataFrame, start_date: str, end_date: str) -> Dict[str, Any]:
+        """
+        Run the configured metric analyses on already-fetched product data.
+        
+        Args:
+            data: DataFrame with RESULT_COLUMNS at this analyzer's category level
+            start_date: Start date of the period the data covers (YYYY-MM-DD)
+            end_date: End date of the period the data covers (YYYY-MM-DD)
+        
+        Returns:
+            Dictionary containing analysis results
+        """
+        # Apply minimum sales threshold if specified
+        if self.min_sales_threshold:
+            data = data[data['sales_amount'] >= self.min_sales_threshold]
+        
+        # Calculate metrics
+        analysis_results = {}
+        
+        if 'sales' in self.metrics:
+            analysis_results['sales'] = self._analyze_sales(data)
+        
+        if 'units' in self.metrics:
+            analysis_results['units'] = self._analyze_units(data)
+        
+        if 'margin' in self.metrics:
+            analysis_results['margin'] = self._analyze_margins(data)
+        
+        if 'price_bands' in self.metrics:
+            edges = None
+            if self.price_band_quantiles:
+                edges = self.get_quantile_price_band_edges(start_date, end_date)
+            analysis_results['price_bands'] = self._analyze_price_bands(data, edges)
+        
+        # Add visualization if requested
+        if self.include_visualization:
+            self._create_visualization(data)
+        
+        return {
+            "status": "success",
+            "period": {"start": start_date, "end": end_date},
+            "results": analysis_results
+        }
+    
+    def analyze_drilldown(self, start_date: str, end_date: str,
+                          levels: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Analyze several category levels from a single product-grain scan.
+        
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            levels: Category levels to analyze. Defaults to VALID_CATEGORY_LEVELS.
+        
+        Returns:
+            Dictionary containing analysis results per category level
+        """
+        levels = levels or self.VALID_CATEGORY_LEVELS
+        try:
+            if not all(level in self.VALID_CATEGORY_LEVELS for level in levels):
+                raise ValueError(f"Invalid category level. Must be one of {self.VALID_CATEGORY_LEVELS}")
             
-            # Add visualization if requested
-            if self.include_visualization:
-                self._create_visualization(data)
+            product_data = self.get_product_aggregate(start_date, end_date)
+            if product_data.empty:
+                return {
+                    "status": "error",
+                    "message": "No data found for the specified period"
+                }
             
-            # Close connections
-            conn.close()
-            wrapper.close()
+            results = {}
+            for level in levels:
+                level_data = self.rollup_product_data(product_data, level)
+                results[level] = self.analyze_data(level_data, start_date, end_date)["results"]
             
             return {
                 "status": "success",
                 "period": {"start": start_date, "end": end_date},
-                "results": analysis_results
+                "results": results
             }
             
         except Exception as e:
-            logger.error(f"Error analyzing product performance: {str(e)}")
+            logger.error(f"Error analyzing product drilldown: {str(e)}")
+            return {
+                "status": "error",
+                "message": str(e)
+            }
+    
+    def get_product_page(self, start_date: str, end_date: str, limit: Optional[int] = 50,
+                         offset: int = 0, sort_by: str = 'sales_amount',
+                         ascending: bool = False) -> Dict[str, Any]:
+        """
+        Get one page of grouped rows plus the totals over all rows, pushing sorting and paging into SQL.
+        
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            limit: Maximum number of rows to return (None returns all rows)
+            offset: Number of rows to skip
+            sort_by: Column to sort by (one of VALID_SORT_FIELDS)
+            ascending: Whether to sort in ascending order
+        
+        Returns:
+            Dictionary with the page, the overall totals and the page rows
+        """
+        try:
+            rows = self.iter_product_page(start_date, end_date, limit, offset, sort_by, ascending)
+            result = next(rows)
+            if result["status"] == "success":
+                result["items"] = list(rows)
+            return result
+        except Exception as e:
+            logger.error(f"Error fetching product page: {str(e)}")
             return {
                 "status": "error",
                 "message": str(e)
             }
     
-    def _build_query(self) -> str:
+    def iter_product_page(self, start_date: str, end_date: str, limit: Optional[int] = 50,
+                          offset: int = 0, sort_by: str = 'sales_amount',
+                          ascending: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Stream one page of grouped rows from the database cursor.
+        
+        The first item is a summary (status, period, page and totals); each following
+        item is one row with RESULT_COLUMNS. Arguments are as for get_product_page.
+        
+        Yields:
+            The summary dictionary, then one dictionary per row
+        """
+        query = self._build_page_query(sort_by, ascending)
+        conn, wrapper = get_connection()
+        try:
+            cursor = wrapper.execute(query, (
+                start_date, end_date, self.min_sales_threshold,
+                -1 if limit is None else limit, offset
+            ))
+            first = cursor.fetchone()
+            
+            if first is None:
+                # An offset past the last row still reports the totals
+                first = wrapper.fetchone(
+                    self._build_page_query(sort_by, ascending),
+                    (start_date, end_date, self.min_sales_threshold, 1, 0)
+                )
+                if first is None:
+                    yield {
+                        "status": "error",
+                        "message": "No data found for the specified period"
+                    }
+                    return
+                rows = iter(())
+            else:
+                rows = itertools.chain([first], cursor)
+            
+            yield {
+                "status": "success",
+                "period": {"start": start_date, "end": end_date},
+                "page": {
+                    "limit": limit,
+                    "offset": offset,
+                    "sort_by": sort_by,
+                    "ascending": ascending,
+                    "total_rows": first["total_rows"]
+                },
+                "totals": {
+                    "sales_amount": first["total_sales_amount"],
+                    "quantity": first["total_quantity"],
+                    "cost": first["total_cost"]
+                }
+            }
+            
+            for row in rows:
+                yield {col: row[col] for col in self.RESULT_COLUMNS}
+        finally:
+            conn.close()
+            wrapper.close()
+    
+    def get_product_aggregate(self, start_date: str, end_date: str, wrapper=None) -> pd.DataFrame:
+        """
+        Get the product-grain aggregate for a date range, scanning the fact table only on a cache miss.
+        
+        The scan groups on item keys only; item names and categories are attached
+        to the aggregated rows from the dimension cache. The result is cached by
+        database version, so it is invalidated when the database file changes. The
+        returned frame is shared and must not be modified.
+        
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            wrapper: Optional open ReadOnlyConnection to run the scan on
+        
+        Returns:
+            DataFrame with RESULT_COLUMNS, one row per product, sorted by sales
+        """
+        key = (self.db_path, get_data_version(self.db_path), start_date, end_date)
+        product_data = _cache_get(_PRODUCT_AGGREGATE_CACHE, key)
+        if product_data is not None:
+            return product_data
+        
+        query = self._build_key_query()
+        if wrapper is not None:
+            results = wrapper.fetchall(query, (start_date, end_date))
+        else:
+            conn, wrapper = get_connection()
+            try:
+                results = wrapper.fetchall(query, (start_date, end_date))
+            finally:
+                conn.close()
+                wrapper.close()
+        
+        product_data = pd.DataFrame(results, columns=['product_id', 'sales_amount', 'quantity', 'cost'])
+        product_data = get_dimension_cache().attach(product_data, 'item', 'product_id')
+        product_data = product_data[self.RESULT_COLUMNS].sort_values('sales_amount', ascending=False, ignore_index=True)
+        _cache_put(_PRODUCT_AGGREGATE_CACHE, key, product_data)
+        return product_data
+    
+    def get_unit_price_sketch(self, start_date: str, end_date: str) -> QuantileSketch:
+        """
+        Get a quantile sketch of line-item unit prices for a date range.
+        
+        The fact table is read in chunks of PRICE_SKETCH_CHUNK_SIZE rows and each chunk
+        is folded into the sketch, so no full sort of the line items is needed. Sketches
+        are cached per database version and date range.
+        
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+        
+        Returns:
+            QuantileSketch over the unit prices
+        """
+        key = (self.db_path, get_data_version(self.db_path), start_date, end_date)
+        sketch = _cache_get(_PRICE_SKETCH_CACHE, key)
+        if sketch is not None:
+            return sketch
+        
+        query = """
+            SELECT t."Net Sales Amount" * 1.0 / t."Net Sales Quantity" as unit_price
+            FROM "dbo_F_Sales_Transaction" t
+            WHERE t."Txn Date" BETWEEN ? AND ?
+                AND t."Deleted Flag" = 0
+                AND t."Excluded Flag" = 0
+                AND t."Net Sales Quantity" > 0
+        """
+        
+        sketch = QuantileSketch()
+        conn, wrapper = get_connection()
+        try:
+            for chunk in pd.read_sql_query(query, conn, params=(start_date, end_date),
+                                           chunksize=self.PRICE_SKETCH_CHUNK_SIZE):
+                sketch.update(chunk['unit_price'].to_numpy(dtype=float))
+        finally:
+            conn.close()
+            wrapper.close()
+        
+        _cache_put(_PRICE_SKETCH_CACHE, key, sketch)
+        return sketch
+    
+    def get_quantile_price_band_edges(self, start_date: str, end_date: str) -> List[float]:
+        """
+        Get data-driven price band edges that split line-item unit prices into equal-count bands.
+        
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+        
+        Returns:
+            Increasing band edges starting at 0 (the default edges if there is no data)
+        """
+        sketch = self.get_unit_price_sketch(start_date, end_date)
+        if sketch.count == 0:
+            return list(self.price_band_edges)
+        
+        fractions = np.linspace(0, 1, self.price_band_quantiles + 1)[1:-1]
+        inner = np.round(sketch.quantiles(fractions), 2)
+        return [0.0] + [float(edge) for edge in np.unique(inner[inner > 0])]
+    
+    @classmethod
+    def rollup_product_data(cls, product_data: pd.DataFrame, category_level: str) -> pd.DataFrame:
+        """
+        Derive category or subcategory level data from a product-grain aggregate.
+        
+        Mirrors the SQL grouping in _build_query: amounts are summed per group, the
+        other descriptive columns keep a representative value, and rows are sorted by sales.
+        
+        Args:
+            product_data: Product-grain DataFrame from get_product_aggregate
+            category_level: Level of product categorization ('product', 'category', 'subcategory')
+        
+        Returns:
+            New DataFrame with RESULT_COLUMNS at the requested level
+        """
+        if category_level == 'product':
+            return product_data.copy()
+        
+        agg = {col: 'first' for col in cls.RESULT_COLUMNS
+               if col not in (category_level, 'sales_amount', 'quantity', 'cost')}
+        agg.update({'sales_amount': 'sum', 'quantity': 'sum', 'cost': 'sum'})
+        
+        rolled = product_data.groupby(category_level, dropna=False, sort=False).agg(agg).reset_index()
+        return rolled[cls.RESULT_COLUMNS].sort_values('sales_amount', ascending=False, ignore_index=True)
+    
+    def _build_query(self, category_level: Optional[str] = None, ordered: bool = True) -> str:
         """
         Build the SQL query for product performance analysis.
         
+        Args:
+            category_level: Optional grouping level. Defaults to this analyzer's category level.
+            ordered: Whether to order the groups by sales amount
+        
         Returns:
             SQL query string
         """
@@ -168,24 +500,79 @@ class ProductPerformanceAnalyzer:
         """
         
         # Add grouping based on category level
-        if self.category_level == 'product':
+        category_level = category_level or self.category_level
+        if category_level == 'product':
             query += """
                 GROUP BY i."Item Key", i."Item Desc", i."Item Category Desc", i."Item Subcategory Desc"
-                ORDER BY sales_amount DESC
             """
-        elif self.category_level == 'category':
+        elif category_level == 'category':
             query += """
                 GROUP BY i."Item Category Desc"
-                ORDER BY sales_amount DESC
             """
         else:  # subcategory
             query += """
                 GROUP BY i."Item Subcategory Desc"
+            """
+        
+        if ordered:
+            query += """
                 ORDER BY sales_amount DESC
             """
         
         return query
     
+    def _build_key_query(self) -> str:
+        """
+        Build the SQL query for the product-grain aggregate on item keys only.
+        
+        Returns:
+            SQL query string
+        """
+        return """
+            SELECT 
+                t."Item Key" as product_id,
+                SUM(t."Net Sales Amount") as sales_amount,
+                SUM(t."Net Sales Quantity") as quantity,
+                SUM(t."Net Sales Amount") as cost  -- Using sales amount as placeholder since cost data is not available
+            FROM "dbo_F_Sales_Transaction" t
+            WHERE t."Txn Date" BETWEEN ? AND ?
+                AND t."Deleted Flag" = 0
+                AND t."Excluded Flag" = 0
+            GROUP BY t."Item Key"
+        """
+    
+    def _build_page_query(self, sort_by: str, ascending: bool) -> str:
+        """
+        Build the SQL query for one page of grouped rows.
+        
+        Window aggregates over the filtered groups return the overall totals on every
+        row, so a page and its totals come from the same scan. Parameters are
+        (start_date, end_date, min_sales_threshold, limit, offset).
+        
+        Args:
+            sort_by: Column to sort by (one of VALID_SORT_FIELDS)
+            ascending: Whether to sort in ascending order
+        
+        Returns:
+            SQL query string
+        """
+        if sort_by not in self.VALID_SORT_FIELDS:
+            raise ValueError(f"Invalid sort field. Must be one of {self.VALID_SORT_FIELDS}")
+        direction = 'ASC' if ascending else 'DESC'
+        
+        return f"""
+            SELECT 
+                g.*,
+                COUNT(*) OVER () as total_rows,
+                SUM(g.sales_amount) OVER () as total_sales_amount,
+                SUM(g.quantity) OVER () as total_quantity,
+                SUM(g.cost) OVER () as total_cost
+            FROM ({self._build_query(ordered=False)}) g
+            WHERE g.sales_amount >= COALESCE(?, g.sales_amount)
+            ORDER BY g.{sort_by} {direction}, g.product_id
+            LIMIT ? OFFSET ?
+        """
+    
     def _analyze_sales(self, data: pd.DataFrame) -> Dict[str, Any]:
         """
         Analyze sales performance metrics.
@@ -295,55 +682,54 @@ class ProductPerformanceAnalyzer:
             logger.error(f"Error analyzing margins: {str(e)}")
             raise
     
-    def _analyze_price_bands(self, data: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_price_bands(self, data: pd.DataFrame, edges: Optional[List[float]] = None) -> Dict[str, Any]:
         """
         Analyze product price bands.
         
         Args:
             data: DataFrame containing product data
+            edges: Optional band edges. Defaults to this analyzer's price_band_edges.
             
         Returns:
             Dictionary containing price band analysis
         """
         try:
-            # Calculate average price per unit and handle missing values
-            data['avg_price'] = data['sales_amount'] / data['quantity'].replace(0, np.nan)
-            data = data.dropna(subset=['avg_price'])
+            edges = np.asarray(edges if edges is not None else self.price_band_edges, dtype=float)
+            labels = self._price_band_labels(edges)
             
-            if data.empty:
+            # Calculate average price per unit and drop products without units
+            sales = data['sales_amount'].to_numpy(dtype=float)
+            quantity = data['quantity'].to_numpy(dtype=float)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                avg_price = sales / np.where(quantity == 0, np.nan, quantity)
+            valid = ~np.isnan(avg_price)
+            
+            if not valid.any():
                 return {
                     "price_bands": [],
                     "distribution": {}
                 }
             
-            # Define price bands
-            price_bands = [
-                (0, 10),
-                (10, 20),
-                (20, 50),
-                (50, 100),
-                (100, float('inf'))
-            ]
-            
-            # Calculate distribution
-            distribution = {}
-            for lower, upper in price_bands:
-                if upper == float('inf'):
-                    mask = data['avg_price'] >= lower
-                else:
-                    mask = (data['avg_price'] >= lower) & (data['avg_price'] < upper)
-                
-                band_data = data[mask]
-                if not band_data.empty:
-                    distribution[f"${lower}-{upper if upper != float('inf') else '∞'}"] = {
-                        'count': len(band_data),
-                        'total_sales': band_data['sales_amount'].sum(),
-                        'avg_price': band_data['avg_price'].mean()
-                    }
+            # Band i covers [edges[i], edges[i + 1]); prices below the first edge fall in no band
+            bands = np.digitize(avg_price[valid], edges) - 1
+            in_band = bands >= 0
+            bands = bands[in_band]
+            
+            counts = np.bincount(bands, minlength=len(edges))
+            total_sales = np.bincount(bands, weights=sales[valid][in_band], minlength=len(edges))
+            price_sums = np.bincount(bands, weights=avg_price[valid][in_band], minlength=len(edges))
+            
+            distribution = {
+                labels[band]: {
+                    'count': int(counts[band]),
+                    'total_sales': float(total_sales[band]),
+                    'avg_price': float(price_sums[band] / counts[band])
+                }
+                for band in np.flatnonzero(counts)
+            }
             
             return {
-                "price_bands": [f"${lower}-{upper if upper != float('inf') else '∞'}" 
-                              for lower, upper in price_bands],
+                "price_bands": labels,
                 "distribution": distribution
             }
             
@@ -354,6 +740,20 @@ class ProductPerformanceAnalyzer:
                 "distribution": {}
             }
     
+    @staticmethod
+    def _price_band_labels(edges: np.ndarray) -> List[str]:
+        """
+        Build price band labels such as "$0-10" and "$100-∞".
+        
+        Args:
+            edges: Increasing band edges
+        
+        Returns:
+            List of labels, one per band
+        """
+        bounds = [f"{edge:g}" for edge in edges] + ['∞']
+        return [f"${lower}-{upper}" for lower, upper in zip(bounds[:-1], bounds[1:])]
+    
     def _create_visualization(self, data: pd.DataFrame) -> None:
         """
         Create visualization of product performance metrics.
@@ -4,13 +4,31 @@ API Runner for ProductPerformanceAnalyzer
 
 This script acts as a bridge between the Next.js API route and the ProductPerformanceAnalyzer class.
 It parses command line arguments, runs the analyzer, and returns the result as JSON to stdout.
+
+Batch mode (--batch FILE, or --batch - for stdin) takes a JSON list of analysis specs:
+    
+    [{"id": "kpis", "start_date": "2019-01-01", "end_date": "2019-03-31",
+      "metrics": ["sales", "units"], "category_level": "category"}, ...]
+
+Specs sharing a date range are answered from a single product-grain scan of the fact
+table. One JSON line per spec ({"id": ..., "status": ..., ...}) is streamed to stdout
+as soon as it is ready.
+
+Page mode (--limit N [--offset M] [--sort_by COLUMN] [--sort_order asc|desc]) returns one
+page of products sorted and paged in SQL, with totals over all products. With
+--output ndjson, the rows are streamed instead: a summary line (period, page, totals)
+followed by one line per row, so the first page can be rendered before the rest arrives.
 """
 
 import sys
 import os
 import json
 import argparse
-from typing import List, Optional
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
 
 # Add the project root to the Python path
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../..'))
@@ -18,14 +36,14 @@ sys.path.insert(0, project_root)
 
 from Sales.tools.ProductPerformanceAnalyzer.ProductPerformanceAnalyzer import ProductPerformanceAnalyzer
 
-def parse_args() -> argparse.Namespace:
-    """Parse command line arguments."""
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line argument parser."""
     parser = argparse.ArgumentParser(description='Run the Product Performance Analyzer')
     
-    # Required arguments
-    parser.add_argument('--start_date', type=str, required=True, help='Start date in YYYY-MM-DD format')
-    parser.add_argument('--end_date', type=str, required=True, help='End date in YYYY-MM-DD format')
-    parser.add_argument('--metrics', type=str, required=True, help='Comma-separated list of metrics to analyze')
+    # Required arguments (unless running in batch mode)
+    parser.add_argument('--start_date', type=str, help='Start date in YYYY-MM-DD format')
+    parser.add_argument('--end_date', type=str, help='End date in YYYY-MM-DD format')
+    parser.add_argument('--metrics', type=str, help='Comma-separated list of metrics to analyze')
     
     # Optional arguments
     parser.add_argument('--category_level', type=str, default='product', 
@@ -33,12 +51,76 @@ def parse_args() -> argparse.Namespace:
                        help='Level of product categorization')
     parser.add_argument('--min_sales_threshold', type=float, default=None,
                        help='Minimum sales amount to include in analysis')
+    parser.add_argument('--price_band_edges', type=str, default=None,
+                       help='Comma-separated, increasing lower edges of the price bands')
+    parser.add_argument('--price_band_quantiles', type=int, default=None,
+                       help='Use this many equal-count price bands estimated from the data')
+    parser.add_argument('--batch', type=str, default=None,
+                       help='Path to a JSON list of analysis specs ("-" reads stdin)')
     
-    return parser.parse_args()
+    # Paging arguments
+    parser.add_argument('--limit', type=int, default=None,
+                       help='Return one page of at most this many rows instead of the metric analysis')
+    parser.add_argument('--offset', type=int, default=0,
+                       help='Number of rows to skip before the page')
+    parser.add_argument('--sort_by', type=str, default='sales_amount',
+                       choices=ProductPerformanceAnalyzer.VALID_SORT_FIELDS,
+                       help='Column to sort the page by')
+    parser.add_argument('--sort_order', type=str, default='desc', choices=['asc', 'desc'],
+                       help='Sort order of the page')
+    parser.add_argument('--output', type=str, default='json', choices=['json', 'ndjson'],
+                       help='ndjson streams the page rows one JSON line at a time')
+    
+    return parser
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments (defaults to sys.argv)."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.batch:
+        required = ('start_date', 'end_date') if is_page_request(args) else ('start_date', 'end_date', 'metrics')
+        missing = [name for name in required if not getattr(args, name)]
+        if missing:
+            parser.error(f"the following arguments are required: {', '.join('--' + name for name in missing)}")
+    return args
+
+def is_page_request(args: argparse.Namespace) -> bool:
+    """Whether the arguments ask for a page of rows rather than the metric analysis."""
+    return args.limit is not None or args.output == 'ndjson'
+
+def _page_analyzer(args: argparse.Namespace) -> ProductPerformanceAnalyzer:
+    """Create the analyzer used for page requests (metrics are not needed)."""
+    return ProductPerformanceAnalyzer(
+        category_level=args.category_level,
+        min_sales_threshold=args.min_sales_threshold,
+        include_visualization=False
+    )
+
+def _page_kwargs(args: argparse.Namespace) -> Dict[str, Any]:
+    """Paging arguments for ProductPerformanceAnalyzer.get_product_page/iter_product_page."""
+    return {
+        "start_date": args.start_date,
+        "end_date": args.end_date,
+        "limit": args.limit,
+        "offset": args.offset,
+        "sort_by": args.sort_by,
+        "ascending": args.sort_order == 'asc'
+    }
+
+def parse_price_band_edges(edges: Optional[Any]) -> Optional[List[float]]:
+    """Parse price band edges given as a comma-separated string or a list."""
+    if edges is None:
+        return None
+    if isinstance(edges, str):
+        edges = edges.split(',')
+    return [float(edge) for edge in edges]
 
 def run_analyzer(args: argparse.Namespace) -> dict:
     """Run the Product Performance Analyzer with the given arguments."""
     try:
+        if is_page_request(args):
+            return _page_analyzer(args).get_product_page(**_page_kwargs(args))
+        
         # Parse metrics
         metrics = args.metrics.split(',')
         
@@ -56,7 +138,10 @@ def run_analyzer(args: argparse.Namespace) -> dict:
             metrics=metrics,
             category_level=args.category_level,
             min_sales_threshold=args.min_sales_threshold,
-            include_visualization=False  # No visualizations for API calls
+            price_band_edges=parse_price_band_edges(args.price_band_edges),
+            price_band_quantiles=args.price_band_quantiles,
+            include_visualization=False,  # No visualizations for API calls
+            rollup=True  # Drill-downs in the same range reuse one product-grain scan
         )
         
         # Run the analysis
@@ -73,13 +158,104 @@ def run_analyzer(args: argparse.Namespace) -> dict:
             "message": str(e)
         }
 
+def _run_spec(spec: Dict[str, Any], product_data: pd.DataFrame,
+              levels: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+    """Run one batch spec against the shared product-grain aggregate."""
+    try:
+        metrics = spec.get('metrics', [])
+        if isinstance(metrics, str):
+            metrics = metrics.split(',')
+        category_level = spec.get('category_level', 'product')
+        
+        analyzer = ProductPerformanceAnalyzer(
+            metrics=metrics,
+            category_level=category_level,
+            min_sales_threshold=spec.get('min_sales_threshold'),
+            price_band_edges=parse_price_band_edges(spec.get('price_band_edges')),
+            price_band_quantiles=spec.get('price_band_quantiles'),
+            include_visualization=False
+        )
+        
+        if category_level not in levels:
+            levels[category_level] = analyzer.rollup_product_data(product_data, category_level)
+        
+        # Metric analyses add helper columns, so each spec gets its own copy
+        return analyzer.analyze_data(levels[category_level].copy(), spec['start_date'], spec['end_date'])
+        
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": str(e)
+        }
+
+def run_batch(specs: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Run many analysis specs, sharing one fact-table scan per date range.
+    
+    Args:
+        specs: List of dicts with start_date, end_date, metrics and optional
+            category_level, min_sales_threshold, price_band_edges, price_band_quantiles and id
+    
+    Yields:
+        One result dict per spec, tagged with the spec's id (or its list index)
+    """
+    groups = OrderedDict()
+    for index, spec in enumerate(specs):
+        if not spec.get('start_date') or not spec.get('end_date'):
+            yield {"id": spec.get('id', index), "status": "error",
+                   "message": "start_date and end_date are required"}
+            continue
+        groups.setdefault((spec['start_date'], spec['end_date']), []).append((spec.get('id', index), spec))
+    
+    for (start_date, end_date), group in groups.items():
+        try:
+            product_data = ProductPerformanceAnalyzer(include_visualization=False).get_product_aggregate(start_date, end_date)
+            error = None if not product_data.empty else "No data found for the specified period"
+        except Exception as e:
+            error = str(e)
+        
+        levels = {}
+        for spec_id, spec in group:
+            if error:
+                yield {"id": spec_id, "status": "error", "message": error}
+            else:
+                yield {"id": spec_id, **_run_spec(spec, product_data, levels)}
+
+def _json_default(value: Any) -> Any:
+    """JSON encoder fallback for numpy values returned by the analyzer."""
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    return str(value)
+
 def main() -> None:
     """Main entry point."""
     args = parse_args()
+    
+    if args.batch:
+        # Stream one JSON line per spec
+        source = sys.stdin if args.batch == '-' else open(args.batch)
+        with source:
+            specs = json.load(source)
+        for result in run_batch(specs):
+            print(json.dumps(result, default=_json_default), flush=True)
+        return
+    
+    if args.output == 'ndjson':
+        # Stream the summary line, then one line per row
+        try:
+            for index, item in enumerate(_page_analyzer(args).iter_product_page(**_page_kwargs(args))):
+                # Flush the summary right away; rows go through the normal stdout buffer
+                print(json.dumps(item, default=_json_default), flush=index == 0)
+        except Exception as e:
+            print(json.dumps({"status": "error", "message": str(e)}), flush=True)
+        return
+    
     result = run_analyzer(args)
     
     # Output result as JSON to stdout
-    print(json.dumps(result))
+    print(json.dumps(result, default=_json_default))
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main() 
@@ -3,6 +3,7 @@ import os
 import sys
 import pandas as pd
 import sqlite3
+import tempfile
 
 # Add parent directory to path to import ProductPerformanceAnalyzer
 parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -12,6 +13,8 @@ project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../
 sys.path.insert(0, project_dir)
 
 from ProductPerformanceAnalyzer import ProductPerformanceAnalyzer
+from Sales.tools.ProductPerformanceAnalyzer import api_runner
+from Sales.database.dimension_cache import DimensionCache, DimensionTable
 
 class TestProductPerformanceAnalyzer(unittest.TestCase):
     
@@ -103,6 +106,127 @@ class TestProductPerformanceAnalyzer(unittest.TestCase):
         
         # Check calculations
         self.assertEqual(result["total_margin"], 3300)  # Sum of (1000-500) + (2000-1000) + (3000-1200)
+        
+    def test_batch_rollup(self):
+        """Test deriving category level data from a product-grain aggregate."""
+        product_data = pd.DataFrame({
+            "product_id": [1, 2, 3],
+            "product_name": ["Product A", "Product B", "Product C"],
+            "category": ["Category 1", "Category 2", "Category 1"],
+            "subcategory": ["Sub 1", "Sub 2", "Sub 3"],
+            "sales_amount": [1000.0, 2500.0, 2000.0],
+            "quantity": [10, 25, 20],
+            "cost": [500.0, 1000.0, 1200.0]
+        })
+        
+        rolled = ProductPerformanceAnalyzer.rollup_product_data(product_data, "category")
+        self.assertEqual(list(rolled.columns), ProductPerformanceAnalyzer.RESULT_COLUMNS)
+        self.assertEqual(list(rolled["category"]), ["Category 1", "Category 2"])
+        self.assertEqual(list(rolled["sales_amount"]), [3000.0, 2500.0])
+        self.assertEqual(list(rolled["quantity"]), [30, 25])
+        
+        # Batch mode does not need the single-run arguments
+        args = api_runner.parse_args(["--batch", "-"])
+        self.assertEqual(args.batch, "-")
+        with self.assertRaises(SystemExit):
+            api_runner.parse_args(["--start_date", "2019-01-01"])
+    
+    def test_analyze_drilldown_uses_cached_aggregate(self):
+        """Test that every category level is served from one cached product-grain aggregate."""
+        import ProductPerformanceAnalyzer as module
+        analyzer = ProductPerformanceAnalyzer(metrics=["sales", "units"], include_visualization=False)
+        product_data = pd.DataFrame({
+            "product_id": [1, 2],
+            "product_name": ["Product A", "Product B"],
+            "category": ["Category 1", "Category 1"],
+            "subcategory": ["Sub 1", "Sub 2"],
+            "sales_amount": [1000.0, 500.0],
+            "quantity": [10, 5],
+            "cost": [1000.0, 500.0]
+        })
+        key = (analyzer.db_path, module.get_data_version(analyzer.db_path), "2030-01-01", "2030-01-31")
+        module._PRODUCT_AGGREGATE_CACHE[key] = product_data
+        try:
+            result = analyzer.analyze_drilldown("2030-01-01", "2030-01-31")
+        finally:
+            module._PRODUCT_AGGREGATE_CACHE.pop(key, None)
+        
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(set(result["results"]), set(ProductPerformanceAnalyzer.VALID_CATEGORY_LEVELS))
+        self.assertEqual(result["results"]["category"]["sales"]["total_sales"], 1500.0)
+        self.assertEqual(result["results"]["subcategory"]["units"]["total_units"], 15)
+        # The shared aggregate is never modified by the analyses
+        self.assertEqual(list(product_data.columns), ProductPerformanceAnalyzer.RESULT_COLUMNS)
+    
+    def test_build_page_query(self):
+        """Test that sorting, paging and totals are pushed into SQL."""
+        analyzer = ProductPerformanceAnalyzer(category_level="category")
+        query = analyzer._build_page_query("quantity", ascending=True)
+        self.assertIn("COUNT(*) OVER ()", query)
+        self.assertIn("ORDER BY g.quantity ASC", query)
+        self.assertIn("LIMIT ? OFFSET ?", query)
+        self.assertIn("GROUP BY i.\"Item Category Desc\"", query)
+        
+        with self.assertRaises(ValueError):
+            analyzer._build_page_query("product_id; DROP TABLE x", ascending=False)
+        
+        # Page requests do not need metrics
+        args = api_runner.parse_args(["--start_date", "2019-01-01", "--end_date", "2019-03-31", "--limit", "20"])
+        self.assertTrue(api_runner.is_page_request(args))
+    
+    def test_analyze_price_bands(self):
+        """Test vectorized price band bucketing with default and custom edges."""
+        data = pd.DataFrame({
+            "sales_amount": [5, 150, 30, 99, 0, 10],
+            "quantity": [1, 1, 1, 1, 0, 1]
+        })
+        
+        analyzer = ProductPerformanceAnalyzer(metrics=["price_bands"])
+        result = analyzer._analyze_price_bands(data)
+        self.assertEqual(result["price_bands"], ["$0-10", "$10-20", "$20-50", "$50-100", "$100-∞"])
+        self.assertEqual(result["distribution"]["$10-20"]["count"], 1)  # Lower edge is inclusive
+        self.assertEqual(result["distribution"]["$100-∞"]["total_sales"], 150)
+        
+        analyzer = ProductPerformanceAnalyzer(metrics=["price_bands"], price_band_edges=[0, 25.5])
+        result = analyzer._analyze_price_bands(data)
+        self.assertEqual(result["price_bands"], ["$0-25.5", "$25.5-∞"])
+        self.assertEqual(result["distribution"]["$0-25.5"]["count"], 2)
+        self.assertEqual(result["distribution"]["$25.5-∞"]["avg_price"], 93)
+        
+        with self.assertRaises(ValueError):
+            ProductPerformanceAnalyzer(price_band_edges=[10, 5])
+    
+    def test_dimension_attach(self):
+        """Test attaching item names to key-only aggregates after the scan."""
+        items = DimensionTable("item", pd.DataFrame({
+            "Item Key": [1, 2, 3],
+            "product_name": ["Product A", "Product B", "Product C"],
+            "category": ["Category 1", "Category 1", None]
+        }), "Item Key")
+        aggregate = pd.DataFrame({"product_id": [3, 9, 1], "sales_amount": [300.0, 20.0, 100.0]})
+        
+        result = items.attach(aggregate, "product_id")
+        self.assertEqual(list(result["product_name"].fillna("-")), ["Product C", "-", "Product A"])
+        # Unknown keys and NULL attributes behave like a LEFT JOIN
+        self.assertEqual(list(result["category"].isna()), [True, True, False])
+        self.assertEqual(list(result["sales_amount"]), [300.0, 20.0, 100.0])
+    
+    def test_dimension_cache_reads_its_database(self):
+        """Test that a cache built for a database path loads that database's dimensions."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = os.path.join(tmpdir, "items.db")
+            with sqlite3.connect(db_path) as conn:
+                pd.DataFrame({
+                    "Item Key": [7],
+                    "Item Desc": ["Local Product"],
+                    "Item Category Desc": ["Local Category"],
+                    "Item Subcategory Desc": ["Local Subcategory"]
+                }).to_sql("dbo_D_Item", conn, index=False)
+            conn.close()
+            
+            items = DimensionCache(db_path).get("item")
+            self.assertEqual(len(items), 1)
+            self.assertEqual(items.lookup([7])["product_name"][0], "Local Product")
 
 if __name__ == "__main__":
     unittest.main()
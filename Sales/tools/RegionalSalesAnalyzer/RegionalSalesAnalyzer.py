@@ -20,6 +20,8 @@ sys.path.insert(0, project_root)
 DB_PATH = os.path.abspath(os.path.join(project_root, 'Project', 'Sales', 'database', 'sales_agent.db'))
 VISUALIZATION_PATH = Path(__file__).parent.parent.parent.parent.joinpath('output', 'visualizations')
 
+from Sales.database.regional_aggregate import RegionalAggregate
+
 # Import utility functions
 from regional_data_utils import (
     prepare_regional_data, 
@@ -38,7 +40,9 @@ from regional_visualization_utils import (
     create_region_time_series_chart,
     create_region_comparison_chart,
     create_region_growth_chart,
-    create_region_treemap_visualization
+    create_region_treemap_visualization,
+    build_regional_chart_data,
+    render_regional_charts
 )
 
 logger = logging.getLogger(__name__)
@@ -127,12 +131,24 @@ def get_sales_data(time_period: str = None,
                   sub_region_codes: List[str] = None,
                   include_sub_regions: bool = False,
                   start_date: str = None,
-                  end_date: str = None) -> pd.DataFrame:
-    """Get sales data for the specified time period and filters."""
+                  end_date: str = None,
+                  use_aggregate: bool = True) -> pd.DataFrame:
+    """Get sales data for the specified time period and filters.
+    
+    With use_aggregate, rows come from the regional aggregate (one row per day,
+    region and sub-region, refreshed incrementally from the sales database) instead
+    of joining every transaction line to the geography hierarchy.
+    """
     try:
         logger.info("Starting get_sales_data function")
         logger.info(f"Initial Parameters: time_period={time_period}, country_codes={country_codes}")
         
+        if use_aggregate:
+            df = get_aggregated_sales_data(time_period, region_codes, country_codes, sub_region_codes,
+                                           start_date, end_date)
+            if df is not None:
+                return df if not df.empty else None
+        
         # Map country codes to their standardized names
         if country_codes:
             logger.info(f"Processing country codes: {country_codes}")
@@ -252,6 +268,32 @@ def get_sales_data(time_period: str = None,
             conn.close()
             logger.info("Database connection closed")
 
+def get_aggregated_sales_data(time_period: str = None,
+                              region_codes: List[str] = None,
+                              country_codes: List[str] = None,
+                              sub_region_codes: List[str] = None,
+                              start_date: str = None,
+                              end_date: str = None) -> Optional[pd.DataFrame]:
+    """Get daily regional sales from the regional aggregate.
+    
+    Returns None if the aggregate cannot be used (the caller then queries the
+    transactions directly).
+    """
+    try:
+        query_start_date, query_end_date = parse_date_range(time_period, start_date, end_date)
+        if not query_start_date or not query_end_date:
+            logger.error("Invalid date range")
+            return None
+        
+        aggregate = RegionalAggregate(source_path=DB_PATH, country_name_mapping=COUNTRY_NAME_MAPPING)
+        df = aggregate.query(query_start_date, query_end_date, region_codes=region_codes,
+                             country_codes=country_codes, sub_region_codes=sub_region_codes)
+        logger.info(f"Retrieved {len(df)} aggregated rows from the regional aggregate")
+        return df
+    except Exception as e:
+        logger.warning(f"Regional aggregate unavailable, querying transactions: {str(e)}")
+        return None
+
 def save_visualization(fig: plt.Figure, filename: str) -> str:
     """Save visualization to the specified path and return the file path."""
     try:
@@ -309,32 +351,13 @@ def analyze_regional_sales(time_period: str = "annual",
             if "error" in result:
                 return result
                 
-            # Create visualizations
+            # Create visualizations (rendered concurrently, cached by input data)
             try:
-                # Create regional map visualization
-                map_viz = create_regional_map_visualization(prepared_data, metric)
-                if map_viz:
-                    result["map_visualization"] = map_viz
-                    
-                # Create time series chart
-                time_series_viz = create_region_time_series_chart(prepared_data, metric)
-                if time_series_viz:
-                    result["time_series_visualization"] = time_series_viz
-                    
-                # Create comparison chart
-                comparison_viz = create_region_comparison_chart(prepared_data, metric)
-                if comparison_viz:
-                    result["comparison_visualization"] = comparison_viz
-                    
-                # Create growth chart
-                growth_viz = create_region_growth_chart(prepared_data, metric)
-                if growth_viz:
-                    result["growth_visualization"] = growth_viz
-                    
-                # Create treemap visualization
-                treemap_viz = create_region_treemap_visualization(prepared_data, metric)
-                if treemap_viz:
-                    result["treemap_visualization"] = treemap_viz
+                chart_data = build_regional_chart_data(df, result, prepared_data, metric, include_sub_regions)
+                charts = render_regional_charts(chart_data, include_sub_regions)
+                for name, viz in charts.items():
+                    if viz:
+                        result[name] = viz
                     
             except Exception as e:
                 logger.error(f"Error creating visualizations: {str(e)}")
@@ -62,14 +62,16 @@ def prepare_regional_data(data: pd.DataFrame, include_sub_regions: bool = False)
         if include_sub_regions and 'sub_region_name' in data.columns:
             group_cols.append('sub_region_name')
         
-        # Calculate aggregated metrics
+        # Calculate aggregated metrics; ratios come from the totals, since rows may
+        # be pre-aggregated (one per day and region) and a mean of their ratios
+        # would weight a quiet day like a busy one
         agg_data = data.groupby(group_cols, as_index=False).agg({
             'revenue': 'sum',
             'units': 'sum',
-            'margin': 'sum',
-            'margin_pct': 'mean',
-            'revenue_per_unit': 'mean'
+            'margin': 'sum'
         })
+        agg_data['margin_pct'] = (agg_data['margin'] / agg_data['revenue'].replace(0, np.nan)) * 100
+        agg_data['revenue_per_unit'] = agg_data['revenue'] / agg_data['units'].replace(0, np.nan)
         
         # Ensure numeric columns are float type
         numeric_cols = ['revenue', 'units', 'margin', 'margin_pct', 'revenue_per_unit']
@@ -418,15 +420,9 @@ def generate_sample_region_data() -> pd.DataFrame:
         {'region_code': 'MEA', 'region_name': 'Middle East & Africa', 'country_code': 'ZA', 'country_name': 'South Africa'},
     ]
     
-    # Create base sales dataset
-    sample_data = pd.DataFrame(columns=[
-        'date', 'region_code', 'region_name', 'country_code', 'country_name',
-        'product_id', 'product_name', 'category', 'quantity', 'unit_price',
-        'revenue', 'cost', 'margin'
-    ])
-    
     # Generate random sales data for each region
-    np.random.seed(42)  # For reproducibility
+    rng = np.random.default_rng(42)  # For reproducibility
+    n_transactions = 5000
     
     # Generate data for the last 12 months
     end_date = datetime.now()
@@ -442,47 +438,39 @@ def generate_sample_region_data() -> pd.DataFrame:
         'Food & Beverage': ['Snacks', 'Beverages', 'Prepared Meals', 'Ingredients']
     }
     
-    # Generate transactions
-    transactions = []
-    for _ in range(5000):  # Generate 5000 transactions
-        # Pick a random date
-        date = np.random.choice(dates)
-        
-        # Pick a random region
-        region = np.random.choice(regions)
-        
-        # Pick a random category and product
-        category = np.random.choice(categories)
-        product_name = np.random.choice(products[category])
-        product_id = f"{category[:3]}-{product_name[:3]}-{np.random.randint(100, 999)}"
-        
-        # Generate sales data
-        quantity = np.random.randint(1, 20)
-        unit_price = np.random.uniform(10, 1000) if category == 'Electronics' else np.random.uniform(5, 200)
-        revenue = quantity * unit_price
-        cost = revenue * np.random.uniform(0.4, 0.7)  # 40-70% cost
-        margin = revenue - cost
-        
-        # Create transaction record
-        transaction = {
-            'date': date,
-            'region_code': region['region_code'],
-            'region_name': region['region_name'],
-            'country_code': region['country_code'],
-            'country_name': region['country_name'],
-            'product_id': product_id,
-            'product_name': product_name,
-            'category': category,
-            'quantity': quantity,
-            'unit_price': unit_price,
-            'revenue': revenue,
-            'cost': cost,
-            'margin': margin
-        }
-        transactions.append(transaction)
-    
-    # Create DataFrame from transactions
-    sample_data = pd.DataFrame(transactions)
+    # Draw every transaction attribute as one array
+    region_table = pd.DataFrame(regions)
+    region_idx = rng.integers(0, len(regions), n_transactions)
+    category_idx = rng.integers(0, len(categories), n_transactions)
+    product_idx = rng.integers(0, 4, n_transactions)
+    category = np.asarray(categories, dtype=object)[category_idx]
+    product_name = np.asarray([products[c] for c in categories], dtype=object)[category_idx, product_idx]
+    product_id = (pd.Series(category).str[:3] + '-' + pd.Series(product_name).str[:3] + '-'
+                  + pd.Series(rng.integers(100, 999, n_transactions)).astype(str))
+    
+    # Generate sales data
+    quantity = rng.integers(1, 20, n_transactions)
+    unit_price = np.where(category == 'Electronics',
+                          rng.uniform(10, 1000, n_transactions),
+                          rng.uniform(5, 200, n_transactions))
+    revenue = quantity * unit_price
+    cost = revenue * rng.uniform(0.4, 0.7, n_transactions)  # 40-70% cost
+    
+    sample_data = pd.DataFrame({
+        'date': dates.values[rng.integers(0, len(dates), n_transactions)],
+        'region_code': region_table['region_code'].values[region_idx],
+        'region_name': region_table['region_name'].values[region_idx],
+        'country_code': region_table['country_code'].values[region_idx],
+        'country_name': region_table['country_name'].values[region_idx],
+        'product_id': product_id.values,
+        'product_name': product_name,
+        'category': category,
+        'quantity': quantity,
+        'unit_price': unit_price,
+        'revenue': revenue,
+        'cost': cost,
+        'margin': revenue - cost
+    })
     
     # Add region population (for per-capita analysis)
     region_populations = {
@@ -120,7 +120,7 @@ def analyze_regional_performance(
             if growth is not None and not growth.empty:
                 # Merge growth rates with performance data
                 top_performers = top_performers.merge(
-                    growth[group_cols + ['growth_rate']], 
+                    growth, 
                     on=group_cols, 
                     how='left'
                 )
@@ -148,9 +148,14 @@ def analyze_regional_performance(
 
 def calculate_growth_rates(
     data: pd.DataFrame,
-    group_cols: List[str]
+    group_cols: List[str],
+    rolling_window: int = 3
 ) -> Optional[pd.DataFrame]:
-    """Calculate growth rates for regions."""
+    """Calculate growth rates for regions.
+    
+    growth_rate compares the last two months with sales in the year up to the latest
+    date. The other growth measures come from calculate_growth_metrics.
+    """
     try:
         if data is None or data.empty:
             logger.warning("No data provided for growth rate calculation")
@@ -163,57 +168,133 @@ def calculate_growth_rates(
             logger.error(f"Missing required columns: {missing_columns}")
             return None
 
-        # Convert date column to datetime if needed
-        if not pd.api.types.is_datetime64_any_dtype(data['Txn Date']):
-            data['Txn Date'] = pd.to_datetime(data['Txn Date'])
-
-        # Get the latest date in the data
-        latest_date = data['Txn Date'].max()
+        dates = pd.to_datetime(data['Txn Date'])
+        latest_date = dates.max()
         one_year_ago = latest_date - pd.DateOffset(years=1)
-
-        # Filter data for the last two years
-        mask = (data['Txn Date'] >= one_year_ago) & (data['Txn Date'] <= latest_date)
-        recent_data = data.loc[mask].copy()
-
-        if recent_data.empty:
+        recent = (dates >= one_year_ago).to_numpy()
+        
+        if not recent.any():
             logger.warning("No data available for the specified time period")
             return None
 
-        # Group by date and region to get monthly revenue
-        monthly_data = recent_data.groupby(
-            group_cols + [pd.Grouper(key='Txn Date', freq='M')],
-            as_index=False
-        )['revenue'].sum()
-
-        # Calculate growth rates
-        growth_rates = []
-        for region in monthly_data[group_cols].drop_duplicates().itertuples(index=False):
-            region_mask = True
-            for i, col in enumerate(group_cols):
-                region_mask &= (monthly_data[col] == region[i])
-            
-            region_data = monthly_data.loc[region_mask].sort_values('Txn Date')
-            
-            if len(region_data) >= 2:
-                current_revenue = region_data['revenue'].iloc[-1]
-                previous_revenue = region_data['revenue'].iloc[-2]
-                growth_rate = ((current_revenue - previous_revenue) / previous_revenue) * 100
-                
-                growth_rates.append({
-                    **{col: region[i] for i, col in enumerate(group_cols)},
-                    'growth_rate': float(growth_rate)
-                })
-
-        if not growth_rates:
+        # Monthly revenue per region over the last year, sorted so shift() gives the previous month with sales
+        monthly_data = (
+            data.loc[recent, group_cols + ['revenue']]
+            .assign(period=_month_index(dates[recent]))
+            .groupby(group_cols + ['period'], sort=True)['revenue'].sum()
+            .reset_index()
+        )
+        previous_revenue = monthly_data.groupby(group_cols, sort=False)['revenue'].shift(1)
+        monthly_data['growth_rate'] = (monthly_data['revenue'] - previous_revenue) / previous_revenue * 100
+        growth_rates = monthly_data.groupby(group_cols, sort=False).tail(1)
+        growth_rates = growth_rates.loc[growth_rates['growth_rate'].notna(), group_cols + ['growth_rate']]
+        
+        if growth_rates.empty:
             logger.warning("No growth rates could be calculated")
             return None
 
-        return pd.DataFrame(growth_rates)
-
+        metrics = calculate_growth_metrics(data, group_cols, rolling_window=rolling_window)
+        growth_rates = growth_rates.merge(metrics, on=group_cols, how='left')
+        growth_rates['growth_rate'] = growth_rates['growth_rate'].astype(float)
+        return growth_rates.reset_index(drop=True)
+        
     except Exception as e:
         logger.error(f"Error calculating growth rates: {str(e)}")
         return None
 
+def _month_index(dates: pd.Series) -> np.ndarray:
+    """Months since year 0 (consecutive calendar months differ by one; quarters start at multiples of 3)."""
+    return (dates.dt.year * 12 + dates.dt.month - 1).to_numpy()
+
+def _pct_change(current: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    """Percent change; NaN where there is no positive base to compare against."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(previous > 0, (current - previous) / previous * 100, np.nan)
+
+def calculate_growth_metrics(
+    data: pd.DataFrame,
+    group_cols: List[str],
+    value_col: str = 'revenue',
+    date_col: str = 'Txn Date',
+    rolling_window: int = 3
+) -> pd.DataFrame:
+    """Calculate growth measures for every region (or region/sub-region) in one pass.
+    
+    Monthly totals are laid out as a groups x calendar months matrix (months without
+    sales count as zero), and every measure is read off that matrix relative to each
+    group's latest month with sales:
+    
+    - mom_growth: latest month vs the month before
+    - qoq_growth: quarter to date vs the same months of the previous quarter
+    - yoy_growth: latest month vs the same month a year earlier
+    - rolling_growth: last rolling_window months vs the rolling_window months before
+    - cagr: compound annual growth from the first to the latest month with sales
+    
+    Args:
+        data: Transaction-level (or daily) data with the group, date and value columns
+        group_cols: Columns identifying a region
+        value_col: Column to measure growth of
+        date_col: Date column
+        rolling_window: Number of months in the rolling comparison
+    
+    Returns:
+        DataFrame with one row per group: group_cols, latest_month (YYYY-MM) and the growth columns (percent)
+    """
+    dates = pd.to_datetime(data[date_col])
+    monthly = (
+        data[group_cols + [value_col]]
+        .assign(period=_month_index(dates))
+        .groupby(group_cols + ['period'], sort=True)[value_col].sum()
+    )
+    panel = monthly.unstack('period')
+    first_period = int(panel.columns.min())
+    panel = panel.reindex(columns=range(first_period, int(panel.columns.max()) + 1))
+    
+    values = panel.to_numpy(dtype=float)
+    has_sales = ~np.isnan(values)
+    values = np.nan_to_num(values)
+    n_groups, n_months = values.shape
+    rows = np.arange(n_groups)
+    first = np.argmax(has_sales, axis=1)
+    last = n_months - 1 - np.argmax(has_sales[:, ::-1], axis=1)
+    
+    # Prefix sums give any window total in O(1): total(a..b) = cumulative[b + 1] - cumulative[a]
+    cumulative = np.concatenate([np.zeros((n_groups, 1)), np.cumsum(values, axis=1)], axis=1)
+    
+    def month_value(offset):
+        index = last - offset
+        return np.where(index >= 0, values[rows, np.clip(index, 0, None)], np.nan)
+    
+    def window_total(end_offset, length):
+        end = last - end_offset
+        start = end - length + 1
+        total = cumulative[rows, np.clip(end + 1, 0, None)] - cumulative[rows, np.clip(start, 0, None)]
+        return np.where(start >= 0, total, np.nan)
+    
+    current = values[rows, last]
+    quarter_months = (first_period + last) % 3 + 1
+    years = (last - first) / 12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cagr = np.where((years > 0) & (values[rows, first] > 0) & (current > 0),
+                        (np.power(current / values[rows, first], 1 / np.where(years > 0, years, 1)) - 1) * 100,
+                        np.nan)
+    
+    latest = first_period + last
+    result = panel.index.to_frame(index=False)
+    result['latest_month'] = [f"{year:04d}-{month:02d}" for year, month in zip(latest // 12, latest % 12 + 1)]
+    result['mom_growth'] = _pct_change(current, month_value(1))
+    result['qoq_growth'] = _pct_change(window_total(0, quarter_months), window_total(3, quarter_months))
+    result['yoy_growth'] = _pct_change(current, month_value(12))
+    result['rolling_growth'] = _pct_change(window_total(0, rolling_window), window_total(rolling_window, rolling_window))
+    result['cagr'] = cagr
+    return result
+
+def _add_ratio_metrics(frame: pd.DataFrame, margin, revenue, units,
+                       margin_pct='margin_pct', revenue_per_unit='revenue_per_unit') -> None:
+    """Set the margin percentage and revenue per unit columns from summed amounts."""
+    frame[margin_pct] = (frame[margin] / frame[revenue].replace(0, np.nan)) * 100
+    frame[revenue_per_unit] = frame[revenue] / frame[units].replace(0, np.nan)
+
 def analyze_region_time_series(
     data: pd.DataFrame,
     region_code: str,
@@ -230,23 +311,23 @@ def analyze_region_time_series(
         if include_sub_regions and 'sub_region_name' in data.columns:
             group_cols.append('sub_region_name')
             
-        # Calculate time series metrics
+        # Calculate time series metrics; ratios come from the totals of each period
         time_series = region_data.groupby(group_cols).agg({
             'revenue': 'sum',
             'units': 'sum',
-            'margin': 'sum',
-            'margin_pct': 'mean',
-            'revenue_per_unit': 'mean'
+            'margin': 'sum'
         }).reset_index()
+        _add_ratio_metrics(time_series, 'margin', 'revenue', 'units')
         
+        totals = time_series[['revenue', 'units', 'margin']].sum()
         return {
             "time_series": time_series.to_dict('records'),
             "summary": {
-                "total_revenue": time_series['revenue'].sum(),
-                "total_units": time_series['units'].sum(),
-                "total_margin": time_series['margin'].sum(),
-                "avg_margin_pct": time_series['margin_pct'].mean(),
-                "avg_revenue_per_unit": time_series['revenue_per_unit'].mean()
+                "total_revenue": totals['revenue'],
+                "total_units": totals['units'],
+                "total_margin": totals['margin'],
+                "avg_margin_pct": totals['margin'] / totals['revenue'] * 100 if totals['revenue'] else np.nan,
+                "avg_revenue_per_unit": totals['revenue'] / totals['units'] if totals['units'] else np.nan
             }
         }
         
@@ -260,7 +341,13 @@ def compare_regions(
     metric: str = 'revenue',
     include_sub_regions: bool = False
 ) -> Dict[str, Any]:
-    """Compare performance between regions."""
+    """Compare performance between regions.
+    
+    The margin_pct and revenue_per_unit means are ratios of the summed amounts.
+    Standard deviations and the revenue, units and margin means are taken over
+    the input rows, which are days per region (and sub-region) when the data
+    comes from the regional aggregate rather than individual transactions.
+    """
     try:
         # Filter for specific regions
         comparison_data = data[data['region_code'].isin(region_codes)]
@@ -278,6 +365,8 @@ def compare_regions(
             'margin_pct': ['mean', 'std'],
             'revenue_per_unit': ['mean', 'std']
         }).reset_index()
+        _add_ratio_metrics(comparison, ('margin', 'sum'), ('revenue', 'sum'), ('units', 'sum'),
+                           margin_pct=('margin_pct', 'mean'), revenue_per_unit=('revenue_per_unit', 'mean'))
         
         return {
             "comparison": comparison.to_dict('records'),
@@ -4,15 +4,34 @@ Utilities for creating visualizations of regional sales data.
 
 import pandas as pd
 import numpy as np
+import matplotlib
 import matplotlib.pyplot as plt
 import seaborn as sns
 import io
+import os
+import sys
+import json
+import time
 import base64
-from typing import Dict, Any, Optional
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stdout
+from typing import Dict, Any, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Seconds to wait for each chart of a regional report
+CHART_TIMEOUT = float(os.environ.get('REGIONAL_CHART_TIMEOUT', '30'))
+# Number of rendered charts kept in memory
+_CHART_CACHE_SIZE = 64
+_CHART_CACHE: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+_chart_lock = threading.Lock()
+_chart_executor: Optional[ProcessPoolExecutor] = None
+
 def create_regional_map_visualization(data: Dict[str, Any], include_sub_regions: bool = False) -> str:
     """
     Create a map visualization of regional performance.
@@ -275,4 +294,174 @@ def create_region_treemap_visualization(data: Dict[str, Any], include_sub_region
         return ""
     except Exception as e:
         logger.error(f"Error creating treemap visualization: {str(e)}")
-        return "" 
\ No newline at end of file
+        return "" 
+
+# Result key -> chart function, in report order
+REGIONAL_CHARTS = OrderedDict([
+    ('map_visualization', create_regional_map_visualization),
+    ('time_series_visualization', create_region_time_series_chart),
+    ('comparison_visualization', create_region_comparison_chart),
+    ('growth_visualization', create_region_growth_chart),
+    ('treemap_visualization', create_region_treemap_visualization)
+])
+
+# Result key -> key of the chart's input in the chart data
+REGIONAL_CHART_INPUTS = {
+    'map_visualization': 'top_regions',
+    'time_series_visualization': 'time_series_data',
+    'comparison_visualization': 'comparison_data',
+    'growth_visualization': 'growth_data',
+    'treemap_visualization': 'treemap_data'
+}
+
+def build_regional_chart_data(data: pd.DataFrame, performance: Dict[str, Any], prepared_data: pd.DataFrame,
+                              metric: str = 'revenue', include_sub_regions: bool = False) -> Dict[str, Any]:
+    """
+    Build the inputs of the regional report charts.
+    
+    Args:
+        data: Sales rows with 'Txn Date', revenue and region columns
+        performance: Result of analyze_regional_performance
+        prepared_data: Result of prepare_regional_data (one row per region)
+        metric: Metric compared across regions
+        include_sub_regions: Whether the charts break regions down by sub-region
+    
+    Returns:
+        Dictionary of chart input key -> list of records
+    """
+    group_cols = ['region_name']
+    if include_sub_regions and 'sub_region_name' in data.columns:
+        group_cols.append('sub_region_name')
+    dates = pd.to_datetime(data['Txn Date'])
+    
+    time_series = (data.assign(date=dates.dt.normalize())
+                   .groupby(group_cols + ['date'], as_index=False)['revenue'].sum())
+    
+    # Month-over-month revenue growth
+    growth = (data.assign(period=dates.dt.to_period('M').astype(str))
+              .groupby(group_cols + ['period'], as_index=False)['revenue'].sum())
+    growth['growth_rate'] = growth.groupby(group_cols)['revenue'].pct_change() * 100
+    growth = growth.replace([np.inf, -np.inf], np.nan).dropna(subset=['growth_rate'])
+    
+    values = prepared_data[group_cols + [metric]].rename(columns={metric: 'metric_value'})
+    # Shares of a pie chart cannot be negative
+    shares = values[values['metric_value'] > 0].rename(columns={'metric_value': 'value'})
+    
+    return {
+        'top_regions': performance.get('top_regions', []),
+        'time_series_data': time_series.to_dict('records'),
+        'comparison_data': values.to_dict('records'),
+        'growth_data': growth.to_dict('records'),
+        'treemap_data': shares.to_dict('records')
+    }
+
+def _chart_data_hash(name: str, data: Any, include_sub_regions: bool) -> str:
+    """Hash a chart's name, input data and options."""
+    digest = hashlib.sha256(f"{name}|{include_sub_regions}".encode())
+    if isinstance(data, pd.DataFrame):
+        digest.update(json.dumps([str(column) for column in data.columns]).encode())
+        digest.update(pd.util.hash_pandas_object(data, index=False).values.tobytes())
+    else:
+        digest.update(json.dumps(data, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+def _render_chart(name: str, data: Any, include_sub_regions: bool) -> Tuple[str, Any]:
+    """
+    Render one chart. Runs in a chart worker.
+    
+    Returns:
+        Tuple of (text the chart function printed, its return value); both are
+        empty if the chart failed
+    """
+    output = io.StringIO()
+    with redirect_stdout(output):
+        value = REGIONAL_CHARTS[name](data, include_sub_regions)
+    return output.getvalue(), value
+
+def _init_chart_worker():
+    """Chart worker initializer: use the non-interactive backend."""
+    matplotlib.use('Agg')
+
+def _submit_chart(name: str, data: Any, include_sub_regions: bool) -> Future:
+    """Submit a chart to the worker pool, rendering inline if processes are unavailable."""
+    global _chart_executor
+    for attempt in range(2):
+        try:
+            with _chart_lock:
+                if _chart_executor is None:
+                    _chart_executor = ProcessPoolExecutor(max_workers=len(REGIONAL_CHARTS),
+                                                          initializer=_init_chart_worker)
+                return _chart_executor.submit(_render_chart, name, data, include_sub_regions)
+        except BrokenProcessPool:
+            logger.warning("Regional chart pool broken, restarting")
+            with _chart_lock:
+                _chart_executor = None
+        except (OSError, NotImplementedError) as e:
+            logger.warning(f"Rendering {name} inline: {str(e)}")
+            break
+    
+    future = Future()
+    future.set_result(_render_chart(name, data, include_sub_regions))
+    return future
+
+def render_regional_charts(data: Any, include_sub_regions: bool = False,
+                           timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Render all regional report charts concurrently.
+    
+    Each chart is passed only its own input (see REGIONAL_CHART_INPUTS) and is
+    cached by a hash of that input; failed charts are not cached. Each chart gets
+    the same timeout, counted from when all charts were dispatched; a chart that
+    does not finish in time is left out. What the chart functions print (their base64 image
+    URLs) is written to stdout in report order.
+    
+    Args:
+        data: Chart inputs, as built by build_regional_chart_data
+        include_sub_regions: Whether to include sub-regions in the visualizations
+        timeout: Seconds to wait for each chart (defaults to CHART_TIMEOUT)
+    
+    Returns:
+        Dictionary of result key -> chart function return value, for charts that finished
+    """
+    timeout = CHART_TIMEOUT if timeout is None else timeout
+    pending = {}
+    rendered = {}
+    for name in REGIONAL_CHARTS:
+        input_key = REGIONAL_CHART_INPUTS[name]
+        chart_data = {input_key: data[input_key]} if input_key in data else {}
+        key = _chart_data_hash(name, chart_data, include_sub_regions)
+        with _chart_lock:
+            cached = _CHART_CACHE.get(key)
+            if cached is not None:
+                _CHART_CACHE.move_to_end(key)
+        if cached is not None:
+            rendered[name] = cached
+        else:
+            pending[name] = (key, _submit_chart(name, chart_data, include_sub_regions))
+    
+    deadline = time.monotonic() + timeout
+    for name, (key, future) in pending.items():
+        try:
+            rendered[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            logger.error(f"Chart {name} did not finish within {timeout}s")
+            continue
+        except Exception as e:
+            logger.error(f"Error rendering chart {name}: {str(e)}")
+            continue
+        if not any(rendered[name]):
+            # The chart function logged its error and produced nothing
+            continue
+        with _chart_lock:
+            _CHART_CACHE[key] = rendered[name]
+            while len(_CHART_CACHE) > _CHART_CACHE_SIZE:
+                _CHART_CACHE.popitem(last=False)
+    
+    results = {}
+    for name in REGIONAL_CHARTS:
+        if name in rendered:
+            output, value = rendered[name]
+            sys.stdout.write(output)
+            results[name] = value
+    sys.stdout.flush()
+    return results
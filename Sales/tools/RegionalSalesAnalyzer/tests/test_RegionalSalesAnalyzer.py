@@ -129,5 +129,151 @@ class TestRegionalSalesAnalyzer(unittest.TestCase):
         
         self.assertIsInstance(result, dict, "analyze_regional_sales should return a dictionary")
 
+class TestRegionalSalesAnalyzerLogic(unittest.TestCase):
+    """Tests that need no database."""
+    
+    def test_calculate_growth_rates(self):
+        """Test the vectorized growth measures for every region at once."""
+        from regional_performance_utils import calculate_growth_rates
+        months = pd.date_range("2020-01-01", "2021-06-01", freq="MS") + pd.Timedelta(days=14)
+        data = pd.DataFrame({
+            "region_name": ["North"] * len(months) + ["South"] * 2,
+            "Txn Date": list(months) + [pd.Timestamp("2021-05-10"), pd.Timestamp("2021-06-10")],
+            "revenue": [100.0 + 10 * i for i in range(len(months))] + [50.0, 75.0]
+        })
+        growth = calculate_growth_rates(data, ["region_name"]).set_index("region_name")
+        
+        north = growth.loc["North"]
+        self.assertEqual(north["latest_month"], "2021-06")
+        self.assertAlmostEqual(north["growth_rate"], (270 - 260) / 260 * 100)
+        self.assertAlmostEqual(north["mom_growth"], north["growth_rate"])
+        self.assertAlmostEqual(north["yoy_growth"], (270 - 150) / 150 * 100)
+        # Q2 2021 (Apr-Jun) vs Q1 2021 (Jan-Mar)
+        self.assertAlmostEqual(north["qoq_growth"], (250 + 260 + 270 - 220 - 230 - 240) / (220 + 230 + 240) * 100)
+        self.assertAlmostEqual(north["cagr"], ((270 / 100) ** (12 / 17) - 1) * 100)
+        
+        south = growth.loc["South"]
+        self.assertAlmostEqual(south["growth_rate"], 50.0)
+        self.assertTrue(np.isnan(south["yoy_growth"]))
+    
+    def test_ratios_from_summed_amounts(self):
+        """Test that pre-aggregated rows give the same ratios as the transactions they sum."""
+        from regional_data_utils import prepare_regional_data
+        from regional_performance_utils import analyze_region_time_series, compare_regions
+        # A quiet day with a high margin and a busy day with a low one
+        data = pd.DataFrame({
+            "region_code": ["N", "N"],
+            "region_name": ["North", "North"],
+            "date": ["2021-01-01", "2021-01-01"],
+            "revenue": [10.0, 990.0],
+            "units": [1.0, 99.0],
+            "margin": [5.0, 99.0]
+        })
+        expected_margin_pct = (5.0 + 99.0) / 1000.0 * 100
+        
+        prepared = prepare_regional_data(data.copy())
+        self.assertAlmostEqual(prepared.loc[0, "margin_pct"], expected_margin_pct)
+        self.assertAlmostEqual(prepared.loc[0, "revenue_per_unit"], 10.0)
+        
+        comparison = compare_regions(data.assign(margin_pct=np.nan, revenue_per_unit=np.nan), ["N"])
+        self.assertAlmostEqual(comparison["summary"]["avg_margin_pct"], expected_margin_pct)
+        self.assertAlmostEqual(comparison["summary"]["avg_revenue_per_unit"], 10.0)
+        
+        series = analyze_region_time_series(data, "N")
+        self.assertAlmostEqual(series["time_series"][0]["margin_pct"], expected_margin_pct)
+        self.assertAlmostEqual(series["summary"]["avg_margin_pct"], expected_margin_pct)
+    
+    def test_region_aliases(self):
+        """Test that country codes, aliases and names resolve to hierarchy region names."""
+        from RegionalSalesAnalyzer import COUNTRY_NAME_MAPPING
+        from Sales.database.regional_aggregate import build_region_aliases
+        hierarchy = pd.DataFrame({
+            "region_code": ["US", "US", "CA"],
+            "region_name": ["United States", "United States", "Canada"]
+        })
+        aliases = build_region_aliases(hierarchy, COUNTRY_NAME_MAPPING)
+        
+        self.assertEqual(aliases["USA"], "United States")
+        self.assertEqual(aliases["AMERICA"], "United States")
+        self.assertEqual(aliases["CANADA"], "Canada")
+        self.assertEqual(aliases["CA"], "Canada")
+    
+    def test_render_regional_charts(self):
+        """Test that the regional report charts render from the analysis results and are cached."""
+        import io
+        from contextlib import redirect_stdout
+        import regional_visualization_utils as viz
+        from regional_data_utils import prepare_regional_data
+        from regional_performance_utils import analyze_regional_performance
+        days = pd.date_range("2021-01-01", "2021-03-31", freq="D")
+        data = pd.DataFrame({
+            "Txn Date": list(days) * 2,
+            "region_name": ["North"] * len(days) + ["South"] * len(days),
+            "revenue": np.arange(2 * len(days), dtype=float) + 100.0,
+            "units": 10.0,
+            "margin": 20.0
+        })
+        prepared = prepare_regional_data(data.copy())
+        performance = analyze_regional_performance(prepared, metric="revenue")
+        chart_data = viz.build_regional_chart_data(data, performance, prepared, "revenue")
+        
+        self.assertEqual(set(chart_data), set(viz.REGIONAL_CHART_INPUTS.values()))
+        self.assertEqual(len(chart_data["growth_data"]), 2 * 2)
+        
+        # The chart functions print their image URL
+        output, _ = viz._render_chart("map_visualization", chart_data, False)
+        self.assertIn("data:image/png;base64,", output)
+        
+        key = viz._chart_data_hash("map_visualization", {"top_regions": chart_data["top_regions"]}, False)
+        viz._CHART_CACHE.pop(key, None)
+        try:
+            with redirect_stdout(io.StringIO()):
+                charts = viz.render_regional_charts(chart_data, False, timeout=60)
+            self.assertEqual(list(charts), list(viz.REGIONAL_CHARTS))
+            self.assertIn("data:image/png;base64,", viz._CHART_CACHE[key][0])
+            
+            # A chart whose input is missing fails and is not cached
+            missing = viz._chart_data_hash("treemap_visualization", {}, False)
+            with redirect_stdout(io.StringIO()):
+                viz.render_regional_charts({"top_regions": chart_data["top_regions"]}, False, timeout=60)
+            self.assertNotIn(missing, viz._CHART_CACHE)
+        finally:
+            viz._CHART_CACHE.clear()
+    
+    def test_synthetic_sales_database(self):
+        """Test that a synthetic sales star schema loads and aggregates like the real tables."""
+        import tempfile
+        from Sales.database.regional_aggregate import RegionalAggregate
+        from Sales.database.synthetic_data import build_sales_database
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sales.db")
+            written = build_sales_database(path, n_transactions=5000, n_items=50, n_customers=200,
+                                           days=90, chunk_size=1000)
+            self.assertEqual(written["dbo_F_Sales_Transaction"], 5000)
+            
+            conn = sqlite3.connect(path)
+            try:
+                # Rowids follow the transaction date, as in the append-only fact table
+                dates = [row[0] for row in conn.execute(
+                    'SELECT "Txn Date" FROM dbo_F_Sales_Transaction ORDER BY rowid')]
+                expected = conn.execute("""
+                    SELECT SUM(s.[gpb Net Sales Amount])
+                    FROM dbo_F_Sales_Transaction s
+                    JOIN dbo_D_Customer_Geography_Hierarchy g
+                        ON s.[Customer Geography Hrchy Key] = g.[Customer Geography Hrchy Key]
+                    WHERE s.[Deleted Flag] = 0
+                """).fetchone()[0]
+            finally:
+                conn.close()
+            self.assertEqual(dates, sorted(dates))
+            # Dates are written like the real tables, without a time part
+            datetime.strptime(dates[0], "%Y-%m-%d")
+            
+            aggregate = RegionalAggregate(path, os.path.join(tmp, "aggregate.db"))
+            data = aggregate.query("2022-01-01", "2022-03-31", country_codes=["us"])
+            self.assertEqual(set(data["region_name"]), {"United States"})
+            total = aggregate.query("2022-01-01", "2022-03-31", refresh=False)["revenue"].sum()
+            self.assertAlmostEqual(total, expected, places=2)
+
 if __name__ == "__main__":
     unittest.main() 
\ No newline at end of file
@@ -6,7 +6,7 @@ import pandas as pd
 import numpy as np
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List, Union, Literal
+from typing import Dict, Any, Optional, List, Tuple, Union, Literal
 from pydantic import Field
 import os 
 import sys
@@ -21,12 +21,7 @@ sys.path.insert(0, project_root)
 
 from Sales.database.connection import get_connection
 from Sales.database.query_templates import get_date_range, get_latest_date
-from visualization_utils import (
-    save_matplotlib_plot,
-    save_plotly_plot,
-    create_performance_plot,
-    generate_filename
-)
+from visualization_utils import get_render_queue
 from Sales.database import config
 
 logger = logging.getLogger(__name__)
@@ -40,12 +35,49 @@ class SalesPerformanceAnalyzer:
     VALID_DIMENSIONS = ['product', 'category', 'channel', 'region', 'customer', 'time']
     VALID_METRICS = ['revenue', 'units', 'aov', 'growth', 'margin']
     VALID_TIME_PERIODS = ['last_7_days', 'last_30_days', 'last_90_days', 'last_year', 'custom']
+    VALID_COMPARISON_MODES = ['period_over_period', 'year_over_year', 'month_over_month', 'custom']
+    
+    # Dimension -> (SQL group key, dimension tables it needs). Other dimensions group by date.
+    DIMENSION_EXPRESSIONS = {
+        'product': ('i."Item Desc"', ['i']),
+        'category': ('i."Item Category Desc"', ['i']),
+        'region': ('r."Sales Org Hrchy L1 Name"', ['r']),
+        'customer': ('c."Customer Name"', ['c']),
+        'time': ('t."Txn Date"', [])
+    }
+    
+    DIMENSION_JOINS = {
+        'c': 'LEFT JOIN "dbo_D_Customer" c ON t."Customer Key" = c."Customer Key"',
+        'i': 'LEFT JOIN "dbo_D_Item" i ON t."Item Key" = i."Item Key"',
+        'r': 'LEFT JOIN "dbo_D_Sales_Organization" r ON t."Sales Organization Key" = r."Sales Organization Key"'
+    }
+    
+    # Filter name -> (SQL column, dimension table it needs)
+    FILTER_EXPRESSIONS = {
+        'product_category': ('i."Item Category Desc"', 'i'),
+        'region': ('r."Sales Org Hrchy L1 Name"', 'r')
+    }
+    
+    # Metric -> aggregate SQL expression; growth is relative to the previous group in the {window} ordering
+    METRIC_EXPRESSIONS = {
+        'revenue': 'SUM(t."Net Sales Amount")',
+        'units': 'SUM(t."Net Sales Quantity")',
+        'aov': 'SUM(t."Net Sales Amount") * 1.0 / NULLIF(SUM(t."Net Sales Quantity"), 0)',
+        'growth': ('(SUM(t."Net Sales Amount") - LAG(SUM(t."Net Sales Amount")) OVER ({window})) * 100.0'
+                   ' / NULLIF(LAG(SUM(t."Net Sales Amount")) OVER ({window}), 0)'),
+        # Margin assumes a unit cost of 10 until cost data is available
+        'margin': ('(SUM(t."Net Sales Amount") - SUM(t."Net Sales Quantity") * 10) * 100.0'
+                   ' / NULLIF(SUM(t."Net Sales Amount"), 0)')
+    }
     
     def __init__(self, dimension: str, time_period: str, metric: str, 
                  filters: Optional[Dict[str, Any]] = None,
                  comparison_mode: Optional[str] = None,
                  db_path: str = None,
-                 include_visualization: bool = True):
+                 include_visualization: bool = True,
+                 comparison_periods: int = 1,
+                 comparison_offset_days: Optional[int] = None,
+                 render_async: bool = True):
         """
         Initialize the SalesPerformanceAnalyzer.
         
@@ -54,9 +86,14 @@ class SalesPerformanceAnalyzer:
             time_period: Time period to analyze ('last_7_days', 'last_30_days', 'last_90_days', 'last_year', 'custom')
             metric: Primary metric to analyze ('revenue', 'units', 'aov', 'growth', 'margin')
             filters: Optional filters to narrow down the analysis
-            comparison_mode: Optional comparison mode ('period_over_period', 'year_over_year')
+            comparison_mode: Optional comparison mode ('period_over_period', 'year_over_year',
+                'month_over_month', 'custom')
             db_path: Path to the SQLite database file
             include_visualization: Whether to include visualizations in the output
+            comparison_periods: Number of earlier periods to compare against
+            comparison_offset_days: Offset between compared periods in days (custom comparison mode)
+            render_async: Whether to return before visualizations are rendered. The result then
+                holds chart handles whose status can be polled with the render queue.
         """
         self.dimension = dimension
         self.time_period = time_period
@@ -65,6 +102,9 @@ class SalesPerformanceAnalyzer:
         self.comparison_mode = comparison_mode
         self.db_path = db_path or config.DATABASE['path']
         self.include_visualization = include_visualization
+        self.comparison_periods = comparison_periods
+        self.comparison_offset_days = comparison_offset_days
+        self.render_async = render_async
         
     def analyze_performance(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -94,6 +134,16 @@ class SalesPerformanceAnalyzer:
                     "status": "error",
                     "message": f"Invalid time period. Must be one of {self.VALID_TIME_PERIODS}"
                 }
+            if self.comparison_mode and self.comparison_mode not in self.VALID_COMPARISON_MODES:
+                return {
+                    "status": "error",
+                    "message": f"Invalid comparison mode. Must be one of {self.VALID_COMPARISON_MODES}"
+                }
+            if self.comparison_mode == "custom" and not self.comparison_offset_days:
+                return {
+                    "status": "error",
+                    "message": "comparison_offset_days must be provided when using custom comparison mode"
+                }
             
             # Use specialized regional analysis if dimension is region
             if self.dimension == 'region':
@@ -113,87 +163,55 @@ class SalesPerformanceAnalyzer:
                     }
                 start_date = (datetime.strptime(end_date, "%Y-%m-%d") - timedelta(days=30)).strftime("%Y-%m-%d")
             
-            # Build query
-            query = self._build_query()
-            params = [start_date, end_date]
-            
-            # Add filter clause if filters are specified
-            filter_clause = self._get_filter_clause()
-            if filter_clause:
-                query = query.replace("ORDER BY", f"{filter_clause} ORDER BY")
-                for value in self.filters.values():
-                    params.append(value)
-            
-            # Execute query with parameters
-            results = wrapper.fetchall(query, params)
-            
-            if not results:
-                return {
-                    "status": "error",
-                    "message": "No data found"
+            dimension_col = self._get_dimension_column()
+            comparison = None
+            if self.comparison_mode:
+                # Current and comparison periods come from the same scan
+                comparison_df = self._get_comparison_data(wrapper, start_date, end_date)
+                if comparison_df.empty:
+                    return {
+                        "status": "error",
+                        "message": "No data found"
+                    }
+                result_df = comparison_df.loc[comparison_df['current'].notna(), [dimension_col, 'current']]
+                result_df = result_df.rename(columns={'current': 'value'}).reset_index(drop=True)
+                comparison = {
+                    "mode": self.comparison_mode,
+                    "periods": [
+                        {"label": label, "start_date": window_start, "end_date": window_end}
+                        for label, window_start, window_end, _ in self._get_comparison_windows(start_date, end_date)
+                    ],
+                    "data": comparison_df.astype(object).where(comparison_df.notna(), None).to_dict('records')
                 }
+            else:
+                # Aggregate in SQL; only one row per dimension value is returned
+                query = self._build_query()
+                params = [start_date, end_date] + self._get_filter_params()
+                results = wrapper.fetchall(query, params)
+                
+                if not results:
+                    return {
+                        "status": "error",
+                        "message": "No data found"
+                    }
+                
+                result_df = pd.DataFrame([tuple(row) for row in results], columns=[dimension_col, 'value'])
             
-            # Convert to DataFrame with column names
-            columns = ['date', 'amount', 'quantity', 'customer_name', 'product_name', 
-                      'category', 'subcategory', 'region_name']
-            data = pd.DataFrame(results, columns=columns)
-            
-            # Group by dimension
-            dimension_col = self._get_dimension_column()
-            grouped = data.groupby(dimension_col)
-            
-            # Calculate metrics
-            if self.metric == "revenue":
-                result = grouped["amount"].sum()
-            elif self.metric == "units":
-                result = grouped["quantity"].sum()
-            elif self.metric == "aov":
-                result = grouped["amount"].sum() / grouped["quantity"].sum()
-            elif self.metric == "growth":
-                # Calculate growth rate
-                result = grouped["amount"].sum().pct_change() * 100
-            elif self.metric == "margin":
-                # Calculate margin (assuming we have cost data)
-                result = (grouped["amount"].sum() - grouped["quantity"].sum() * 10) / grouped["amount"].sum() * 100
-            
-            # Format result
-            result_df = result.reset_index()
-            result_df.columns = [dimension_col, 'value']
-            
-            # Create visualizations if requested
+            # Queue visualizations; they are rendered in the background
             visualization_paths = {}
             if self.include_visualization:
                 try:
-                    # Create performance plot
-                    title = f"{self.metric.title()} by {self.dimension.title()}"
-                    x_label = self.dimension.title()
-                    y_label = self.metric.title()
-                    
-                    mpl_fig, plotly_fig = create_performance_plot(
+                    render_queue = get_render_queue()
+                    visualization_paths = render_queue.submit(
                         result_df,
-                        title=title,
-                        x_label=x_label,
-                        y_label=y_label,
+                        prefix=f"{self.dimension}_{self.metric}_{start_date}_to_{end_date}",
+                        title=f"{self.metric.title()} by {self.dimension.title()}",
+                        x_label=self.dimension.title(),
+                        y_label=self.metric.title(),
                         plot_type="bar" if self.dimension != "time" else "line"
                     )
-                    
-                    # Save visualizations
-                    filename = generate_filename(
-                        f"{self.dimension}_{self.metric}",
-                        f"_{start_date}_to_{end_date}"
-                    )
-                    
-                    # Save matplotlib plot
-                    png_path = save_matplotlib_plot(mpl_fig, filename)
-                    
-                    # Save plotly plot
-                    html_path, plotly_png_path = save_plotly_plot(plotly_fig, filename)
-                    
-                    visualization_paths = {
-                        "matplotlib": png_path,
-                        "plotly_html": html_path,
-                        "plotly_png": plotly_png_path
-                    }
+                    if not self.render_async:
+                        visualization_paths = render_queue.wait(visualization_paths["chart_id"])
                     
                 except Exception as e:
                     logger.error(f"Error creating visualizations: {str(e)}")
@@ -205,13 +223,16 @@ class SalesPerformanceAnalyzer:
             conn.close()
             wrapper.close()
             
-            return {
+            result = {
                 "status": "success",
                 "dimension": self.dimension,
                 "metric": self.metric,
                 "data": result_df.to_dict('records'),
                 "visualizations": visualization_paths
             }
+            if comparison is not None:
+                result["comparison"] = comparison
+            return result
             
         except Exception as e:
             logger.error(f"Error in analyze_performance: {str(e)}")
@@ -221,72 +242,94 @@ class SalesPerformanceAnalyzer:
             }
     
     def _build_query(self) -> str:
-        """Build the SQL query based on the analysis requirements."""
-        base_query = """
+        """
+        Plan a grouped SQL statement for the dimension and metric.
+        
+        The metric is computed by the database over the dimension's group key, and
+        only the dimension tables the grouping or filters need are joined.
+        Parameters are start date, end date and then _get_filter_params().
+        """
+        group_expr, joins = self._get_grouping()
+        metric_expr = self.METRIC_EXPRESSIONS[self.metric].format(window=f"ORDER BY {group_expr}")
+        
+        return f"""
             SELECT 
-                t."Txn Date" as date,
-                t."Net Sales Amount" as amount,
-                t."Net Sales Quantity" as quantity,
-                c."Customer Name" as customer_name,
-                i."Item Desc" as product_name,
-                i."Item Category Desc" as category,
-                i."Item Subcategory Desc" as subcategory,
-                r."Sales Org Hrchy L1 Name" as region_name
+                {group_expr} as dimension_value,
+                {metric_expr} as value
             FROM "dbo_F_Sales_Transaction" t
-            LEFT JOIN "dbo_D_Customer" c ON t."Customer Key" = c."Customer Key"
-            LEFT JOIN "dbo_D_Item" i ON t."Item Key" = i."Item Key"
-            LEFT JOIN "dbo_D_Sales_Organization" r ON t."Sales Organization Key" = r."Sales Organization Key"
+            {joins}
             WHERE t."Txn Date" BETWEEN ? AND ?
                 AND t."Deleted Flag" = 0
                 AND t."Excluded Flag" = 0
+                AND {group_expr} IS NOT NULL
+                {self._get_filter_clause()}
+            GROUP BY {group_expr}
+            ORDER BY {group_expr}
+        """
+    
+    def _build_comparison_query(self, window_count: int) -> str:
         """
+        Plan a grouped SQL statement over the current and comparison periods.
         
-        # Add dimension-specific grouping
-        if self.dimension == 'product':
-            base_query += """
-                GROUP BY t."Item Key", i."Item Desc", i."Item Category Desc", i."Item Subcategory Desc"
-                ORDER BY SUM(t."Net Sales Amount") DESC
-            """
-        elif self.dimension == 'category':
-            base_query += """
-                GROUP BY i."Item Category Desc"
-                ORDER BY SUM(t."Net Sales Amount") DESC
-            """
-        elif self.dimension == 'region':
-            base_query += """
-                GROUP BY r."Sales Org Hrchy L1 Name"
-                ORDER BY SUM(t."Net Sales Amount") DESC
-            """
-        elif self.dimension == 'customer':
-            base_query += """
-                GROUP BY c."Customer Name"
-                ORDER BY SUM(t."Net Sales Amount") DESC
-            """
-        else:  # time dimension
-            base_query += """
-                GROUP BY t."Txn Date"
-                ORDER BY t."Txn Date"
-            """
+        Fact rows are read once, restricted by an OR of the period date ranges so
+        only rows inside some period are scanned (not the whole span between them),
+        and cross-joined with a small windows table, so each row is counted in every
+        period it falls in (periods may overlap). For the time dimension, dates are
+        shifted onto the current period so members line up across periods.
+        Parameters are label, start date, end date and shift in days per window, then
+        start and end date per window again, then _get_filter_params().
+        """
+        group_expr, joins = self._get_grouping()
+        if self.dimension not in self.DIMENSION_EXPRESSIONS or self.dimension == 'time':
+            group_expr = "date(t.\"Txn Date\", printf('%+d days', w.shift_days))"
+        metric_expr = self.METRIC_EXPRESSIONS[self.metric].format(
+            window=f"PARTITION BY w.label ORDER BY {group_expr}"
+        )
+        windows = ", ".join(["(?, ?, ?, ?)"] * window_count)
+        date_ranges = " OR ".join(['t."Txn Date" BETWEEN ? AND ?'] * window_count)
         
-        return base_query
+        # CROSS JOIN keeps the fact table as the outer loop in SQLite
+        return f"""
+            WITH windows(label, start_date, end_date, shift_days) AS (VALUES {windows})
+            SELECT 
+                w.label as period_label,
+                {group_expr} as dimension_value,
+                {metric_expr} as value
+            FROM "dbo_F_Sales_Transaction" t
+            CROSS JOIN windows w
+            {joins}
+            WHERE ({date_ranges})
+                AND t."Txn Date" BETWEEN w.start_date AND w.end_date
+                AND t."Deleted Flag" = 0
+                AND t."Excluded Flag" = 0
+                AND {group_expr} IS NOT NULL
+                {self._get_filter_clause()}
+            GROUP BY w.label, {group_expr}
+        """
+    
+    def _get_grouping(self) -> Tuple[str, str]:
+        """Get the SQL group key and the joins needed by the grouping and the filters."""
+        group_expr, tables = self.DIMENSION_EXPRESSIONS.get(self.dimension, self.DIMENSION_EXPRESSIONS['time'])
+        tables = list(tables)
+        for key in self.filters:
+            if key in self.FILTER_EXPRESSIONS and self.FILTER_EXPRESSIONS[key][1] not in tables:
+                tables.append(self.FILTER_EXPRESSIONS[key][1])
+        return group_expr, "\n".join(self.DIMENSION_JOINS[table] for table in tables)
     
     def _get_filter_clause(self) -> str:
         """Get SQL filter clause based on filters."""
-        if not self.filters:
-            return ""
-        
-        conditions = []
-        for key, value in self.filters.items():
-            if key == "product_category":
-                conditions.append(f"i.\"Item Category Desc\" = ?")
-            elif key == "region":
-                conditions.append(f"r.\"Sales Org Hrchy L1 Name\" = ?")
-            # Add more filter conditions as needed
-        
+        conditions = [
+            f"{self.FILTER_EXPRESSIONS[key][0]} = ?"
+            for key in self.filters if key in self.FILTER_EXPRESSIONS
+        ]
         if conditions:
             return "AND " + " AND ".join(conditions)
         return ""
     
+    def _get_filter_params(self) -> List[Any]:
+        """Get the parameters for the filter clause, in the same order."""
+        return [value for key, value in self.filters.items() if key in self.FILTER_EXPRESSIONS]
+    
     def _get_dimension_column(self) -> str:
         """Get the column name for the specified dimension."""
         dimension_map = {
@@ -298,20 +341,70 @@ class SalesPerformanceAnalyzer:
         }
         return dimension_map.get(self.dimension, "date")
     
-    def _add_comparison(self, result: pd.DataFrame, original_data: pd.DataFrame) -> pd.DataFrame:
-        """Add comparison data to the results."""
-        if self.comparison_mode == "period_over_period":
-            # Calculate previous period metrics
-            prev_start = (datetime.strptime(self.time_period.split(":")[0], "%Y-%m-%d") - 
-                        timedelta(days=30)).strftime("%Y-%m-%d")
-            prev_end = self.time_period.split(":")[0]
-            
-            prev_result = self.analyze_performance(prev_start, prev_end)
-            result["Previous_Period"] = prev_result[self.metric]
-            result["Growth"] = ((result[self.metric] - result["Previous_Period"]) / 
-                              result["Previous_Period"] * 100)
+    def _get_comparison_windows(self, start_date: str, end_date: str) -> List[Tuple[str, str, str, int]]:
+        """
+        Get the current period and the comparison periods before it.
+        
+        Args:
+            start_date: Start date of the current period in YYYY-MM-DD format
+            end_date: End date of the current period in YYYY-MM-DD format
+            
+        Returns:
+            List of (label, start date, end date, shift in days onto the current period),
+            starting with 'current' followed by 'previous_1', 'previous_2', ...
+        """
+        start = pd.Timestamp(start_date)
+        end = pd.Timestamp(end_date)
+        windows = [('current', start_date, end_date, 0)]
+        for k in range(1, self.comparison_periods + 1):
+            if self.comparison_mode == 'year_over_year':
+                offset = pd.DateOffset(years=k)
+            elif self.comparison_mode == 'month_over_month':
+                offset = pd.DateOffset(months=k)
+            elif self.comparison_mode == 'custom':
+                offset = pd.Timedelta(days=self.comparison_offset_days * k)
+            else:
+                # Period over period: the same number of days immediately before
+                offset = pd.Timedelta(days=((end - start).days + 1) * k)
+            window_start = start - offset
+            windows.append((f'previous_{k}', window_start.strftime('%Y-%m-%d'),
+                            (end - offset).strftime('%Y-%m-%d'), (start - window_start).days))
+        return windows
+    
+    def _get_comparison_data(self, wrapper, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        Compute the metric for the current and comparison periods in one query.
+        
+        Args:
+            wrapper: Database wrapper to run the query on
+            start_date: Start date of the current period in YYYY-MM-DD format
+            end_date: End date of the current period in YYYY-MM-DD format
+        
+        Returns:
+            DataFrame with one row per dimension member and columns current, previous_k,
+            delta_k (current - previous_k) and growth_k (percent) for each comparison period
+        """
+        windows = self._get_comparison_windows(start_date, end_date)
+        params = [value for window in windows for value in window]
+        params += [date for window in windows for date in window[1:3]]
+        params += self._get_filter_params()
+        results = wrapper.fetchall(self._build_comparison_query(len(windows)), params)
+        
+        dimension_col = self._get_dimension_column()
+        labels = [window[0] for window in windows]
+        if not results:
+            return pd.DataFrame(columns=[dimension_col] + labels)
         
-        return result
+        data = pd.DataFrame([tuple(row) for row in results], columns=['period_label', dimension_col, 'value'])
+        data['value'] = data['value'].astype(float)
+        comparison = data.pivot(index=dimension_col, columns='period_label', values='value').reindex(columns=labels)
+        for label in labels[1:]:
+            k = label.split('_')[1]
+            previous = comparison[label]
+            comparison[f'delta_{k}'] = comparison['current'] - previous
+            comparison[f'growth_{k}'] = comparison[f'delta_{k}'] / previous.replace(0, np.nan) * 100
+        comparison.columns.name = None
+        return comparison.reset_index()
     
     def _format_result(self, result: pd.DataFrame) -> Dict[str, Any]:
         """Format the result for output."""
@@ -187,5 +187,73 @@ class TestSalesPerformanceAnalyzer(unittest.TestCase):
             # Check that data is a list
             self.assertIsInstance(result.get("data", []), list)
 
+class TestSalesPerformanceAnalyzerLogic(unittest.TestCase):
+    """Tests that need no database."""
+    
+    def test_build_query_aggregates_in_sql(self):
+        """Test that the planned query groups in SQL and joins only the tables it needs."""
+        analyzer = SalesPerformanceAnalyzer(
+            dimension="time",
+            time_period="last_30_days",
+            metric="aov"
+        )
+        query = analyzer._build_query()
+        self.assertIn('GROUP BY t."Txn Date"', query)
+        self.assertIn("NULLIF(SUM(", query)
+        self.assertNotIn("JOIN", query)
+        
+        # A filter pulls in the dimension table it needs; unknown filters are ignored
+        analyzer = SalesPerformanceAnalyzer(
+            dimension="customer",
+            time_period="last_30_days",
+            metric="growth",
+            filters={"region": "North", "unknown": "x"}
+        )
+        query = analyzer._build_query()
+        self.assertIn('"dbo_D_Customer"', query)
+        self.assertIn('"dbo_D_Sales_Organization"', query)
+        self.assertNotIn('"dbo_D_Item"', query)
+        self.assertIn("LAG(", query)
+        self.assertEqual(query.count("?"), 3)
+        self.assertEqual(analyzer._get_filter_params(), ["North"])
+    
+    def test_comparison_windows(self):
+        """Test the current and comparison periods used by the single-scan comparison."""
+        analyzer = SalesPerformanceAnalyzer(
+            dimension="product",
+            time_period="custom",
+            metric="revenue",
+            comparison_mode="period_over_period",
+            comparison_periods=2
+        )
+        windows = analyzer._get_comparison_windows("2021-03-01", "2021-03-10")
+        self.assertEqual(windows, [
+            ("current", "2021-03-01", "2021-03-10", 0),
+            ("previous_1", "2021-02-19", "2021-02-28", 10),
+            ("previous_2", "2021-02-09", "2021-02-18", 20)
+        ])
+        
+        analyzer.comparison_mode = "year_over_year"
+        windows = analyzer._get_comparison_windows("2021-03-01", "2021-03-10")
+        self.assertEqual(windows[1][1:3], ("2020-03-01", "2020-03-10"))
+        
+        # One query with a windows row per period
+        query = analyzer._build_comparison_query(len(windows))
+        self.assertEqual(query.count("(?, ?, ?, ?)"), 3)
+        self.assertIn("CROSS JOIN windows w", query)
+        # Rows are restricted to the periods themselves, not the span between them
+        self.assertEqual(query.count('t."Txn Date" BETWEEN ? AND ?'), 3)
+        self.assertEqual(query.count("?"), 3 * 4 + 3 * 2)
+    
+    def test_chart_content_hash(self):
+        """Test that charts are keyed by the plotted data and options."""
+        from visualization_utils import chart_content_hash
+        data = pd.DataFrame({"category": ["A", "B"], "value": [1.0, 2.0]})
+        key = chart_content_hash(data, title="Revenue", plot_type="bar")
+        
+        self.assertEqual(key, chart_content_hash(data.copy(), title="Revenue", plot_type="bar"))
+        self.assertNotEqual(key, chart_content_hash(data, title="Revenue", plot_type="line"))
+        self.assertNotEqual(key, chart_content_hash(data.assign(value=[1.0, 3.0]), title="Revenue", plot_type="bar"))
+
 if __name__ == "__main__":
     unittest.main() 
\ No newline at end of file
@@ -1,9 +1,22 @@
 """
 Utility functions for creating and saving visualizations.
+
+Charts are rendered by a background process pool (ChartRenderQueue) so analyses can
+return before the figures are written. Charts are named by a content hash of the
+plotted data and options, so identical charts are rendered only once.
 """
 
 import os
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+import matplotlib
 import matplotlib.pyplot as plt
+import pandas as pd
 import seaborn as sns
 import plotly.graph_objects as go
 import plotly.io as pio
@@ -21,6 +34,11 @@ logger = logging.getLogger(__name__)
 # Set the visualization output directory
 VISUALIZATION_DIR = Path(__file__).parent.parent.parent.parent.joinpath('output', 'visualizations')
 
+# Number of chart render processes
+RENDER_WORKERS = int(os.environ.get('CHART_RENDER_WORKERS', '2'))
+# Seconds after which a pending marker without output counts as abandoned
+RENDER_PENDING_TIMEOUT = 600
+
 def ensure_visualization_dir():
     """Ensure the visualization directory exists."""
     if not os.path.exists(VISUALIZATION_DIR):
@@ -149,4 +167,253 @@ def generate_filename(prefix, suffix=""):
         Generated filename
     """
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return f"{prefix}_{timestamp}{suffix}" 
\ No newline at end of file
+    return f"{prefix}_{timestamp}{suffix}" 
+
+def chart_content_hash(data, **options) -> str:
+    """
+    Hash the plotted data and the chart options.
+    
+    Args:
+        data: DataFrame to plot
+        **options: Chart options (title, labels, plot type, ...)
+    
+    Returns:
+        Hex digest identifying the chart content
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(column) for column in data.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=False).values.tobytes())
+    digest.update(json.dumps(options, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+def chart_paths(chart_id: str) -> Dict[str, str]:
+    """Get the output files of a chart."""
+    return {
+        "matplotlib": os.path.join(VISUALIZATION_DIR, f"{chart_id}.png"),
+        "plotly_html": os.path.join(VISUALIZATION_DIR, f"{chart_id}_plotly.html"),
+        "plotly_png": os.path.join(VISUALIZATION_DIR, f"{chart_id}_plotly.png")
+    }
+
+def chart_state_paths(chart_id: str) -> Dict[str, str]:
+    """Get the marker files recording a chart's render state for every process."""
+    return {
+        "pending": os.path.join(VISUALIZATION_DIR, f"{chart_id}.pending"),
+        "error": os.path.join(VISUALIZATION_DIR, f"{chart_id}.error")
+    }
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def render_performance_chart(data, chart_id, title, x_label, y_label, plot_type="bar", query_params=None):
+    """
+    Create and save the matplotlib and plotly figures of a chart. Runs in a render worker.
+    
+    Files are written under temporary names and moved into place at the end, so a
+    chart whose files exist is complete. On failure the error is written to the
+    chart's error marker; either way the pending marker is removed.
+    
+    Returns:
+        Dictionary of output file paths
+    """
+    state = chart_state_paths(chart_id)
+    partial = f"{chart_id}.partial-{os.getpid()}"
+    mpl_fig = None
+    try:
+        mpl_fig, plotly_fig = create_performance_plot(
+            data, title=title, x_label=x_label, y_label=y_label,
+            plot_type=plot_type, query_params=query_params
+        )
+        written = {"matplotlib": save_matplotlib_plot(mpl_fig, partial)}
+        written["plotly_html"], written["plotly_png"] = save_plotly_plot(plotly_fig, f"{partial}_plotly")
+    except Exception as e:
+        if mpl_fig is not None:
+            plt.close(mpl_fig)
+        for path in Path(VISUALIZATION_DIR).glob(f"{partial}*"):
+            path.unlink()
+        ensure_visualization_dir()
+        Path(state["error"]).write_text(str(e))
+        _remove_file(state["pending"])
+        raise
+    
+    paths = chart_paths(chart_id)
+    for key, path in written.items():
+        os.replace(path, paths[key])
+    _remove_file(state["error"])
+    _remove_file(state["pending"])
+    return paths
+
+def _init_render_worker():
+    """Render worker initializer: use the non-interactive backend."""
+    matplotlib.use('Agg')
+
+class ChartRenderQueue:
+    """
+    Renders charts in a background process pool, keyed by content hash.
+    
+    Render state is kept in marker files next to the chart files (see
+    chart_state_paths), so any process, such as another service worker, can
+    report the status of a chart queued elsewhere.
+    """
+    
+    def __init__(self, max_workers: Optional[int] = None, max_jobs: int = 256):
+        """
+        Initialize the queue. The process pool is started on first use.
+        
+        Args:
+            max_workers: Number of render processes (defaults to RENDER_WORKERS)
+            max_jobs: Number of finished render jobs to remember
+        """
+        self.max_workers = max_workers or RENDER_WORKERS
+        self.max_jobs = max_jobs
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._jobs: "OrderedDict[str, Future]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def submit(self, data, prefix: str, title: str, x_label: str, y_label: str,
+               plot_type: str = "bar", query_params: Optional[Dict] = None) -> Dict[str, Any]:
+        """
+        Queue a performance chart for rendering unless the same chart is rendered or queued.
+        
+        Args:
+            data: DataFrame to plot (first column on x, second on y)
+            prefix: Readable prefix for the chart files
+            title: Title of the plot
+            x_label: Label for x-axis
+            y_label: Label for y-axis
+            plot_type: Type of plot ('bar', 'line', 'area')
+            query_params: Optional query-based transformations (see create_performance_plot)
+        
+        Returns:
+            Chart handle (see status)
+        """
+        options = {
+            "title": title,
+            "x_label": x_label,
+            "y_label": y_label,
+            "plot_type": plot_type,
+            "query_params": query_params
+        }
+        chart_id = f"{prefix}_{chart_content_hash(data, **options)[:16]}"
+        
+        with self._lock:
+            if self.status(chart_id)["status"] in ("not_found", "error"):
+                # Mark the chart pending before it is queued, for every process
+                ensure_visualization_dir()
+                state = chart_state_paths(chart_id)
+                _remove_file(state["error"])
+                Path(state["pending"]).touch()
+                self._jobs[chart_id] = self._submit(data, chart_id, options)
+                self._evict()
+        return self.status(chart_id)
+    
+    def status(self, chart_id: str) -> Dict[str, Any]:
+        """
+        Get a chart handle.
+        
+        Args:
+            chart_id: Chart identifier returned by submit
+        
+        Returns:
+            Dictionary with chart_id, status ('pending', 'ready', 'error' or 'not_found'
+            for charts that are neither on disk nor queued by any process) and the file paths
+        """
+        handle = {"chart_id": chart_id}
+        state = chart_state_paths(chart_id)
+        job = self._jobs.get(chart_id)
+        if self._is_rendered(chart_id):
+            handle["status"] = "ready"
+        elif os.path.exists(state["error"]):
+            handle["status"] = "error"
+            handle["error"] = Path(state["error"]).read_text()
+        elif job is not None and job.done() and job.exception() is not None:
+            # The render process died before it could record the error
+            handle["status"] = "error"
+            handle["error"] = str(job.exception())
+        elif (job is not None and not job.done()) or self._is_pending(state["pending"]):
+            handle["status"] = "pending"
+        else:
+            handle["status"] = "not_found"
+        handle.update(chart_paths(chart_id))
+        return handle
+    
+    def wait(self, chart_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Wait for a queued chart to finish rendering.
+        
+        Args:
+            chart_id: Chart identifier returned by submit
+            timeout: Maximum number of seconds to wait
+        
+        Returns:
+            Chart handle (see status)
+        """
+        job = self._jobs.get(chart_id)
+        if job is not None:
+            wait([job], timeout=timeout)
+        return self.status(chart_id)
+    
+    def shutdown(self, wait_for_jobs: bool = True):
+        """Stop the render processes."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait_for_jobs)
+                self._executor = None
+    
+    def _submit(self, data, chart_id: str, options: Dict[str, Any]) -> Future:
+        """Submit a render job, restarting the pool once if a worker died."""
+        for attempt in range(2):
+            try:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                         initializer=_init_render_worker)
+                return self._executor.submit(render_performance_chart, data, chart_id, **options)
+            except BrokenProcessPool:
+                logger.warning("Chart render pool broken, restarting")
+                self._executor = None
+            except (OSError, NotImplementedError) as e:
+                # No process support here: render in this process instead
+                logger.warning(f"Rendering chart {chart_id} inline: {str(e)}")
+                break
+        
+        job = Future()
+        try:
+            job.set_result(render_performance_chart(data, chart_id, **options))
+        except Exception as e:
+            logger.error(f"Error rendering chart {chart_id}: {str(e)}")
+            job.set_exception(e)
+        return job
+    
+    def _evict(self):
+        """Forget the oldest finished jobs beyond max_jobs."""
+        for chart_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[chart_id].done():
+                del self._jobs[chart_id]
+    
+    @staticmethod
+    def _is_rendered(chart_id: str) -> bool:
+        """Whether all files of a chart exist."""
+        return all(os.path.exists(path) for path in chart_paths(chart_id).values())
+    
+    @staticmethod
+    def _is_pending(marker: str) -> bool:
+        """Whether a pending marker exists and is recent enough to still be rendering."""
+        try:
+            return datetime.now().timestamp() - os.path.getmtime(marker) < RENDER_PENDING_TIMEOUT
+        except OSError:
+            return False
+
+_render_queue: Optional[ChartRenderQueue] = None
+_render_queue_lock = threading.Lock()
+
+def get_render_queue() -> ChartRenderQueue:
+    """Get the process-wide chart render queue."""
+    global _render_queue
+    with _render_queue_lock:
+        if _render_queue is None:
+            _render_queue = ChartRenderQueue()
+        return _render_queue
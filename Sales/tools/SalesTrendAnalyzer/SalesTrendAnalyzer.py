@@ -17,7 +17,11 @@ import sys
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../..'))
 sys.path.insert(0, project_root)
 
+import json
 import logging
+import sqlite3
+import threading
+from collections import OrderedDict
 import pandas as pd
 import numpy as np
 from typing import Dict, Any, Optional, List, Union, Tuple
@@ -26,14 +30,35 @@ import matplotlib.pyplot as plt
 import io
 import base64
 
-from Sales.database.connection import get_connection
+from Sales.database.connection import ReadOnlyConnection, get_connection, get_data_version
 from Sales.database.query_templates import get_latest_date
+from Sales.database.trend_cube import TrendCube, DIMENSION_FIELDS
 from Sales.database import config
 
 # Configure logging
 logging.basicConfig(level=config.LOGGING['level'])
 logger = logging.getLogger(__name__)
 
+# Aggregated trend frames keyed by (database path, data version, time period, dimension, filters, start, end)
+_TREND_DATA_CACHE: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+_TREND_DATA_CACHE_SIZE = 64
+_TREND_DATA_CACHE_LOCK = threading.Lock()
+
+def _cache_get(key: tuple) -> Optional[pd.DataFrame]:
+    """Look up a trend frame and mark it recently used (None on a miss)."""
+    with _TREND_DATA_CACHE_LOCK:
+        if key not in _TREND_DATA_CACHE:
+            return None
+        _TREND_DATA_CACHE.move_to_end(key)
+        return _TREND_DATA_CACHE[key]
+
+def _cache_put(key: tuple, data: pd.DataFrame) -> None:
+    """Store a trend frame, evicting the least recently used entries."""
+    with _TREND_DATA_CACHE_LOCK:
+        _TREND_DATA_CACHE[key] = data
+        while len(_TREND_DATA_CACHE) > _TREND_DATA_CACHE_SIZE:
+            _TREND_DATA_CACHE.popitem(last=False)
+
 class SalesTrendAnalyzer:
     """
     Analyzes sales trends over time, identifying patterns, seasonality, and growth rates.
@@ -48,7 +73,8 @@ class SalesTrendAnalyzer:
                  filters: Optional[Dict[str, Any]] = None,
                  include_visualization: bool = True,
                  trend_periods: int = 12,
-                 db_path: Optional[str] = None):
+                 db_path: Optional[str] = None,
+                 use_cube: bool = False):
         """
         Initialize the SalesTrendAnalyzer.
         
@@ -61,6 +87,8 @@ class SalesTrendAnalyzer:
             include_visualization: Whether to include trend visualization
             trend_periods: Number of periods to include in the trend analysis
             db_path: Optional path to the database file
+            use_cube: Whether to read pre-bucketed rows from the trend cube (ignored when
+                filters are set, since the cube only holds the unfiltered aggregates)
         """
         if time_period not in self.VALID_TIME_PERIODS:
             raise ValueError(f"Invalid time period. Must be one of {self.VALID_TIME_PERIODS}")
@@ -77,13 +105,20 @@ class SalesTrendAnalyzer:
         self.include_visualization = include_visualization
         self.trend_periods = trend_periods
         self.db_path = db_path or config.DATABASE['path']
+        self.use_cube = use_cube
         
         logger.info(f"Initialized SalesTrendAnalyzer with time_period={time_period}, metric={metric}, dimension={dimension}, trend_periods={trend_periods}")
     
+    def _get_connection(self):
+        """Open read-only connections to the analyzer's database (pooled for the configured one)."""
+        if os.path.abspath(self.db_path) == os.path.abspath(config.DATABASE['path']):
+            return get_connection()
+        return sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True), ReadOnlyConnection(self.db_path)
+    
     def get_available_date_range(self) -> Dict[str, str]:
         """Get the available date range in the database."""
         try:
-            conn, wrapper = get_connection()
+            conn, wrapper = self._get_connection()
             
             query = """
                 SELECT MIN("Txn Date") as min_date, MAX("Txn Date") as max_date
@@ -129,7 +164,7 @@ class SalesTrendAnalyzer:
         """
         try:
             # Get database connection
-            conn, wrapper = get_connection()
+            conn, wrapper = self._get_connection()
             
             # Get date range if not provided
             if not start_date or not end_date:
@@ -142,42 +177,16 @@ class SalesTrendAnalyzer:
                 start_date = date_range["min_date"]
                 end_date = date_range["max_date"]
             
-            # Build and execute query
-            query = self._build_query(start_date, end_date)
-            
-            # Prepare query parameters
-            params = [start_date, end_date]
-            if self.filters:
-                for value in self.filters.values():
-                    if isinstance(value, (list, tuple)):
-                        params.extend(value)
-                    else:
-                        params.append(value)
-            
-            # Execute query
-            results = wrapper.fetchall(query, tuple(params))
-            if not results:
+            # Get the aggregated frame (one query per period/dimension/filters/date range)
+            data = self.get_trend_data(start_date, end_date, wrapper)
+            if data.empty:
                 return {
                     "status": "error",
                     "message": "No data found for the specified date range"
                 }
             
-            # Convert results to DataFrame
-            columns = ['period', 'revenue', 'units', 'orders']
-            if self.dimension:
-                columns.extend(['dimension_id', 'dimension_name'])
-            
-            data = pd.DataFrame(results, columns=columns)
-            
             # Analyze based on metric
-            if self.metric == 'revenue':
-                analysis = self._analyze_revenue(data)
-            elif self.metric == 'units':
-                analysis = self._analyze_volume(data)
-            elif self.metric == 'aov':
-                analysis = self._analyze_aov(data)
-            else:  # margin
-                analysis = self._analyze_margin(data)
+            analysis = self._analyze_metric(data.copy(), self.metric)
             
             # Add visualization if requested
             if self.include_visualization:
@@ -206,6 +215,164 @@ class SalesTrendAnalyzer:
             if wrapper:
                 wrapper.close()
     
+    def analyze_all_metrics(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                            metrics: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Analyze several metrics from a single aggregated query.
+        
+        The aggregated frame is cached per time period, dimension, filters and date
+        range, so switching between metrics does not touch the database.
+        
+        Args:
+            start_date: Optional start date for analysis (YYYY-MM-DD)
+            end_date: Optional end date for analysis (YYYY-MM-DD)
+            metrics: Metrics to analyze. Defaults to VALID_METRICS.
+        
+        Returns:
+            Dictionary containing one analysis per metric
+        """
+        metrics = [metric.lower() for metric in (metrics or self.VALID_METRICS)]
+        try:
+            if not all(metric in self.VALID_METRICS for metric in metrics):
+                raise ValueError(f"Invalid metric. Must be one of {self.VALID_METRICS}")
+            
+            # Get date range if not provided
+            if not start_date or not end_date:
+                date_range = self.get_available_date_range()
+                if date_range["status"] == "error":
+                    return {
+                        "status": "error",
+                        "message": date_range["message"]
+                    }
+                start_date = date_range["min_date"]
+                end_date = date_range["max_date"]
+            
+            data = self.get_trend_data(start_date, end_date)
+            if data.empty:
+                return {
+                    "status": "error",
+                    "message": "No data found for the specified date range"
+                }
+            
+            # A failing metric does not prevent the others from being reported
+            analyses = {}
+            for metric in metrics:
+                try:
+                    analyses[metric] = self._analyze_metric(data.copy(), metric)
+                except Exception as e:
+                    analyses[metric] = {
+                        "status": "error",
+                        "message": str(e)
+                    }
+            
+            result = {
+                "status": "success",
+                "analyses": analyses,
+                "time_period": self.time_period,
+                "metrics": metrics,
+                "dimension": self.dimension,
+                "start_date": start_date,
+                "end_date": end_date
+            }
+            
+            # Add visualization if requested
+            if self.include_visualization:
+                result['visualization'] = self._create_trend_visualization(data)
+            
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error analyzing trend metrics: {str(e)}")
+            return {
+                "status": "error",
+                "message": str(e)
+            }
+    
+    def get_trend_data(self, start_date: str, end_date: str, wrapper=None) -> pd.DataFrame:
+        """
+        Get the aggregated trend frame, running _build_query only on a cache miss.
+        
+        The frame holds revenue, units and orders per period (and dimension), which
+        is everything the metric analyses need. The cache is keyed by the database
+        version. The returned frame is shared and must not be modified.
+        
+        Args:
+            start_date: Start date for analysis (YYYY-MM-DD)
+            end_date: End date for analysis (YYYY-MM-DD)
+            wrapper: Optional open ReadOnlyConnection to run the query on
+        
+        Returns:
+            DataFrame with period, revenue, units, orders (and dimension_id, dimension_name)
+        """
+        key = (self.db_path, get_data_version(self.db_path), self.time_period, self.dimension,
+               json.dumps(self.filters, sort_keys=True, default=str), start_date, end_date)
+        data = _cache_get(key)
+        if data is not None:
+            return data
+        
+        if self.use_cube and not self.filters:
+            try:
+                data = TrendCube(source_path=self.db_path).query(self.time_period, self.dimension,
+                                                                 start_date, end_date)
+            except sqlite3.OperationalError as e:
+                # The cube is locked by a long refresh elsewhere (or unwritable): scan the facts instead
+                logger.warning(f"Trend cube unavailable, querying the sales database: {str(e)}")
+            else:
+                _cache_put(key, data)
+                return data
+        
+        # Build query
+        query = self._build_query(start_date, end_date)
+        
+        # Prepare query parameters
+        params = [start_date, end_date]
+        if self.filters:
+            for value in self.filters.values():
+                if isinstance(value, (list, tuple)):
+                    params.extend(value)
+                else:
+                    params.append(value)
+        
+        # Execute query
+        if wrapper is not None:
+            results = wrapper.fetchall(query, tuple(params))
+        else:
+            conn, wrapper = self._get_connection()
+            try:
+                results = wrapper.fetchall(query, tuple(params))
+            finally:
+                conn.close()
+                wrapper.close()
+        
+        # Convert results to DataFrame
+        columns = ['period', 'revenue', 'units', 'orders']
+        if self.dimension:
+            columns.extend(['dimension_id', 'dimension_name'])
+        
+        data = pd.DataFrame(results, columns=columns)
+        _cache_put(key, data)
+        return data
+    
+    def _analyze_metric(self, data: pd.DataFrame, metric: str) -> Dict[str, Any]:
+        """
+        Run the analysis for one metric.
+        
+        Args:
+            data: DataFrame containing sales data (may be modified)
+            metric: Metric to analyze ('revenue', 'units', 'aov', 'margin')
+        
+        Returns:
+            Dictionary containing the metric analysis
+        """
+        if metric == 'revenue':
+            return self._analyze_revenue(data)
+        elif metric == 'units':
+            return self._analyze_volume(data)
+        elif metric == 'aov':
+            return self._analyze_aov(data)
+        else:  # margin
+            return self._analyze_margin(data)
+    
     def _build_query(self, start_date: str, end_date: str) -> str:
         """
         Build SQL query for trend analysis.
@@ -222,13 +389,7 @@ class SalesTrendAnalyzer:
         # Base query with dimension fields
         dimension_field = None
         if self.dimension:
-            dimension_field = {
-                'product': ('Item Key', 'Item Number'),
-                'category': ('Item Category Hrchy Key', 'Product Posting Group'),
-                'channel': ('Sales Organization Key', 'Business Unit Key'),
-                'region': ('Customer Geography Hrchy Key', 'Customer Geography Hrchy Key'),
-                'customer': ('Customer Key', 'Customer Key')
-            }.get(self.dimension)
+            dimension_field = DIMENSION_FIELDS.get(self.dimension)
         
         # Build SELECT clause
         select_clause = [
@@ -453,20 +614,18 @@ class SalesTrendAnalyzer:
         Returns:
             List of top performers with their metrics
         """
-        if self.dimension == "product":
-            group_col = "Item ID"
-        elif self.dimension == "region":
-            group_col = "Region ID"
-        else:
+        if not self.dimension or 'dimension_id' not in data.columns:
             return []
         
-        top_performers = data.groupby(group_col)[metric].sum().nlargest(self.top_n)
+        total = data[metric].sum()
+        top_performers = data.groupby(['dimension_id', 'dimension_name'])[metric].sum().nlargest(self.top_n)
         
         return [
             {
-                "id": idx,
+                "id": idx[0],
+                "name": idx[1],
                 "value": val,
-                "share": (val / data[metric].sum()) * 100
+                "share": (val / total) * 100
             }
             for idx, val in top_performers.items()
         ]
@@ -1,6 +1,9 @@
 import unittest
 import os
 import sys
+import sqlite3
+import tempfile
+from unittest import mock
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -214,5 +217,83 @@ class TestSalesTrendAnalyzer(unittest.TestCase):
             # Check that the metric is correct
             self.assertEqual(result["metric"], metric)
 
+class TestSalesTrendAnalyzerLogic(unittest.TestCase):
+    """Tests that need no database."""
+    
+    def test_analyze_all_metrics_from_cached_frame(self):
+        """Test that all metrics are computed from one cached aggregated frame."""
+        import SalesTrendAnalyzer as module
+        analyzer = SalesTrendAnalyzer(time_period="monthly", dimension="customer", include_visualization=False)
+        data = pd.DataFrame({
+            "period": ["2030-01", "2030-02", "2030-02"],
+            "revenue": [100.0, 150.0, 50.0],
+            "units": [10, 12, 3],
+            "orders": [4, 5, 1],
+            "dimension_id": [1, 1, 2],
+            "dimension_name": [1, 1, 2]
+        })
+        key = (analyzer.db_path, module.get_data_version(analyzer.db_path), "monthly", "customer",
+               "{}", "2030-01-01", "2030-02-28")
+        module._TREND_DATA_CACHE[key] = data
+        try:
+            result = analyzer.analyze_all_metrics("2030-01-01", "2030-02-28", ["revenue", "units", "aov"])
+        finally:
+            module._TREND_DATA_CACHE.pop(key, None)
+        
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["analyses"]["revenue"]["total_revenue"], 300.0)
+        self.assertEqual(result["analyses"]["units"]["top_performers"][0]["id"], 1)
+        self.assertIn("avg_aov", result["analyses"]["aov"])
+        # The cached frame is not modified by the metric analyses
+        self.assertNotIn("aov", data.columns)
+    
+    def test_trend_cube_calendar_matches_sql_labels(self):
+        """Test that trend cube period labels and bounds follow the SQL strftime groupings."""
+        from Sales.database.trend_cube import build_calendar
+        calendar, periods = build_calendar(pd.Series(["2021-01-01", "2021-01-04", "2021-12-31"]))
+        
+        self.assertEqual(list(calendar["weekly"]), ["2021-00", "2021-01", "2021-52"])
+        self.assertEqual(list(calendar["quarterly"]), ["2021-Q1", "2021-Q1", "2021-Q4"])
+        
+        bounds = periods.set_index(["grain", "period"])
+        # Week 00 is cut at the start of the year
+        self.assertEqual(tuple(bounds.loc[("weekly", "2021-00")]), ("2021-01-01", "2021-01-03"))
+        self.assertEqual(tuple(bounds.loc[("weekly", "2021-52")]), ("2021-12-27", "2021-12-31"))
+        self.assertEqual(tuple(bounds.loc[("monthly", "2021-12")]), ("2021-12-01", "2021-12-31"))
+    
+    def test_trend_cube_follows_the_database_path(self):
+        """Test that the cube and SQL paths read the analyzer's database and a locked cube falls back to SQL."""
+        import SalesTrendAnalyzer as module
+        from Sales.database import incremental_store
+        from Sales.database.synthetic_data import build_sales_database
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = os.path.join(tmpdir, "sales.db")
+            build_sales_database(db_path, n_transactions=3000, n_items=30, n_customers=100,
+                                 days=60, chunk_size=1000)
+            
+            def trend_data(use_cube):
+                module._TREND_DATA_CACHE.clear()
+                analyzer = SalesTrendAnalyzer(time_period="monthly", dimension="product",
+                                              include_visualization=False, db_path=db_path, use_cube=use_cube)
+                return analyzer.get_trend_data("2022-01-01", "2022-03-31")
+            
+            try:
+                expected = trend_data(False)
+                pd.testing.assert_frame_equal(trend_data(True), expected, check_dtype=False)
+                cube_path = os.path.join(tmpdir, "sales_trend_cube.db")
+                self.assertTrue(os.path.exists(cube_path))
+                
+                # A newer database version needs a refresh, while another process holds the cube
+                os.utime(db_path, ns=(0, os.stat(db_path).st_mtime_ns + 10 ** 9))
+                holder = sqlite3.connect(cube_path)
+                holder.execute("BEGIN IMMEDIATE")
+                try:
+                    with mock.patch.object(incremental_store, "BUSY_TIMEOUT", 0.1):
+                        pd.testing.assert_frame_equal(trend_data(True), expected, check_dtype=False)
+                finally:
+                    holder.close()
+            finally:
+                module._TREND_DATA_CACHE.clear()
+
 if __name__ == "__main__":
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,262 @@
+"""
+Streaming Outlier Detection
+
+Two-pass outlier detection over chunked input (for example a chunked SQL scan).
+The first pass folds every chunk into mergeable quantile sketches, one per metric
+and optionally one per metric and dimension group. The bounds (IQR fences or
+MAD-based modified z-score limits) come from the sketches, and a second pass
+only compares values against them, counting outliers and keeping the top-K most
+extreme rows as a sample. Memory stays bounded by the sketch sizes and K, not by
+the number of rows or outliers.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from Sales.tools.performance_utils.quantile_sketch import QuantileSketch
+
+DEFAULT_METRICS = ('revenue', 'units', 'aov')
+DEFAULT_THRESHOLDS = {'iqr': 1.5, 'mad': 3.5}
+# Per-group sketches are smaller, as there can be many groups
+GROUP_SKETCH_K = 64
+# Scales a MAD to the standard deviation of a normal distribution
+MAD_NORMAL_SCALE = 0.6745
+
+Chunks = Union[pd.DataFrame, Iterable[pd.DataFrame], Callable[[], Iterable[pd.DataFrame]]]
+
+class StreamingOutlierDetector:
+    """
+    Chunked IQR/MAD outlier detection using quantile sketches.
+    
+    Call update() with every chunk, then flag() with every chunk again, then result().
+    Detectors that saw different chunks in the first pass can be merged before flagging.
+    """
+    
+    def __init__(self, metrics: Iterable[str] = DEFAULT_METRICS, group_by: Optional[str] = None,
+                 method: str = 'iqr', threshold: Optional[float] = None, top_k: int = 20,
+                 k: int = 200, seed: Optional[int] = None):
+        """
+        Initialize the detector.
+        
+        Args:
+            metrics: Metric columns to check; columns missing from a chunk are skipped
+            group_by: Optional dimension column; bounds are then computed per group
+            method: 'iqr' (Tukey fences) or 'mad' (modified z-score)
+            threshold: IQR multiplier or modified z-score limit (defaults to 1.5 and 3.5)
+            top_k: Number of most extreme outlier rows kept per metric
+            k: Accuracy parameter of the per-metric sketches
+            seed: Optional seed for the sketches
+        """
+        if method not in DEFAULT_THRESHOLDS:
+            raise ValueError(f"Invalid method: {method}. Must be one of {list(DEFAULT_THRESHOLDS)}")
+        
+        self.metrics = list(metrics)
+        self.group_by = group_by
+        self.method = method
+        self.threshold = DEFAULT_THRESHOLDS[method] if threshold is None else threshold
+        self.top_k = top_k
+        self.k = k
+        self.seed = seed
+        self.sketches: Dict[str, QuantileSketch] = {metric: QuantileSketch(k, seed) for metric in self.metrics}
+        self.group_sketches: Dict[str, Dict[Any, QuantileSketch]] = {metric: {} for metric in self.metrics}
+        self._bounds: Optional[Dict[str, Any]] = None
+        self._counts: Dict[str, int] = {}
+        self._checked: Dict[str, int] = {}
+        self._group_counts: Dict[str, pd.Series] = {}
+        self._top: Dict[str, pd.DataFrame] = {}
+    
+    def update(self, chunk: pd.DataFrame) -> "StreamingOutlierDetector":
+        """
+        First pass: add a chunk to the sketches.
+        
+        Args:
+            chunk: DataFrame with metric (and group) columns
+        
+        Returns:
+            The detector itself, for chaining
+        """
+        self._bounds = None
+        for metric in self.metrics:
+            if metric not in chunk.columns:
+                continue
+            values = pd.to_numeric(chunk[metric], errors='coerce').to_numpy(dtype=float)
+            self.sketches[metric].update(values)
+            
+            if self.group_by:
+                sketches = self.group_sketches[metric]
+                for group, idx in chunk.groupby(self.group_by, sort=False).indices.items():
+                    if group not in sketches:
+                        sketches[group] = QuantileSketch(GROUP_SKETCH_K, self.seed)
+                    sketches[group].update(values[idx])
+        return self
+    
+    def merge(self, other: "StreamingOutlierDetector") -> "StreamingOutlierDetector":
+        """
+        Merge the first-pass sketches of another detector with the same settings.
+        
+        Args:
+            other: Detector that saw other chunks
+        
+        Returns:
+            The detector itself, for chaining
+        """
+        self._bounds = None
+        for metric in self.metrics:
+            self.sketches[metric].merge(other.sketches[metric])
+            for group, sketch in other.group_sketches[metric].items():
+                if group in self.group_sketches[metric]:
+                    self.group_sketches[metric][group].merge(sketch)
+                else:
+                    self.group_sketches[metric][group] = sketch
+        return self
+    
+    def _sketch_bounds(self, sketch: QuantileSketch) -> Tuple[float, float, float]:
+        """Lower bound, upper bound and scale (IQR or scaled MAD) of one sketch."""
+        if self.method == 'iqr':
+            q1, q3 = sketch.quantiles([0.25, 0.75])
+            scale = q3 - q1
+            return q1 - self.threshold * scale, q3 + self.threshold * scale, scale
+        
+        median = sketch.quantile(0.5)
+        scale = sketch.median_absolute_deviation() / MAD_NORMAL_SCALE
+        if not scale > 0:
+            # No spread around the median: nothing can be scored
+            return sketch.min, sketch.max, 0.0
+        return median - self.threshold * scale, median + self.threshold * scale, scale
+    
+    def bounds(self) -> Dict[str, Any]:
+        """
+        Outlier bounds from the first pass.
+        
+        Returns:
+            Dictionary of metric -> {'lower_bound', 'upper_bound', 'scale'} plus, when
+            grouping, 'groups': DataFrame of per-group bounds indexed by group
+        """
+        if self._bounds is None:
+            self._bounds = {}
+            for metric, sketch in self.sketches.items():
+                if sketch.count == 0:
+                    continue
+                lower, upper, scale = self._sketch_bounds(sketch)
+                bounds = {'lower_bound': float(lower), 'upper_bound': float(upper), 'scale': float(scale)}
+                if self.group_by:
+                    bounds['groups'] = pd.DataFrame(
+                        [self._sketch_bounds(group_sketch) for group_sketch in self.group_sketches[metric].values()],
+                        index=pd.Index(list(self.group_sketches[metric]), name=self.group_by),
+                        columns=['lower_bound', 'upper_bound', 'scale']
+                    )
+                self._bounds[metric] = bounds
+        return self._bounds
+    
+    def flag(self, chunk: pd.DataFrame) -> "StreamingOutlierDetector":
+        """
+        Second pass: count the outliers in a chunk and keep the most extreme ones.
+        
+        Args:
+            chunk: DataFrame with metric (and group) columns
+        
+        Returns:
+            The detector itself, for chaining
+        """
+        for metric, bounds in self.bounds().items():
+            if metric not in chunk.columns:
+                continue
+            values = pd.to_numeric(chunk[metric], errors='coerce').to_numpy(dtype=float)
+            if self.group_by:
+                group_bounds = bounds['groups'].reindex(chunk[self.group_by].to_numpy())
+                lower = group_bounds['lower_bound'].to_numpy()
+                upper = group_bounds['upper_bound'].to_numpy()
+                scale = group_bounds['scale'].to_numpy()
+            else:
+                lower, upper, scale = bounds['lower_bound'], bounds['upper_bound'], bounds['scale']
+            
+            with np.errstate(invalid='ignore'):
+                below = values < lower
+                above = values > upper
+            mask = below | above
+            self._checked[metric] = self._checked.get(metric, 0) + int(np.count_nonzero(~np.isnan(values)))
+            count = int(np.count_nonzero(mask))
+            self._counts[metric] = self._counts.get(metric, 0) + count
+            if count == 0:
+                continue
+            
+            # Severity: distance beyond the violated bound in units of the spread
+            distance = np.where(below, lower - values, values - upper)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                severity = np.where(np.asarray(scale) > 0, distance / scale, distance)[mask]
+            flagged = chunk[mask].assign(severity=severity)
+            
+            if self.group_by:
+                counts = flagged[self.group_by].value_counts()
+                previous = self._group_counts.get(metric)
+                self._group_counts[metric] = counts if previous is None else previous.add(counts, fill_value=0)
+            
+            if metric in self._top:
+                flagged = pd.concat([self._top[metric], flagged], ignore_index=True)
+            if len(flagged) > self.top_k:
+                keep = np.argpartition(-flagged['severity'].to_numpy(), self.top_k - 1)[:self.top_k]
+                flagged = flagged.iloc[keep]
+            self._top[metric] = flagged.reset_index(drop=True)
+        return self
+    
+    def result(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Outlier summary after the second pass.
+        
+        Returns:
+            Dictionary of metric -> method, bounds, outlier count, rows checked, outlier
+            share (%), the top-K most extreme rows (with a severity column) and, when
+            grouping, outlier counts per group
+        """
+        summary = {}
+        for metric, bounds in self.bounds().items():
+            count = self._counts.get(metric, 0)
+            checked = self._checked.get(metric, 0)
+            top = self._top.get(metric)
+            entry = {
+                'method': self.method,
+                'lower_bound': bounds['lower_bound'],
+                'upper_bound': bounds['upper_bound'],
+                'count': count,
+                'rows_checked': checked,
+                'share': (count / checked * 100) if checked else 0.0,
+                'sample': ([] if top is None else
+                           top.sort_values('severity', ascending=False).to_dict('records'))
+            }
+            if self.group_by:
+                counts = self._group_counts.get(metric, pd.Series(dtype=float))
+                entry['group_counts'] = {group: int(n) for group, n in counts.sort_values(ascending=False).items()}
+            summary[metric] = entry
+        return summary
+
+def _chunk_source(data: Chunks, chunk_size: int) -> Callable[[], Iterable[pd.DataFrame]]:
+    """Make a re-iterable chunk source from a DataFrame, a list of chunks or a chunk factory."""
+    if isinstance(data, pd.DataFrame):
+        return lambda: (data.iloc[start:start + chunk_size] for start in range(0, len(data), chunk_size))
+    if callable(data):
+        return data
+    chunks: List[pd.DataFrame] = list(data)
+    return lambda: iter(chunks)
+
+def detect_outliers(data: Chunks, chunk_size: int = 100_000, **options) -> Dict[str, Dict[str, Any]]:
+    """
+    Run both passes of a StreamingOutlierDetector.
+    
+    Args:
+        data: DataFrame, list of DataFrame chunks, or a callable returning a fresh chunk
+            iterator (such as a chunked SQL query) that is called once per pass
+        chunk_size: Rows per chunk when data is a single DataFrame
+        **options: StreamingOutlierDetector options (metrics, group_by, method, threshold, top_k)
+    
+    Returns:
+        StreamingOutlierDetector.result()
+    """
+    source = _chunk_source(data, chunk_size)
+    detector = StreamingOutlierDetector(**options)
+    for chunk in source():
+        detector.update(chunk)
+    for chunk in source():
+        detector.flag(chunk)
+    return detector.result()
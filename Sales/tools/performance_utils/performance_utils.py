@@ -6,16 +6,21 @@ This module provides utility functions for sales performance analysis.
 Migration Note: Updated to use centralized database connector (get_db_connector) and added get_connection helper for compliance with migration rules.
 """
 
+import re
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import logging
 
 # Add database connector import
 from Sales.database.connector import get_db_connector
+from Sales.tools.performance_utils.outlier_detection import Chunks, detect_outliers
 
 logger = logging.getLogger(__name__)
 
+# Rows per chunk for chunked scans and outlier detection
+SALES_CHUNK_SIZE = 100_000
+
 def get_connection():
     """Get a database connection using the centralized connector."""
     connector = get_db_connector()
@@ -42,35 +47,7 @@ def fetch_sales_data(conn, start_date: str, end_date: str,
         # Use centralized connection if not provided
         if conn is None:
             conn = get_connection()
-        # Base query
-        query = """
-            SELECT 
-                t."Txn Date" as date,
-                t."Net Sales Amount" as revenue,
-                t."Net Sales Quantity" as units,
-                i."Item Desc" as product_name,
-                i."Item Category Desc" as category,
-                c."Customer Name" as customer_name,
-                r."Sales Org Hrchy L1 Name" as region_name
-            FROM "dbo_F_Sales_Transaction" t
-            LEFT JOIN "dbo_D_Item" i ON t."Item Key" = i."Item Key"
-            LEFT JOIN "dbo_D_Customer" c ON t."Customer Key" = c."Customer Key"
-            LEFT JOIN "dbo_D_Sales_Organization" r ON t."Sales Organization Key" = r."Sales Organization Key"
-            WHERE t."Txn Date" BETWEEN ? AND ?
-                AND t."Deleted Flag" = 0
-                AND t."Excluded Flag" = 0
-        """
-        
-        # Add filters if specified
-        params = [start_date, end_date]
-        if filters:
-            for key, value in filters.items():
-                if key == "product_category":
-                    query += " AND i.\"Item Category Desc\" = ?"
-                    params.append(value)
-                elif key == "region":
-                    query += " AND r.\"Sales Org Hrchy L1 Name\" = ?"
-                    params.append(value)
+        query, params = _build_sales_query(start_date, end_date, filters)
         
         # Execute query
         data = pd.read_sql_query(query, conn, params=params)
@@ -81,6 +58,61 @@ def fetch_sales_data(conn, start_date: str, end_date: str,
         logger.error(f"Error fetching sales data: {str(e)}")
         raise
 
+def iter_sales_data(conn, start_date: str, end_date: str,
+                    filters: Optional[Dict[str, Any]] = None,
+                    chunk_size: int = SALES_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Fetch the rows of fetch_sales_data() in chunks.
+    
+    Args:
+        conn: Database connection
+        start_date: Start date for analysis (YYYY-MM-DD)
+        end_date: End date for analysis (YYYY-MM-DD)
+        filters: Optional filters to apply
+        chunk_size: Rows per chunk
+    
+    Yields:
+        DataFrames of at most chunk_size rows
+    """
+    if conn is None:
+        conn = get_connection()
+    query, params = _build_sales_query(start_date, end_date, filters)
+    yield from pd.read_sql_query(query, conn, params=params, chunksize=chunk_size)
+
+def _build_sales_query(start_date: str, end_date: str,
+                       filters: Optional[Dict[str, Any]] = None) -> Tuple[str, List[Any]]:
+    """Build the sales line query and its parameters."""
+    # Base query
+    query = """
+        SELECT 
+            t."Txn Date" as date,
+            t."Net Sales Amount" as revenue,
+            t."Net Sales Quantity" as units,
+            i."Item Desc" as product_name,
+            i."Item Category Desc" as category,
+            c."Customer Name" as customer_name,
+            r."Sales Org Hrchy L1 Name" as region_name
+        FROM "dbo_F_Sales_Transaction" t
+        LEFT JOIN "dbo_D_Item" i ON t."Item Key" = i."Item Key"
+        LEFT JOIN "dbo_D_Customer" c ON t."Customer Key" = c."Customer Key"
+        LEFT JOIN "dbo_D_Sales_Organization" r ON t."Sales Organization Key" = r."Sales Organization Key"
+        WHERE t."Txn Date" BETWEEN ? AND ?
+            AND t."Deleted Flag" = 0
+            AND t."Excluded Flag" = 0
+    """
+    
+    # Add filters if specified
+    params = [start_date, end_date]
+    if filters:
+        for key, value in filters.items():
+            if key == "product_category":
+                query += " AND i.\"Item Category Desc\" = ?"
+                params.append(value)
+            elif key == "region":
+                query += " AND r.\"Sales Org Hrchy L1 Name\" = ?"
+                params.append(value)
+    return query, params
+
 def calculate_metrics(data: pd.DataFrame, metrics: List[str]) -> pd.DataFrame:
     """
     Calculate sales metrics from the data.
@@ -151,58 +183,124 @@ def compare_periods(data: pd.DataFrame, period1: str, period2: str) -> Dict[str,
         Dictionary containing comparison results
     """
     try:
-        comparison = {}
+        matrix = compare_period_matrix(data, [period1, period2])
         
-        # Group data by period
-        period1_data = data[data['date'].str.startswith(period1)]
-        period2_data = data[data['date'].str.startswith(period2)]
-        
-        # Compare metrics
-        for metric in ['revenue', 'units', 'aov']:
-            if metric in data.columns:
-                p1_value = period1_data[metric].sum()
-                p2_value = period2_data[metric].sum()
-                change = ((p2_value - p1_value) / p1_value) * 100
-                comparison[f'{metric}_change'] = change
-                
-        return comparison
+        # Change from the first to the second period
+        return {f'{metric}_change': changes[0][1] for metric, changes in matrix['changes'].items()}
         
     except Exception as e:
         logger.error(f"Error comparing periods: {str(e)}")
         raise
 
-def identify_outliers(data: pd.DataFrame) -> Dict[str, Any]:
+def _parse_period(period: str) -> Tuple[int, int]:
+    """Split a 'YYYY', 'YYYY-MM' or 'YYYY-MM-DD' period into (length, integer key)."""
+    if not re.fullmatch(r'\d{4}(-\d{2}(-\d{2})?)?', period):
+        raise ValueError(f"Invalid period: {period}. Expected YYYY, YYYY-MM or YYYY-MM-DD")
+    return len(period), int(period.replace('-', ''))
+
+def compare_period_matrix(data: pd.DataFrame, periods: List[str],
+                          metrics: Optional[List[str]] = None,
+                          dimension: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Compare sales metrics across any number of periods in one pass.
+    
+    Dates are parsed once into integer period keys (YYYY, YYYYMM or YYYYMMDD,
+    following the length of the requested periods) and all periods, metrics
+    and dimension members are aggregated in a single groupby.
+    
+    Args:
+        data: DataFrame containing sales data with a 'date' column
+        periods: Periods to compare, in order ('YYYY', 'YYYY-MM' or 'YYYY-MM-DD')
+        metrics: Metrics to compare (defaults to revenue, units and aov where available);
+            aov is derived from the revenue and units totals
+        dimension: Optional column to compare members of (e.g. 'region_name')
+    
+    Returns:
+        Dictionary with 'periods', 'members' (one row label per dimension member,
+        or ['total']) and, per metric, 'values' and 'changes' matrices with one row
+        per member and one column per period. Changes are % changes from the
+        previous period (None for the first period or a zero base).
+    """
+    if not periods:
+        raise ValueError("At least one period is required")
+    metrics = metrics or [m for m in ['revenue', 'units', 'aov'] if m in data.columns]
+    parsed = [_parse_period(period) for period in periods]
+    summed = [m for m in metrics if m != 'aov' or not {'revenue', 'units'} <= set(data.columns)]
+    sum_columns = sorted(set(summed) | ({'revenue', 'units'} if 'aov' in metrics and 'aov' not in summed else set()))
+    
+    # Integer period keys at each requested granularity, computed once
+    dates = pd.to_datetime(data['date'], errors='coerce', format='ISO8601')
+    year = dates.dt.year.to_numpy(dtype=float)
+    keys_by_length = {
+        4: year,
+        7: year * 100 + dates.dt.month.to_numpy(dtype=float),
+        10: (year * 100 + dates.dt.month.to_numpy(dtype=float)) * 100 + dates.dt.day.to_numpy(dtype=float)
+    }
+    
+    # Column position of each distinct period
+    position = {}
+    for i, period in enumerate(parsed):
+        position.setdefault(period, i)
+    
+    frames = []
+    for length in sorted({length for length, _ in parsed}):
+        wanted = np.array(sorted(key for period_length, key in position if period_length == length))
+        keys = keys_by_length[length]
+        mask = np.isin(keys, wanted)
+        period_position = np.array([position[(length, key)] for key in wanted])
+        frames.append(data.loc[mask, sum_columns].assign(
+            period=period_position[np.searchsorted(wanted, keys[mask])],
+            member=data.loc[mask, dimension].to_numpy() if dimension else 'total'
+        ))
+    totals = pd.concat(frames).groupby(['member', 'period'], sort=False)[sum_columns].sum()
+    
+    columns = [position[period] for period in parsed]
+    result = {'periods': list(periods), 'members': [], 'values': {}, 'changes': {}}
+    for metric in metrics:
+        if metric == 'aov' and metric not in summed:
+            wide = (totals['revenue'] / totals['units'].replace(0, np.nan)).unstack('period')
+        else:
+            wide = totals[metric].unstack('period')
+        wide = wide.reindex(columns=columns)
+        if dimension is None:
+            wide = wide.reindex(['total'])
+        wide = wide.sort_index()
+        values = wide.to_numpy(dtype=float)
+        
+        previous = np.roll(values, 1, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            changes = np.where(previous != 0, (values - previous) / previous * 100, np.nan)
+        changes[:, 0] = np.nan
+        
+        result['members'] = wide.index.tolist()
+        result['values'][metric] = np.where(np.isnan(values), None, values).tolist()
+        result['changes'][metric] = np.where(np.isnan(changes), None, changes).tolist()
+    return result
+
+def identify_outliers(data: Chunks, method: str = 'iqr', group_by: Optional[str] = None,
+                      top_k: int = 20, chunk_size: int = SALES_CHUNK_SIZE) -> Dict[str, Any]:
     """
     Identify outliers in the sales data.
     
+    Bounds come from streaming quantile sketches built in a first pass over the
+    data; a second pass counts the outliers and keeps only the most extreme rows.
+    
     Args:
-        data: DataFrame containing sales data
+        data: DataFrame containing sales data, a list of DataFrame chunks, or a
+            callable returning a fresh chunk iterator (e.g. around iter_sales_data)
+        method: 'iqr' (1.5 x IQR fences) or 'mad' (modified z-score above 3.5)
+        group_by: Optional dimension column to compute bounds per group
+        top_k: Number of most extreme outlier rows returned per metric
+        chunk_size: Rows per chunk when data is a single DataFrame
         
     Returns:
-        Dictionary containing outlier information
+        Dictionary of metric -> outlier count, bounds, share and top-K sample,
+        for the metrics that have outliers
     """
     try:
-        outliers = {}
-        
-        # Identify outliers for each metric
-        for metric in ['revenue', 'units', 'aov']:
-            if metric in data.columns:
-                values = data[metric].values
-                q1 = np.percentile(values, 25)
-                q3 = np.percentile(values, 75)
-                iqr = q3 - q1
-                lower_bound = q1 - 1.5 * iqr
-                upper_bound = q3 + 1.5 * iqr
-                
-                outlier_data = data[
-                    (data[metric] < lower_bound) | 
-                    (data[metric] > upper_bound)
-                ]
-                
-                if not outlier_data.empty:
-                    outliers[metric] = outlier_data.to_dict('records')
-                    
-        return outliers
+        summary = detect_outliers(data, chunk_size=chunk_size, metrics=['revenue', 'units', 'aov'],
+                                  group_by=group_by, method=method, top_k=top_k)
+        return {metric: result for metric, result in summary.items() if result['count'] > 0}
         
     except Exception as e:
         logger.error(f"Error identifying outliers: {str(e)}")
@@ -235,8 +333,8 @@ def generate_insights(data: pd.DataFrame, trends: Dict[str, Any],
                     
         # Generate outlier insights
         for metric, outlier_data in outliers.items():
-            if outlier_data:
-                insights.append(f"Found {len(outlier_data)} outliers in {metric}")
+            if outlier_data.get('count'):
+                insights.append(f"Found {outlier_data['count']} outliers in {metric}")
                 
         return insights
         
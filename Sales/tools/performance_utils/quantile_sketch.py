@@ -0,0 +1,189 @@
+"""
+Quantile Sketch
+
+Mergeable streaming quantile sketch for approximate percentiles over data that is
+too large to sort in one piece. Values are fed chunk by chunk (for example from a
+chunked SQL scan); sketches built on separate chunks or processes can be merged.
+
+The sketch follows the KLL design: a hierarchy of compactors where level h holds
+items of weight 2**h. When a level overflows it is sorted and every other item is
+promoted to the next level, so memory stays around 3*k items while the rank error
+stays around 1/k regardless of how many values are seen.
+"""
+
+from typing import Iterable, List, Optional, Union
+
+import numpy as np
+
+class QuantileSketch:
+    """
+    KLL-style mergeable quantile sketch.
+    """
+    
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        """
+        Initialize an empty sketch.
+        
+        Args:
+            k: Accuracy parameter (capacity of the top compactor). Rank error is roughly 1/k.
+            seed: Optional seed for the random compaction offsets
+        """
+        if k < 8:
+            raise ValueError("k must be at least 8")
+        
+        self.k = k
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+    
+    def update(self, values: Union[Iterable[float], np.ndarray]) -> "QuantileSketch":
+        """
+        Add a chunk of values to the sketch. NaN values are ignored.
+        
+        Args:
+            values: Array-like of numeric values
+        
+        Returns:
+            The sketch itself, for chaining
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        
+        self.count += values.size
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self._levels[0] = np.concatenate([self._levels[0], values])
+        self._compress()
+        return self
+    
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """
+        Merge another sketch into this one.
+        
+        Args:
+            other: Sketch built over a different part of the data
+        
+        Returns:
+            The sketch itself, for chaining
+        """
+        if other.count == 0:
+            return self
+        
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0))
+        for level, items in enumerate(other._levels):
+            self._levels[level] = np.concatenate([self._levels[level], items])
+        
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+    
+    def quantiles(self, qs: Union[Iterable[float], np.ndarray]) -> np.ndarray:
+        """
+        Approximate quantiles of all values seen so far.
+        
+        Args:
+            qs: Quantile fractions between 0 and 1
+        
+        Returns:
+            Array with one value per requested fraction (NaN if the sketch is empty)
+        """
+        qs = np.asarray(qs, dtype=float)
+        if self.count == 0:
+            return np.full(qs.shape, np.nan)
+        
+        items, weights = self._weighted_items()
+        cumulative = np.cumsum(weights)
+        idx = np.searchsorted(cumulative, qs * cumulative[-1], side='left')
+        result = items[np.clip(idx, 0, items.size - 1)]
+        
+        # The exact extremes are tracked separately
+        result = np.where(qs <= 0, self.min, result)
+        return np.where(qs >= 1, self.max, result)
+    
+    def quantile(self, q: float) -> float:
+        """
+        Approximate a single quantile.
+        
+        Args:
+            q: Quantile fraction between 0 and 1
+        
+        Returns:
+            Approximate value at that quantile
+        """
+        return float(self.quantiles([q])[0])
+    
+    def rank(self, value: float) -> float:
+        """
+        Approximate fraction of values less than or equal to a value.
+        
+        Args:
+            value: Value to rank
+        
+        Returns:
+            Fraction between 0 and 1 (NaN if the sketch is empty)
+        """
+        if self.count == 0:
+            return float('nan')
+        items, weights = self._weighted_items()
+        return float(weights[items <= value].sum() / weights.sum())
+    
+    def median_absolute_deviation(self) -> float:
+        """
+        Approximate median absolute deviation from the median.
+        
+        The deviations are taken over the retained weighted items, so no second
+        pass over the data is needed.
+        
+        Returns:
+            Approximate MAD (NaN if the sketch is empty)
+        """
+        if self.count == 0:
+            return float('nan')
+        items, weights = self._weighted_items()
+        deviations = np.abs(items - self.quantile(0.5))
+        order = np.argsort(deviations, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        idx = np.searchsorted(cumulative, 0.5 * cumulative[-1], side='left')
+        return float(deviations[order][min(idx, deviations.size - 1)])
+    
+    def _weighted_items(self):
+        """Sorted retained items with their weights."""
+        items = np.concatenate(self._levels)
+        weights = np.concatenate([
+            np.full(level_items.size, 2.0 ** level) for level, level_items in enumerate(self._levels)
+        ])
+        order = np.argsort(items, kind='stable')
+        return items[order], weights[order]
+    
+    def _capacity(self, level: int) -> int:
+        """Capacity of a compactor; lower levels get geometrically smaller buffers."""
+        depth = len(self._levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2.0 / 3.0) ** depth)))
+    
+    def _compress(self) -> None:
+        """Compact overflowing levels until every level is within its capacity."""
+        compacted = True
+        while compacted:
+            compacted = False
+            for level in range(len(self._levels)):
+                items = self._levels[level]
+                if items.size <= self._capacity(level):
+                    continue
+                
+                if level + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+                
+                items = np.sort(items)
+                # An odd item out stays at this level; of the pairs, a random half moves up
+                leftover = items.size % 2
+                promoted = items[leftover:][self._rng.integers(2)::2]
+                self._levels[level] = items[:leftover]
+                self._levels[level + 1] = np.concatenate([self._levels[level + 1], promoted])
+                compacted = True
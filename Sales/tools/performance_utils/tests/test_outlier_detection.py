@@ -0,0 +1,51 @@
+import unittest
+import numpy as np
+import pandas as pd
+from Sales.tools.performance_utils.outlier_detection import StreamingOutlierDetector, detect_outliers
+
+class TestOutlierDetection(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        n = 100000
+        self.data = pd.DataFrame({
+            'revenue': rng.normal(100, 10, n),
+            'units': rng.poisson(5, n).astype(float),
+            'region_name': np.where(np.arange(n) % 2 == 0, 'North', 'South')
+        })
+        # South sells at a higher level, so its normal values are North's outliers
+        self.data.loc[self.data['region_name'] == 'South', 'revenue'] += 1000
+        self.data.loc[[10, 20], 'revenue'] = [5000.0, -5000.0]
+
+    def test_iqr_matches_exact_bounds(self):
+        data = self.data[self.data['region_name'] == 'North']
+        result = detect_outliers(data, chunk_size=7000, metrics=['revenue'], top_k=5, seed=0)['revenue']
+        q1, q3 = np.percentile(data['revenue'], [25, 75])
+        exact = ((data['revenue'] < q1 - 1.5 * (q3 - q1)) | (data['revenue'] > q3 + 1.5 * (q3 - q1))).sum()
+        self.assertAlmostEqual(result['count'], exact, delta=max(5, exact * 0.1))
+        self.assertEqual(result['rows_checked'], len(data))
+        # Only the top-K rows are returned, most extreme first
+        self.assertEqual(len(result['sample']), 5)
+        self.assertEqual({row['revenue'] for row in result['sample'][:2]}, {5000.0, -5000.0})
+        severities = [row['severity'] for row in result['sample']]
+        self.assertEqual(severities, sorted(severities, reverse=True))
+
+    def test_group_bounds_and_merge(self):
+        chunks = [self.data.iloc[i:i + 10000] for i in range(0, len(self.data), 10000)]
+        left = StreamingOutlierDetector(metrics=['revenue'], group_by='region_name', method='mad', seed=0)
+        right = StreamingOutlierDetector(metrics=['revenue'], group_by='region_name', method='mad', seed=1)
+        for chunk in chunks[:5]:
+            left.update(chunk)
+        for chunk in chunks[5:]:
+            right.update(chunk)
+        detector = left.merge(right)
+        for chunk in chunks:
+            detector.flag(chunk)
+        result = detector.result()['revenue']
+
+        # Per-group bounds do not flag the whole South group
+        self.assertLess(result['count'], 200)
+        self.assertIn(-5000.0, [row['revenue'] for row in result['sample']])
+        self.assertGreaterEqual(result['group_counts']['North'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
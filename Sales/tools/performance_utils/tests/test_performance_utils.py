@@ -39,5 +39,21 @@ class TestPerformanceUtils(unittest.TestCase):
             # At least one trend metric should be present if data exists
             self.assertTrue(any('growth' in k for k in trends.keys()))
 
+    def test_compare_period_matrix(self):
+        df = pd.DataFrame({
+            'date': ['2024-01-05', '2024-01-20', '2024-02-03', '2024-03-01 00:00:00', '2024-03-15'],
+            'revenue': [100.0, 100.0, 300.0, 50.0, 50.0],
+            'units': [1.0, 1.0, 2.0, 1.0, 1.0],
+            'region_name': ['North', 'South', 'North', 'North', 'South']
+        })
+        matrix = performance_utils.compare_period_matrix(
+            df, ['2024-01', '2024-02', '2024-03'], metrics=['revenue', 'aov'], dimension='region_name')
+        self.assertEqual(matrix['members'], ['North', 'South'])
+        self.assertEqual(matrix['values']['revenue'], [[100.0, 300.0, 50.0], [100.0, None, 50.0]])
+        self.assertEqual(matrix['changes']['revenue'][0], [None, 200.0, 50.0 / 300.0 * 100 - 100])
+        self.assertEqual(matrix['values']['aov'][0], [100.0, 150.0, 50.0])
+        # The two-period API keeps its flat result
+        self.assertEqual(performance_utils.compare_periods(df, '2024-01', '2024-02')['revenue_change'], 50.0)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,43 @@
+import unittest
+import numpy as np
+from Sales.tools.performance_utils.quantile_sketch import QuantileSketch
+
+class TestQuantileSketch(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.values = rng.lognormal(mean=3, sigma=1, size=200000)
+
+    def test_chunked_quantiles(self):
+        sketch = QuantileSketch(seed=0)
+        for chunk in np.array_split(self.values, 25):
+            sketch.update(chunk)
+        self.assertEqual(sketch.count, len(self.values))
+        # Memory stays bounded no matter how many values are added
+        self.assertLess(sum(level.size for level in sketch._levels), 4 * sketch.k)
+        for q in [0.1, 0.5, 0.9]:
+            estimate = sketch.quantile(q)
+            true_rank = np.mean(self.values <= estimate)
+            self.assertAlmostEqual(true_rank, q, delta=0.03)
+        self.assertEqual(sketch.quantile(0), self.values.min())
+        self.assertEqual(sketch.quantile(1), self.values.max())
+
+    def test_merge(self):
+        left = QuantileSketch(seed=1).update(self.values[:120000])
+        right = QuantileSketch(seed=2).update(self.values[120000:])
+        merged = left.merge(right)
+        self.assertEqual(merged.count, len(self.values))
+        self.assertAlmostEqual(merged.rank(np.median(self.values)), 0.5, delta=0.03)
+
+    def test_empty(self):
+        sketch = QuantileSketch().update([np.nan])
+        self.assertEqual(sketch.count, 0)
+        self.assertTrue(np.isnan(sketch.quantile(0.5)))
+
+    def test_median_absolute_deviation(self):
+        sketch = QuantileSketch(seed=0).update(self.values)
+        exact = np.median(np.abs(self.values - np.median(self.values)))
+        self.assertAlmostEqual(sketch.median_absolute_deviation(), exact, delta=exact * 0.05)
+        self.assertTrue(np.isnan(QuantileSketch().median_absolute_deviation()))
+
+if __name__ == '__main__':
+    unittest.main()
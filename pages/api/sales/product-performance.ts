@@ -2,6 +2,34 @@ import { NextApiRequest, NextApiResponse } from 'next';
 import { spawn } from 'child_process';
 import path from 'path';
 
+/**
+ * Base URL of the warm Python analytics service (Sales/service/analytics_service.py).
+ * When unset, the handler falls back to spawning api_runner.py per request.
+ */
+const ANALYTICS_SERVICE_URL = process.env.ANALYTICS_SERVICE_URL;
+
+/**
+ * Run the analysis on the long-lived analytics service via JSON-RPC
+ */
+async function callAnalyticsService(params: Record<string, unknown>) {
+  const response = await fetch(`${ANALYTICS_SERVICE_URL}/rpc`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({
+      jsonrpc: '2.0',
+      method: 'product_performance',
+      params,
+      id: Date.now()
+    })
+  });
+
+  const payload = await response.json();
+  if (payload.error) {
+    throw new Error(`Analytics service error ${payload.error.code}: ${payload.error.message}`);
+  }
+  return payload.result;
+}
+
 /**
  * API handler for Product Performance Analyzer
  * 
@@ -14,14 +42,36 @@ export default async function handler(req: NextApiRequest, res: NextApiResponse)
   }
 
   try {
-    const { start_date, end_date, metrics, category_level, min_sales_threshold } = req.body;
+    const {
+      start_date, end_date, metrics, category_level, min_sales_threshold,
+      limit, offset, sort_by, sort_order
+    } = req.body;
+
+    // A page of products (limit) does not need metrics
+    const isPageRequest = limit !== undefined && limit !== null;
 
     // Validate required parameters
-    if (!start_date || !end_date || !metrics || !Array.isArray(metrics)) {
+    if (!start_date || !end_date || (!isPageRequest && (!metrics || !Array.isArray(metrics)))) {
       return res.status(400).json({
         status: 'error',
-        message: 'Invalid parameters. Required: start_date, end_date, metrics (array)'
+        message: 'Invalid parameters. Required: start_date, end_date, metrics (array) or limit'
+      });
+    }
+
+    // Prefer the warm analytics service when one is configured
+    if (ANALYTICS_SERVICE_URL) {
+      const result = await callAnalyticsService({
+        start_date,
+        end_date,
+        metrics,
+        category_level,
+        min_sales_threshold,
+        limit,
+        offset,
+        sort_by,
+        sort_order
       });
+      return res.status(200).json(result);
     }
 
     // Construct arguments for Python script
@@ -29,9 +79,12 @@ export default async function handler(req: NextApiRequest, res: NextApiResponse)
       path.resolve('Sales/tools/ProductPerformanceAnalyzer/api_runner.py'),
       '--start_date', start_date,
       '--end_date', end_date,
-      '--metrics', metrics.join(','),
     ];
 
+    if (metrics && Array.isArray(metrics)) {
+      args.push('--metrics', metrics.join(','));
+    }
+
     // Add optional parameters if provided
     if (category_level) {
       args.push('--category_level', category_level);
@@ -41,6 +94,20 @@ export default async function handler(req: NextApiRequest, res: NextApiResponse)
       args.push('--min_sales_threshold', min_sales_threshold.toString());
     }
 
+    // Sorting and paging are pushed down into SQL by the analyzer
+    if (isPageRequest) {
+      args.push('--limit', limit.toString());
+      if (offset !== undefined && offset !== null) {
+        args.push('--offset', offset.toString());
+      }
+      if (sort_by) {
+        args.push('--sort_by', sort_by);
+      }
+      if (sort_order) {
+        args.push('--sort_order', sort_order);
+      }
+    }
+
     // Execute Python process
     const pythonProcess = spawn('python', args);
     